@@ -1,29 +1,61 @@
-import json
-import random
+# adaptive_engine.py - incremental (Elo-style) learner model and next-question selection
+from question_index import DIFFICULTY_ORDER
 
-with open("questions.json", "r") as f:
-    QUESTION_BANK = json.load(f)
+LEVELS = DIFFICULTY_ORDER
+LEVEL_RATINGS = {"easy": 800.0, "medium": 1000.0, "hard": 1200.0}
+START_RATING = LEVEL_RATINGS["easy"]
 
-LEVELS = ["easy", "medium", "hard"]
+# A correct answer slower than the mode's threshold earns partial credit
+SLOW_CORRECT_SCORE = 0.8
 
-def get_question(level):
-    questions = QUESTION_BANK.get(level, [])
-    return random.choice(questions) if questions else None
 
-def adjust_level(score_history):
-    if not score_history:
-        return "easy"
+def expected_score(skill: float, difficulty: float) -> float:
+    """Elo win probability of a learner with rating `skill` on an item rated `difficulty`."""
+    return 1.0 / (1.0 + 10 ** ((difficulty - skill) / 400.0))
 
-    recent = score_history[-3:]
-    accuracy = sum(recent) / len(recent)
 
-    if accuracy >= 0.8:
-        return "hard"
-    elif accuracy >= 0.5:
-        return "medium"
-    else:
-        return "easy"
+def level_for(rating: float) -> str:
+    """Difficulty level whose rating is closest to `rating`."""
+    return min(LEVELS, key=lambda level: abs(LEVEL_RATINGS[level] - rating))
+
+
+class LearnerModel:
+    """Per-learner skill estimate for one mode, updated in O(1) per answer."""
+
+    __slots__ = ("rating", "answered")
+
+    def __init__(self, rating: float = START_RATING, answered: int = 0):
+        self.rating = rating
+        self.answered = answered
+
+    def k_factor(self) -> float:
+        """Large steps while the estimate is new, settling as answers accumulate."""
+        return max(24.0, 120.0 / (1 + self.answered / 10))
+
+    def update(self, level: str, correct: bool, elapsed: float = None, fast_threshold: float = None) -> float:
+        """Record one answer to a question of `level` and return the new rating."""
+        score = 0.0
+        if correct:
+            slow = elapsed is not None and fast_threshold is not None and elapsed >= fast_threshold
+            score = SLOW_CORRECT_SCORE if slow else 1.0
+        self.rating += self.k_factor() * (score - expected_score(self.rating, LEVEL_RATINGS[level]))
+        self.answered += 1
+        return self.rating
+
+    def level(self) -> str:
+        return level_for(self.rating)
+
+
+def select_level(target: str, seen, index):
+    """
+    Level closest to `target` that still has unseen questions (ties prefer
+    the harder level), or None when the bank is exhausted. Uses the index's
+    per-level unseen counts, so it is O(levels) regardless of bank size.
+    """
+    start = LEVELS.index(target)
+    for distance in range(len(LEVELS)):
+        for i in (start + distance, start - distance):
+            if 0 <= i < len(LEVELS) and index.unseen_count(LEVELS[i], seen) > 0:
+                return LEVELS[i]
+    return None
 
-def get_quiz_question():
-    quiz_questions = QUESTION_BANK.get("quiz", [])
-    return random.choice(quiz_questions) if quiz_questions else None
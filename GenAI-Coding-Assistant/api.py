@@ -0,0 +1,269 @@
+# api.py - stateless async JSON API for question serving, grading and hints
+"""
+Run:  python api.py --port 8080        (or: API_PORT=8080 python api.py)
+
+Every request carries the learner's state for its mode and every response
+returns the updated state, so any replica can serve any request; run as many
+behind a load balancer as needed. The state is an opaque JSON object
+(skill estimate, level, cursor, a compressed bitmap of seen question ids
+and the ids already answered wrong, so retries don't lower the rating again;
+answers to questions already seen are ignored).
+
+    POST /api/{mode}/next     {"state": null | {...}}
+        -> {"question": {...} | null, "state": {...}}
+    POST /api/coding/submit   {"state", "question_id", "code", "elapsed"?, "profile"?}
+        -> {"correct", "result", "state", "profile"?}
+           (a pre-screen rejection has result {"kind", "message", "hint", "line"} and
+            needs no /hint call; with PROFILE_SUBMISSIONS, or "profile": true where
+            API_ALLOW_PROFILE is set, a passing submission's complexity report is
+            added, see service.profile_code)
+    POST /api/quiz/submit     {"state", "question_id", "answer", "elapsed"?}
+        -> {"correct", "correct_answer", "state"}
+    POST /api/{mode}/skip     {"state", "question_id"} -> {"state"}
+    POST /api/{mode}/hint     {"question_id", "code" | "answer", "profile"?}
+        -> {"hint"}   (add ?stream=1 for a chunked text/plain response; "profile": true,
+                       where submissions can be profiled, asks for a hint on speeding
+                       the code up if the server finds it over its budget)
+    GET  /api/health, GET /metrics
+
+Blocking work (sandboxed grading, LLM calls) runs on a thread pool sized by
+API_THREADS, so the event loop only parses and routes requests.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from gemini_api import generate_hint, stream_hint
+from metrics import REGISTRY, span
+from prescreen import Diagnosis
+from question_bank import ReloadingBank
+from sandbox import SandboxPool
+from service import (
+    ENFORCE_BUDGETS,
+    FAST_SECONDS,
+    MODES,
+    PROFILE_SUBMISSIONS,
+    ModeState,
+    func_name_for,
+    grade_code,
+    performance_question,
+    profile_code,
+    public_question,
+)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+API_THREADS = int(os.getenv("API_THREADS", "32"))
+# Let clients ask for profiling ("profile": true); each profile reruns the code at several input sizes
+API_ALLOW_PROFILE = os.getenv("API_ALLOW_PROFILE", "0") == "1"
+
+BANKS = web.AppKey("banks", dict)
+SANDBOX = web.AppKey("sandbox", SandboxPool)
+EXECUTOR = web.AppKey("executor", ThreadPoolExecutor)
+
+
+def _error(http_error, message: str):
+    """An aiohttp HTTP exception (e.g. web.HTTPBadRequest) with a JSON {"error": message} body."""
+    return http_error(text=json.dumps({"error": message}), content_type="application/json")
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=str)  # per-case grading results may hold arbitrary values
+
+
+async def _body(request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise _error(web.HTTPBadRequest, "body must be JSON")
+    if not isinstance(body, dict):
+        raise _error(web.HTTPBadRequest, "body must be a JSON object")
+    return body
+
+
+def _mode(request) -> str:
+    mode = request.match_info["mode"]
+    if mode not in MODES:
+        raise _error(web.HTTPNotFound, f"unknown mode {mode!r}")
+    return mode
+
+
+def _state(bank, body) -> ModeState:
+    try:
+        return ModeState.from_dict(bank.index, body.get("state"))
+    except ValueError as e:
+        raise _error(web.HTTPBadRequest, str(e))
+
+
+def _question(bank, body):
+    """(position, row) for body["question_id"]."""
+    try:
+        pos = bank.index.position(body["question_id"])
+    except (KeyError, TypeError, ValueError):
+        raise _error(web.HTTPNotFound, "unknown question_id")
+    return pos, bank.row(pos)
+
+
+def _elapsed(body):
+    elapsed = body.get("elapsed")
+    return float(elapsed) if isinstance(elapsed, (int, float)) else None
+
+
+async def _run_blocking(request, func, *args):
+    return await asyncio.get_running_loop().run_in_executor(request.app[EXECUTOR], func, *args)
+
+
+def _profile_requested(body) -> bool:
+    return PROFILE_SUBMISSIONS or (API_ALLOW_PROFILE and body.get("profile") is True)
+
+
+def _passing_profile(row, code: str, sandbox):
+    """profile_code's report for a submission that passes grade_code, else None (both are cached)."""
+    correct, _ = grade_code(row, code, sandbox)
+    return profile_code(row, code, sandbox) if correct else None
+
+
+async def next_question(request):
+    mode = _mode(request)
+    bank = request.app[BANKS][mode].current()
+    body = await _body(request)
+    state = _state(bank, body)
+    pos = state.current(bank.index)
+    question = None if pos is None else public_question(mode, bank.row(pos))
+    return web.json_response({"question": question, "state": state.to_dict(bank.index)})
+
+
+async def submit_code(request):
+    bank = request.app[BANKS]["coding"].current()
+    body = await _body(request)
+    state = _state(bank, body)
+    pos, row = _question(bank, body)
+    code = body.get("code")
+    if not isinstance(code, str):
+        raise _error(web.HTTPBadRequest, "code must be a string")
+    with span("evaluate"):
+        correct, result = await _run_blocking(request, grade_code, row, code, request.app[SANDBOX])
+    report = None
+    if correct and _profile_requested(body):
+        report = await _run_blocking(request, profile_code, row, code, request.app[SANDBOX])
+        correct = not (ENFORCE_BUDGETS and report["within_budget"] is False)
+    state.answer(bank.index, pos, correct, _elapsed(body), FAST_SECONDS["coding"])
+    if isinstance(result, Diagnosis):
+        result = result.to_dict()
+    response = {"correct": correct, "result": result, "state": state.to_dict(bank.index)}
+    if report is not None:
+        response["profile"] = report
+    return web.json_response(response, dumps=_dumps)
+
+
+async def submit_answer(request):
+    bank = request.app[BANKS]["quiz"].current()
+    body = await _body(request)
+    state = _state(bank, body)
+    pos, row = _question(bank, body)
+    correct_answer = row.get("correct_answer", "")
+    correct = body.get("answer") == correct_answer
+    state.answer(bank.index, pos, correct, _elapsed(body), FAST_SECONDS["quiz"])
+    return web.json_response(
+        {"correct": correct, "correct_answer": correct_answer, "state": state.to_dict(bank.index)}
+    )
+
+
+async def skip(request):
+    mode = _mode(request)
+    bank = request.app[BANKS][mode].current()
+    body = await _body(request)
+    state = _state(bank, body)
+    pos, _ = _question(bank, body)
+    state.leave(bank.index, pos)
+    return web.json_response({"state": state.to_dict(bank.index)})
+
+
+async def hint(request):
+    mode = _mode(request)
+    bank = request.app[BANKS][mode].current()
+    body = await _body(request)
+    _, row = _question(bank, body)
+    if mode == "coding":
+        question, attempt, func_name = row.get("description", ""), body.get("code", ""), func_name_for(row)
+        if body.get("profile") and (PROFILE_SUBMISSIONS or API_ALLOW_PROFILE) and isinstance(attempt, str):
+            report = await _run_blocking(request, _passing_profile, row, attempt, request.app[SANDBOX])
+            if report is not None and report["within_budget"] is False:
+                question = performance_question(row, report)
+    else:
+        question, attempt, func_name = row.get("question", ""), body.get("answer", ""), None
+
+    if request.query.get("stream") not in ("1", "true"):
+        text = await _run_blocking(request, generate_hint, question, attempt, func_name)
+        return web.json_response({"hint": text})
+
+    # Relay chunks from the blocking generator through an asyncio queue
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+
+    def produce():
+        try:
+            for chunk in stream_hint(question, attempt, func_name):
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+    await response.prepare(request)
+    loop.run_in_executor(request.app[EXECUTOR], produce)
+    while (chunk := await chunks.get()) is not None:
+        await response.write(chunk.encode("utf-8"))
+    await response.write_eof()
+    return response
+
+
+async def health(request):
+    banks = request.app[BANKS]
+    return web.json_response({"status": "ok", "questions": {mode: len(bank) for mode, bank in banks.items()}})
+
+
+async def metrics(request):
+    return web.Response(text=REGISTRY.render(), content_type="text/plain")
+
+
+def create_app(app_dir: str = APP_DIR, sandbox: SandboxPool = None) -> web.Application:
+    app = web.Application()
+    app[BANKS] = {
+        "coding": ReloadingBank(os.path.join(app_dir, "coding_questions.csv")),
+        "quiz": ReloadingBank(os.path.join(app_dir, "quiz_questions.csv")),
+    }
+    app[SANDBOX] = sandbox or SandboxPool()
+    app[EXECUTOR] = ThreadPoolExecutor(max_workers=API_THREADS, thread_name_prefix="api")
+
+    async def shutdown(app):
+        app[EXECUTOR].shutdown(wait=False)
+        app[SANDBOX].close()
+        for bank in app[BANKS].values():
+            bank.close()
+
+    app.on_cleanup.append(shutdown)
+    app.router.add_post("/api/{mode}/next", next_question)
+    app.router.add_post("/api/coding/submit", submit_code)
+    app.router.add_post("/api/quiz/submit", submit_answer)
+    app.router.add_post("/api/{mode}/skip", skip)
+    app.router.add_post("/api/{mode}/hint", hint)
+    app.router.add_get("/api/health", health)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adaptive coding & quiz JSON API")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8080")))
+    args = parser.parse_args(argv)
+    web.run_app(create_app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
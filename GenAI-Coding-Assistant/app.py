@@ -1,15 +1,42 @@
 # app.py - Adaptive Coding & Quiz App (styled professional)
+import re
 import time
-import ast
-import pandas as pd
+import uuid
+from string import Template
 import streamlit as st
-from utils import evaluate_code
-from gemini_api import generate_hint
+from adaptive_engine import LearnerModel
+from hint_jobs import local_hint, submit_hint
+from metrics import span, start_exporters
+from prefetch_hints import prefetch_next, prefetch_question
+from prescreen import Diagnosis
+from progress_store import ProgressStore, decode_seen
+from question_bank import ReloadingBank
+from question_index import SeenSet
+from sandbox import SandboxPool
+from service import (
+    ENFORCE_BUDGETS,
+    FAST_SECONDS,
+    PROFILE_SUBMISSIONS,
+    advance as next_position,
+    func_name_for,
+    grade_code,
+    performance_note,
+    performance_question,
+    pick_question,
+    profile_code,
+)
+from utils import parse_literal
 
 import os
 
-@st.cache_data
+@st.cache_resource
 def load_data():
+    """
+    Open the compiled (memory-mapped) question banks, compiling them from the
+    CSVs first if needed. Only the id/difficulty index is loaded up front;
+    question rows are read lazily by position. The banks follow edits to the
+    CSVs (see ReloadingBank), so adding questions needs no restart.
+    """
     base_path = os.path.dirname(__file__)  # folder where app.py is
     coding_path = os.path.join(base_path, "coding_questions.csv")
     quiz_path = os.path.join(base_path, "quiz_questions.csv")
@@ -18,12 +45,29 @@ def load_data():
         st.error("CSV files not found in the app folder!")
         st.stop()
     
-    coding = pd.read_csv(coding_path)
-    quiz = pd.read_csv(quiz_path)
-    coding["difficulty"] = coding["difficulty"].astype(str).str.lower()
-    quiz["difficulty"] = quiz["difficulty"].astype(str).str.lower()
-    return coding, quiz
-CODING_DF, QUIZ_DF = load_data()
+    with span("load_data", sample_rate=1.0):
+        return ReloadingBank(coding_path), ReloadingBank(quiz_path)
+
+
+@st.cache_resource
+def get_progress_store():
+    """Durable progress store shared by all sessions of this node (PROGRESS_DB must be on local disk)."""
+    path = os.getenv("PROGRESS_DB", os.path.join(os.path.dirname(__file__), "progress.db"))
+    return ProgressStore(path, flush_interval=float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2")))
+
+
+@st.cache_resource
+def get_sandbox():
+    """Shared pool of worker processes that run submissions (one per server process)."""
+    return SandboxPool()
+
+
+start_exporters()  # METRICS_PORT / METRICS_FILE, once per server process
+
+CODING_SOURCE, QUIZ_SOURCE = load_data()
+# This run's snapshot: a reload swaps banks between runs, never in the middle of one
+CODING_BANK, QUIZ_BANK = CODING_SOURCE.current(), QUIZ_SOURCE.current()
+CODING_INDEX, QUIZ_INDEX = CODING_BANK.index, QUIZ_BANK.index
 # -----------------------
 # CONFIGURABLE THEME COLORS (professional palette)
 # -----------------------
@@ -46,111 +90,24 @@ ERROR_TEXT = "#ffe8e2"
 # The first Streamlit call!
 st.set_page_config(page_title="Adaptive Coding & Quiz App", layout="wide")
 
-# Theme / Styling (editable via the constants above)
-st.markdown(
-    f"""
-    <style>
-      /* App & sidebar */
-      .stApp {{ background-color: {APP_BG}; color: {TEXT_COLOR}; }}
-      [data-testid="stSidebar"] {{ background-color: {SIDEBAR_BG}; color: {SIDEBAR_TEXT}; }}
-      [data-testid="stSidebar"] .css-1d391kg {{ color: {SIDEBAR_TEXT}; }} /* header/text fallback */
-
-      /* Generic text color overrides (for some streamlit widgets) */
-      .css-1d391kg, .css-10trblm, .stText, .stMarkdown {{ color: {TEXT_COLOR}; }}
-
-      /* Code & textareas */
-      .stTextArea textarea, .stCodeBlock {{
-          background-color: {CODE_BG} !important;
-          color: {TEXT_COLOR} !important;
-          font-family: 'Courier New', monospace;
-      }}
-
-      /* Headings and accent */
-      .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {{ color: {ACCENT}; }}
-
-      /* Buttons */
-      .stButton>button {{
-          background-color: {BUTTON_BG}; color: white; border-radius: 8px; border: 1px solid {BUTTON_BORDER};
-          padding: 8px 14px; font-weight: 600;
-      }}
-      .stButton>button:hover {{ background-color: {BUTTON_HOVER}; border-color: {BUTTON_BORDER}; color: #ffffff; }}
-
-      /* Inputs / radios / selects (ensure readable text) */
-      .stRadio>div, .stSelectbox>div, .stTextInput>div, .stDropdown>div {{
-          color: {TEXT_COLOR} !important;
-      }}
-
-      /* Score box */
-      .score-box {{
-        padding: 10px;
-        border-radius: 8px;
-        background-color: rgba(255,255,255,0.03);
-        border: 1px solid rgba(255,255,255,0.04);
-        color: {TEXT_COLOR};
-      }}
-
-      /* Card-like container for main panels (subtle) */
-      .main-panel {{
-        padding: 18px;
-        border-radius: 12px;
-        background: linear-gradient(180deg, rgba(255,255,255,0.01), rgba(255,255,255,0.00));
-        border: 1px solid rgba(255,255,255,0.03);
-      }}
-
-      /* Force everything inside main-panel to use TEXT_COLOR for readability */
-      .main-panel, .main-panel * {{
-        color: {TEXT_COLOR} !important;
-      }}
-
-      /* Ensure radio labels and options inside main-panel use TEXT_COLOR */
-      .main-panel .stRadio label,
-      .main-panel .stRadio div,
-      .main-panel .stRadio,
-      .main-panel .css-1dq8tca label,
-      .main-panel .css-1w8ux8s label,
-      .main-panel .stRadio * {{
-        color: {TEXT_COLOR} !important;
-      }}
-
-      /* Custom hint & error boxes */
-      .custom-hint {{
-        background: linear-gradient(180deg, rgba(45,212,191,0.06), rgba(45,212,191,0.02));
-        border-radius: 10px;
-        padding: 14px;
-        margin-top: 16px;
-        border: 1px solid rgba(45,212,191,0.18);
-        color: {HINT_TEXT};
-        line-height: 1.45;
-        box-shadow: 0 8px 24px rgba(0,0,0,0.45);
-      }}
-      .custom-error {{
-        background: linear-gradient(180deg, rgba(249,115,102,0.06), rgba(249,115,102,0.02));
-        border-radius: 10px;
-        padding: 14px;
-        margin-top: 16px;
-        border: 1px solid rgba(249,115,102,0.18);
-        color: {ERROR_TEXT};
-        line-height: 1.45;
-        box-shadow: 0 8px 24px rgba(0,0,0,0.5);
-      }}
-      .custom-hint.small {{ padding: 10px; font-size: 0.95rem; }}
-      .custom-error.small {{ padding: 10px; font-size: 0.95rem; }}
-      .custom-hint a, .custom-hint strong {{ color: #bff6ea; }}
-      .custom-error a, .custom-error strong {{ color: #ffd0c7; }}
-
-      /* Make radio labels in sidebar use sidebar text color */
-      .css-1dq8tca label, .css-1w8ux8s label {{ color: {SIDEBAR_TEXT} !important; }}
-
-      /* Tweak code block font size for readability */
-      .stCodeBlock pre {{ font-size: 14px; }}
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# Theme / Styling: static/style.css, with the constants above filled in
+@st.cache_resource
+def theme_css() -> str:
+    """The theme stylesheet as a <style> tag, built and minified once per process."""
+    with open(os.path.join(os.path.dirname(__file__), "static", "style.css"), encoding="utf-8") as f:
+        css = f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)  # comments
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", re.sub(r"\s+", " ", css)).strip()
+    css = Template(css).substitute(
+        APP_BG=APP_BG, SIDEBAR_BG=SIDEBAR_BG, CODE_BG=CODE_BG, TEXT_COLOR=TEXT_COLOR,
+        SIDEBAR_TEXT=SIDEBAR_TEXT, ACCENT=ACCENT, BUTTON_BG=BUTTON_BG, BUTTON_HOVER=BUTTON_HOVER,
+        BUTTON_BORDER=BUTTON_BORDER, HINT_TEXT=HINT_TEXT, ERROR_TEXT=ERROR_TEXT,
+    )
+    return f"<style>{css}</style>"
 
-# Constants 
-DIFFICULTY_ORDER = ["easy", "medium", "hard"]
 
+with span("theme_css"):
+    st.markdown(theme_css(), unsafe_allow_html=True)
 
 # Utilities
 def ss_init(key: str, default):
@@ -159,55 +116,40 @@ def ss_init(key: str, default):
         st.session_state[key] = default
 
 
-def bump_difficulty(current: str, go_up: bool) -> str:
-    """Increase/decrease difficulty by exactly one step (no skipping)."""
-    idx = DIFFICULTY_ORDER.index(current)
-    if go_up and idx < len(DIFFICULTY_ORDER) - 1:
-        return DIFFICULTY_ORDER[idx + 1]
-    if not go_up and idx > 0:
-        return DIFFICULTY_ORDER[idx - 1]
-    return current
-
-
-def parse_literal(s):
-    """Try to parse a Python literal from text (list/dict/bool/int/etc.). Fallback to raw string."""
-    try:
-        return ast.literal_eval(str(s))
-    except Exception:
-        return s
-
+# Adaptive difficulty: correct answers faster than this earn full credit in the learner model
+CODING_FAST_SECONDS = FAST_SECONDS["coding"]
+QUIZ_FAST_SECONDS = FAST_SECONDS["quiz"]
 
-def next_diff_with_unseen(cur_diff: str, seen_ids_iterable, df: pd.DataFrame):
-    """
-    Return the next difficulty (>= current) that still has unseen questions.
-    If none at or above, wrap and try all. If none at all, return None.
-    seen_ids_iterable can be a list or set.
-    """
-    seen_ids = set(seen_ids_iterable or [])
-    start = DIFFICULTY_ORDER.index(cur_diff)
-
-    # Prefer current or higher difficulty that has unseen questions
-    for i in range(start, len(DIFFICULTY_ORDER)):
-        d = DIFFICULTY_ORDER[i]
-        unseen = df[(df["difficulty"] == d) & (~df["id"].isin(seen_ids))]
-        if not unseen.empty:
-            return d
-
-    # Wrap around (in case datasets changed mid-run)
-    for d in DIFFICULTY_ORDER:
-        unseen = df[(df["difficulty"] == d) & (~df["id"].isin(seen_ids))]
-        if not unseen.empty:
-            return d
 
-    return None
+def advance(mode: str, pos: int):
+    """Move `mode` ("coding"/"quiz") on to its next question at the learner's current level."""
+    st.session_state[f"{mode}_difficulty"], st.session_state[f"{mode}_idx"] = next_position(
+        st.session_state[f"{mode}_learner"], st.session_state[f"{mode}_difficulty"], pos
+    )
 
 
 # Custom display helpers (styled hint/error)
-def show_hint(msg: str, compact: bool = False):
+def show_hint(msg: str, compact: bool = False, target=None):
     """Render a nicely styled hint box using custom CSS (avoids default st.info)."""
     cls = "custom-hint small" if compact else "custom-hint"
     html = f'<div class="{cls}">{msg}</div>'
-    st.markdown(html, unsafe_allow_html=True)
+    (target or st).markdown(html, unsafe_allow_html=True)
+
+
+HINT_POLL_INTERVAL = 0.15  # seconds between refreshes of a streaming hint
+
+
+def show_hint_job(job, compact: bool = False):
+    """
+    Render a background HintJob, refreshing the box as chunks stream in.
+    A new click interrupts this loop at the next refresh; the job keeps running
+    and is picked up again from session state on the next rerun.
+    """
+    box = st.empty()
+    while not job.done:
+        show_hint(job.text or "Generating hint...", compact, target=box)
+        time.sleep(HINT_POLL_INTERVAL)
+    show_hint(job.text, compact, target=box)
 
 
 def show_error(msg: str, compact: bool = False):
@@ -233,85 +175,118 @@ with st.sidebar:
     st.session_state.mode = st.radio("Choose Mode:", ["coding", "quiz"], index=0)
     st.markdown("---")
     st.markdown('<div class="score-box">', unsafe_allow_html=True)
-    st.markdown(f"### Score: **{st.session_state.get('score', 0)}**")
+    SCORE_BOX = st.container()  # filled by the mode panels, which rerun on their own (see show_score)
     st.markdown("</div>", unsafe_allow_html=True)
     st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
     st.markdown("<small style='color:#6b7280;'>Tip: Select 'coding' to solve functions, or 'quiz' for multiple-choice practice.</small>", unsafe_allow_html=True)
 
+#  Session id (kept in the URL so progress survives reconnects and restarts)
+SESSION_ID = st.query_params.get("sid")
+if not SESSION_ID:
+    SESSION_ID = uuid.uuid4().hex
+    st.query_params["sid"] = SESSION_ID
+
+PERSISTED_KEYS = ["score", "coding_difficulty", "coding_idx", "quiz_difficulty", "quiz_idx"]
+
+
+def restore_progress():
+    """Load this session's saved progress into session_state (once per browser session)."""
+    saved = get_progress_store().load(SESSION_ID)
+    if saved is None:
+        return
+    state, seen = saved
+    for key in PERSISTED_KEYS:
+        if key in state:
+            st.session_state[key] = state[key]
+    for mode, index in (("coding", CODING_INDEX), ("quiz", QUIZ_INDEX)):
+        if f"{mode}_learner" in state:
+            st.session_state[f"{mode}_learner"] = LearnerModel(*state[f"{mode}_learner"])
+        if mode in seen:
+            st.session_state[f"{mode}_seen"] = decode_seen(index, seen[mode])
+
+
+def save_progress():
+    """Queue a snapshot for the background writer (cheap; no I/O on the request path)."""
+    state = {key: st.session_state[key] for key in PERSISTED_KEYS}
+    for mode in ("coding", "quiz"):
+        learner = st.session_state[f"{mode}_learner"]
+        state[f"{mode}_learner"] = [learner.rating, learner.answered]
+    get_progress_store().save(
+        SESSION_ID,
+        state,
+        {"coding": (CODING_INDEX, st.session_state.coding_seen.bits), "quiz": (QUIZ_INDEX, st.session_state.quiz_seen.bits)},
+    )
+
+
+if "progress_restored" not in st.session_state:
+    st.session_state.progress_restored = True
+    restore_progress()
+
 #  Session State (safe init) 
 ss_init("score", 0)
 
-# Coding state (use lists for session_state serializability)
-ss_init("coding_difficulty", "easy")
+# Coding state (coding_idx is a cursor into CODING_INDEX positions)
+ss_init("coding_learner", LearnerModel())
+ss_init("coding_difficulty", st.session_state.coding_learner.level())
 ss_init("coding_idx", 0)
-ss_init("coding_seen_ids", [])     # store as list in session_state
+ss_init("coding_seen", SeenSet())  # bitset over CODING_INDEX positions
 ss_init("user_code", "")
 ss_init("code_submitted", False)
 ss_init("coding_start_time", time.time())
-ss_init("hint", "")
+ss_init("hint", None)                # HintJob for the current question
 
 # Quiz state
-ss_init("quiz_difficulty", "easy")
+ss_init("quiz_learner", LearnerModel())
+ss_init("quiz_difficulty", st.session_state.quiz_learner.level())
 ss_init("quiz_idx", 0)
-ss_init("quiz_seen_ids", [])       # store as list in session_state
+ss_init("quiz_seen", SeenSet())    # bitset over QUIZ_INDEX positions
 ss_init("quiz_answered", False)
 ss_init("quiz_feedback", "")
 ss_init("quiz_selected", None)
-ss_init("quiz_hint", "")
+ss_init("quiz_hint", None)           # HintJob for the current question
 ss_init("quiz_start_time", time.time())
 
 # Flash messages
 ss_init("flash_type", "")   # "success" | "error" | ""
 ss_init("flash_msg", "")
 
-# Flash banner (shows once)
-if st.session_state.flash_msg:
-    if st.session_state.flash_type == "success":
-        st.success(st.session_state.flash_msg)
-    elif st.session_state.flash_type == "error":
-        st.error(st.session_state.flash_msg)
-    else:
-        st.info(st.session_state.flash_msg)
-    st.session_state.flash_msg = ""
-    st.session_state.flash_type = ""
+
+def show_flash():
+    """Flash banner (shows once)."""
+    if st.session_state.flash_msg:
+        if st.session_state.flash_type == "success":
+            st.success(st.session_state.flash_msg)
+        elif st.session_state.flash_type == "error":
+            st.error(st.session_state.flash_msg)
+        else:
+            st.info(st.session_state.flash_msg)
+        st.session_state.flash_msg = ""
+        st.session_state.flash_type = ""
+
+
+def show_score():
+    SCORE_BOX.markdown(f"### Score: **{st.session_state.score}**")
 
 
 # =======================================================
 #                   CODING MODE
 # =======================================================
 def render_coding_mode():
-    # Pick a difficulty that still has unseen questions
-    target_diff = next_diff_with_unseen(
+    # Difficulty closest to the current one that still has unseen questions (the cursor
+    # restarts if it had to change), then the first unseen question at/after the cursor
+    difficulty, cursor, pos = pick_question(
+        CODING_INDEX,
         st.session_state.coding_difficulty,
-        st.session_state.coding_seen_ids,
-        CODING_DF,
+        st.session_state.coding_seen,
+        st.session_state.coding_idx,
     )
+    st.session_state.coding_difficulty, st.session_state.coding_idx = difficulty, cursor
 
-    if target_diff is None:
+    if pos is None:
         st.success("You've completed all coding questions!")
         return
 
-    # If we had to move to another difficulty (because current one is exhausted), reset index
-    if target_diff != st.session_state.coding_difficulty:
-        st.session_state.coding_difficulty = target_diff
-        st.session_state.coding_idx = 0
-
-    # Slice unseen questions for this difficulty
-    subset = CODING_DF[
-        (CODING_DF["difficulty"] == st.session_state.coding_difficulty)
-        & (~CODING_DF["id"].isin(set(st.session_state.coding_seen_ids)))
-    ].reset_index(drop=True)
-
-    # Safety check
-    if subset.empty:
-        st.session_state.coding_idx = 0
-        return
-
-    # Clamp index
-    if st.session_state.coding_idx >= len(subset):
-        st.session_state.coding_idx = 0
-
-    row = subset.iloc[st.session_state.coding_idx]
+    row = CODING_BANK.row(pos)
     correct = False  # <<< FIX: initialize correct variable to avoid UnboundLocalError
     current_qid = int(row["id"])
     if "last_coding_qid" not in st.session_state:
@@ -319,7 +294,7 @@ def render_coding_mode():
     if st.session_state.last_coding_qid != current_qid:
         st.session_state.user_code = row.get("template", "")
         st.session_state.code_submitted = False
-        st.session_state.hint = ""
+        st.session_state.hint = None
         st.session_state.last_coding_qid = current_qid
 
 
@@ -354,7 +329,7 @@ def render_coding_mode():
 
     if new_code != st.session_state.user_code:
         st.session_state.user_code = new_code
-        st.session_state.hint = ""
+        st.session_state.hint = None
 
     # Actions
     col1, col2 = st.columns([2, 1])
@@ -365,71 +340,68 @@ def render_coding_mode():
     if submit_pressed:
         st.session_state.code_submitted = True
 
-        # Extract function name safely
-        try:
-            func_name = row.get("template", "").split("def ")[1].split("(")[0].strip()
-        except Exception:
-            func_name = None
-
-        # Parse input/expected
-        test_input = parse_literal(row.get("test_input", ""))
-        expected_output = parse_literal(row.get("expected_output", ""))
-
-        if func_name:
-            # ensure we pass a list of inputs if necessary
-            test_args = test_input if isinstance(test_input, list) else [test_input]
-            correct, _ = evaluate_code(
-                st.session_state.user_code,
-                func_name,
-                test_args,
-                expected_output,
-            )
-        else:
-            correct = False
-        if correct:
-            if int(row["id"]) not in set(st.session_state.coding_seen_ids):
-                st.session_state.coding_seen_ids.append(int(row["id"]))
+        # Static pre-screen first; then compile once and run every test case, stopping at
+        # the first failure. Duplicate (AST-identical) submissions reuse the cached verdict.
+        with span("evaluate"):
+            correct, result = grade_code(row, st.session_state.user_code, get_sandbox())
+        # Passing code is re-run on growing inputs; over its difficulty's budget it fails when enforced
+        report = None
+        if correct and PROFILE_SUBMISSIONS:
+            report = profile_code(row, st.session_state.user_code, get_sandbox())
+        too_slow = ENFORCE_BUDGETS and report is not None and report["within_budget"] is False
+        if correct and not too_slow:
+            CODING_INDEX.mark_seen(st.session_state.coding_seen, row["id"])
 
     # Show success message immediately
             st.success("Correct!")
+            if report is not None:
+                show_hint(performance_note(report), compact=True)
             st.session_state.score += 10
 
-    # Adapt difficulty based on elapsed time
+    # Update the skill estimate (slow answers get partial credit) and adapt difficulty
             elapsed = time.time() - st.session_state.coding_start_time
-            if elapsed < 40:
-                st.session_state.coding_difficulty = bump_difficulty(
-                st.session_state.coding_difficulty, go_up=True
-                )
-                st.session_state.coding_idx = 0
-            else:
-                st.session_state.coding_idx += 1
+            st.session_state.coding_learner.update(
+                st.session_state.coding_difficulty, True, elapsed, CODING_FAST_SECONDS
+            )
+            advance("coding", pos)
+            st.session_state.coding_start_time = time.time()
 
     # Reset code and hint **after feedback is displayed**
             st.session_state.user_code = ""
             st.session_state.code_submitted = False
-            st.session_state.hint = ""
+            st.session_state.hint = None
             st.markdown("</div>", unsafe_allow_html=True)
             return
 
         else:
-            show_error("Incorrect or Error")
+            prescreened = isinstance(result, Diagnosis)
+            if too_slow:
+                show_error("Correct output, but too slow. " + performance_note(report))
+            else:
+                show_error(result.message if prescreened else "Incorrect or Error")
             st.session_state.score -= 5
-            if not st.session_state.hint:
-                with st.spinner("Generating Hint..."):
-                    try:
-                        st.session_state.hint = generate_hint(row.get("description", ""), st.session_state.user_code)
-                    except Exception as e:
-                        st.session_state.hint = f"(hint generation failed: {e})"
-            if st.session_state.hint:
-                show_hint(st.session_state.hint)
+            if st.session_state.hint is None:
+                # Only the first wrong attempt at a question counts against the skill estimate
+                st.session_state.coding_learner.update(st.session_state.coding_difficulty, False)
+                if prescreened:
+                    # Trivial mistakes get the pre-screen's local hint; no LLM call
+                    st.session_state.hint = local_hint(result.hint)
+                elif too_slow:
+                    st.session_state.hint = submit_hint(
+                        performance_question(row, report), st.session_state.user_code, func_name_for(row)
+                    )
+                else:
+                    st.session_state.hint = submit_hint(
+                        row.get("description", ""), st.session_state.user_code, func_name_for(row)
+                    )
+            show_hint_job(st.session_state.hint)
     # Skip handler
     if skip_pressed:
-        if int(row["id"]) not in set(st.session_state.coding_seen_ids):
-            st.session_state.coding_seen_ids.append(int(row["id"]))  # skip still marks as seen
-        st.session_state.coding_idx += 1
+        CODING_INDEX.mark_seen(st.session_state.coding_seen, row["id"])  # skip still marks as seen
+        advance("coding", pos)
         st.session_state.user_code = ""
         st.session_state.code_submitted = False
-        st.session_state.hint = ""
+        st.session_state.hint = None
         st.session_state.coding_start_time = time.time()
         st.markdown("</div>", unsafe_allow_html=True)
         return
@@ -441,33 +413,23 @@ def render_coding_mode():
 #                     QUIZ MODE
 # =======================================================
 def render_quiz_mode():
-    target_diff = next_diff_with_unseen(
+    difficulty, cursor, pos = pick_question(
+        QUIZ_INDEX,
         st.session_state.quiz_difficulty,
-        st.session_state.quiz_seen_ids,
-        QUIZ_DF,
+        st.session_state.quiz_seen,
+        st.session_state.quiz_idx,
     )
+    st.session_state.quiz_difficulty, st.session_state.quiz_idx = difficulty, cursor
 
-    if target_diff is None:
+    if pos is None:
         st.success("You've completed all quiz questions!")
         return
 
-    if target_diff != st.session_state.quiz_difficulty:
-        st.session_state.quiz_difficulty = target_diff
-        st.session_state.quiz_idx = 0
-
-    subset = QUIZ_DF[
-        (QUIZ_DF["difficulty"] == st.session_state.quiz_difficulty)
-        & (~QUIZ_DF["id"].isin(set(st.session_state.quiz_seen_ids)))
-    ].reset_index(drop=True)
-
-    if subset.empty:
-        st.session_state.quiz_idx = 0
-        return
-
-    if st.session_state.quiz_idx >= len(subset):
-        st.session_state.quiz_idx = 0
+    qrow = QUIZ_BANK.row(pos)
 
-    qrow = subset.iloc[st.session_state.quiz_idx]
+    # Warm wrong-answer hints for this question and the likely next one in the background
+    prefetch_question(qrow)
+    prefetch_next(QUIZ_BANK, st.session_state.quiz_seen, st.session_state.quiz_learner.level(), pos + 1)
 
     st.markdown('<div class="main-panel">', unsafe_allow_html=True)
 
@@ -481,8 +443,9 @@ def render_quiz_mode():
     if not isinstance(options, list):
         options = [str(qrow.get("options", ""))]
 
-    # Start/Reset timer for this question
-    if not st.session_state.quiz_answered:
+    # Start the timer when a new question is shown
+    if st.session_state.get("last_quiz_qid") != qrow["id"]:
+        st.session_state.last_quiz_qid = qrow["id"]
         st.session_state.quiz_start_time = time.time()
 
     selected = st.radio(
@@ -501,25 +464,21 @@ def render_quiz_mode():
 
         if selected == correct_answer:
             # Mark seen, score, flash
-            if int(qrow["id"]) not in set(st.session_state.quiz_seen_ids):
-                st.session_state.quiz_seen_ids.append(int(qrow["id"]))
+            QUIZ_INDEX.mark_seen(st.session_state.quiz_seen, qrow["id"])
             st.session_state.flash_type = "success"
             st.session_state.flash_msg = "Correct!"
             st.session_state.score += 10
 
-            # Quick & correct -> raise difficulty by a single step
+            # Update the skill estimate (slow answers get partial credit) and adapt difficulty
             elapsed = time.time() - st.session_state.quiz_start_time
-            if elapsed < 30:
-                st.session_state.quiz_difficulty = bump_difficulty(
-                    st.session_state.quiz_difficulty, go_up=True
-                )
-                st.session_state.quiz_idx = 0
-            else:
-                st.session_state.quiz_idx += 1
+            st.session_state.quiz_learner.update(
+                st.session_state.quiz_difficulty, True, elapsed, QUIZ_FAST_SECONDS
+            )
+            advance("quiz", pos)
 
             # Reset question state
             st.session_state.quiz_answered = False
-            st.session_state.quiz_hint = ""
+            st.session_state.quiz_hint = None
             st.session_state.quiz_selected = None
             st.markdown("</div>", unsafe_allow_html=True)
             return
@@ -527,23 +486,18 @@ def render_quiz_mode():
             # Use custom error/hint displays for clarity
             show_error(f"Incorrect. Correct Answer: **{correct_answer}**")
             st.session_state.score -= 5
+            st.session_state.quiz_learner.update(st.session_state.quiz_difficulty, False)
 
-            if not st.session_state.quiz_hint:
-                with st.spinner("Generating hint..."):
-                    try:
-                        st.session_state.quiz_hint = generate_hint(qrow.get("question", ""), selected)
-                    except Exception as e:
-                        st.session_state.quiz_hint = f"(hint generation failed: {e})"
-            if st.session_state.quiz_hint:
-                show_hint(st.session_state.quiz_hint)
+            if st.session_state.quiz_hint is None:
+                st.session_state.quiz_hint = submit_hint(qrow.get("question", ""), selected)
+            show_hint_job(st.session_state.quiz_hint)
 
     # Next/Skip handler
     if next_q:
-        if int(qrow["id"]) not in set(st.session_state.quiz_seen_ids):
-            st.session_state.quiz_seen_ids.append(int(qrow["id"]))  # mark as seen when skipping
-        st.session_state.quiz_idx += 1
+        QUIZ_INDEX.mark_seen(st.session_state.quiz_seen, qrow["id"])  # mark as seen when skipping
+        advance("quiz", pos)
         st.session_state.quiz_answered = False
-        st.session_state.quiz_hint = ""
+        st.session_state.quiz_hint = None
         st.session_state.quiz_selected = None
         st.session_state.quiz_start_time = time.time()
         st.markdown("</div>", unsafe_allow_html=True)
@@ -552,11 +506,31 @@ def render_quiz_mode():
     st.markdown("</div>", unsafe_allow_html=True)
 
 
+# Each mode's panel is a fragment: its buttons rerun only the panel (plus the score and the
+# progress snapshot), not the whole script with the stylesheet and sidebar
+@st.fragment
+def coding_panel():
+    with span("render_coding"):
+        show_flash()
+        render_coding_mode()
+    show_score()
+    save_progress()
+
+
+@st.fragment
+def quiz_panel():
+    with span("render_quiz"):
+        show_flash()
+        render_quiz_mode()
+    show_score()
+    save_progress()
+
+
 #  Router 
 if st.session_state.mode == "coding":
-    render_coding_mode()
+    coding_panel()
 else:
-    render_quiz_mode()
+    quiz_panel()
 
 
 
@@ -0,0 +1,237 @@
+# batch_hints.py - offline hint generation for a whole cohort's submissions
+"""
+Run:  python batch_hints.py submissions.jsonl -o hints.jsonl [--group-size 4] [--workers 4]
+
+Input is one JSON object per line:
+    {"id": "alice-q3", "question_id": 3, "code": "def ..."}            (coding)
+    {"id": "bob-q7", "mode": "quiz", "question_id": 7, "answer": "..."} (quiz)
+("id" defaults to the line number.) Output is one line per input record:
+    {"id", "mode", "question_id", "hint", "source": "cache" | "batch" | "single"}
+
+Submissions that normalize to the same code (see utils.normalize_code) share
+one hint, and up to --group-size distinct submissions to the same question
+share one multi-part prompt. Groups run --workers at a time through the hint
+governor. Each group's lines are appended and flushed as soon as it finishes,
+so an interrupted run picks up where it stopped when rerun with the same
+output file (records already in it are skipped). Failed hints are not
+written and are retried on the next run.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from gemini_api import FALLBACK_HINT, GOVERNOR, HINT_CACHE, generate_hint, get_backend, hint_key
+from metrics import inc, span
+from prompt_builder import build_batch_prompt, split_batch_response
+from question_bank import open_bank
+from service import MODES, func_name_for
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_records(path: str):
+    """Yield (record_id, record) for each JSON line of `path`; blank lines are skipped."""
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: {e}") from e
+            yield str(record.get("id", lineno)), record
+
+
+def done_ids(path: str) -> set:
+    """Record ids already written to the output file (empty if it doesn't exist yet)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError, TypeError):
+                continue  # not a record (main() ends a partial last line before reading)
+    return done
+
+
+def end_partial_line(path: str):
+    """
+    Make the output file end with a newline before more lines are appended
+    to it: a last line cut short by a crash is truncated away (its records
+    are redone), and a complete one that only lost its newline is terminated.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        start = f.seek(0, os.SEEK_END)
+        if start == 0:
+            return
+        f.seek(start - 1)
+        if f.read(1) == b"\n":
+            return
+        while start > 0:  # find the start of the last line, a block at a time from the end
+            block = min(start, 1 << 16)
+            start -= block
+            f.seek(start)
+            newline = f.read(block).rfind(b"\n")
+            if newline >= 0:
+                start += newline + 1
+                break
+        f.seek(start)
+        try:
+            json.loads(f.read())
+        except ValueError:
+            f.truncate(start)
+        else:
+            f.write(b"\n")
+
+
+class Submission:
+    """One distinct (question, normalized attempt) and the input records that share it."""
+
+    __slots__ = ("mode", "question_id", "question", "attempt", "func_name", "key", "record_ids")
+
+    def __init__(self, mode, question_id, question, attempt, func_name, key):
+        self.mode = mode
+        self.question_id = question_id
+        self.question = question
+        self.attempt = attempt
+        self.func_name = func_name
+        self.key = key
+        self.record_ids = []
+
+
+def collect(records, banks, skip=frozenset()):
+    """
+    Dedupe records into Submissions, keyed by hint key (question text +
+    normalized attempt), in first-seen order. Returns (submissions, errors);
+    errors are (record_id, message) for records that can't be used.
+    """
+    submissions, errors = {}, []
+    for record_id, record in records:
+        if record_id in skip:
+            continue
+        mode = record.get("mode", "coding")
+        if mode not in MODES:
+            errors.append((record_id, f"unknown mode {mode!r}"))
+            continue
+        try:
+            row = banks[mode].get(record["question_id"])
+        except (KeyError, TypeError, ValueError):
+            errors.append((record_id, f"unknown question_id {record.get('question_id')!r}"))
+            continue
+        if mode == "coding":
+            question, attempt, func_name = row.get("description", ""), record.get("code"), func_name_for(row)
+        else:
+            question, attempt, func_name = row.get("question", ""), record.get("answer"), None
+        if not isinstance(attempt, str):
+            errors.append((record_id, "missing " + ("code" if mode == "coding" else "answer")))
+            continue
+        key = hint_key(question, attempt)
+        if key not in submissions:
+            submissions[key] = Submission(mode, row["id"], question, attempt, func_name, key)
+        submissions[key].record_ids.append(record_id)
+    return list(submissions.values()), errors
+
+
+def make_groups(submissions, group_size: int):
+    """Chunks of at most `group_size` submissions, each for a single question."""
+    by_question = {}
+    for sub in submissions:
+        by_question.setdefault((sub.mode, sub.question_id), []).append(sub)
+    return [subs[i:i + group_size] for subs in by_question.values() for i in range(0, len(subs), group_size)]
+
+
+def hint_group(group):
+    """
+    Hints for a group of submissions to one question: one multi-part prompt,
+    split per submission; parts missing from the reply (or a failed call)
+    fall back to one generate_hint call each. Returns [(submission, hint, source)],
+    with hint None when generation failed.
+    """
+    results = []
+    if len(group) > 1:
+        first = group[0]
+        try:
+            with span("batch_hint"):
+                prompt = build_batch_prompt(first.question, [sub.attempt for sub in group], first.func_name)
+                text = GOVERNOR.call(get_backend().generate, prompt)
+            parts = split_batch_response(text, len(group))
+        except Exception as e:
+            inc("hint_errors_total", error=type(e).__name__)
+            parts = [None] * len(group)
+        for sub, part in zip(group, parts):
+            if part is not None:
+                HINT_CACHE.set(sub.key, part)
+                results.append((sub, part, "batch"))
+        inc("batch_hint_parts_total", len(results), result="split")
+        inc("batch_hint_parts_total", len(group) - len(results), result="fallback")
+        group = [sub for sub, part in zip(group, parts) if part is None]
+    for sub in group:
+        hint = generate_hint(sub.question, sub.attempt, sub.func_name)
+        results.append((sub, None if hint == FALLBACK_HINT else hint, "single"))
+    return results
+
+
+def _write(out, sub, hint, source):
+    for record_id in sub.record_ids:
+        line = {"id": record_id, "mode": sub.mode, "question_id": sub.question_id, "hint": hint, "source": source}
+        out.write(json.dumps(line, default=str) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate hints for a file of submissions (JSONL in, JSONL out).")
+    parser.add_argument("input", help="JSONL file of {id, mode?, question_id, code | answer}")
+    parser.add_argument("-o", "--output", default="hints.jsonl", help="JSONL output; rerun with the same file to resume")
+    parser.add_argument("--group-size", type=int, default=4, help="distinct submissions per prompt (1 disables grouping)")
+    parser.add_argument("--workers", type=int, default=4, help="prompts in flight at once")
+    parser.add_argument("--coding-csv", default=os.path.join(APP_DIR, "coding_questions.csv"))
+    parser.add_argument("--quiz-csv", default=os.path.join(APP_DIR, "quiz_questions.csv"))
+    args = parser.parse_args(argv)
+
+    banks = {"coding": open_bank(args.coding_csv), "quiz": open_bank(args.quiz_csv)}
+    end_partial_line(args.output)
+    done = done_ids(args.output)
+    submissions, errors = collect(read_records(args.input), banks, skip=done)
+    for record_id, message in errors:
+        print(f"skipping {record_id}: {message}", file=sys.stderr)
+
+    records = sum(len(sub.record_ids) for sub in submissions)
+    written = failed = 0
+    with open(args.output, "a", encoding="utf-8") as out:
+        pending = []
+        for sub in submissions:
+            hint = HINT_CACHE.get(sub.key)
+            if hint is None:
+                pending.append(sub)
+            else:
+                _write(out, sub, hint, "cache")
+                written += len(sub.record_ids)
+        out.flush()
+        groups = make_groups(pending, max(1, args.group_size))
+        print(f"{len(done)} already done, {records} to do: {len(submissions)} distinct, "
+              f"{len(pending)} uncached in {len(groups)} prompt group(s)")
+
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = [pool.submit(hint_group, group) for group in groups]
+            for finished, future in enumerate(as_completed(futures), 1):
+                for sub, hint, source in future.result():
+                    if hint is None:
+                        failed += len(sub.record_ids)
+                    else:
+                        _write(out, sub, hint, source)
+                        written += len(sub.record_ids)
+                out.flush()
+                print(f"\r{finished}/{len(groups)} groups, {written} written, {failed} failed", end="", flush=True)
+    print(f"\n{written} hint(s) written to {args.output}" + (f"; {failed} failed, rerun to retry" if failed else ""))
+    for bank in banks.values():
+        bank.close()
+    return 1 if failed or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
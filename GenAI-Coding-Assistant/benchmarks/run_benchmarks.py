@@ -0,0 +1,331 @@
+# run_benchmarks.py - benchmarks for the evaluate / selection / parse / hint hot paths and worker startup
+"""
+Usage (from the app folder):
+    python benchmarks/run_benchmarks.py                      # run everything, compare with baseline if present
+    python benchmarks/run_benchmarks.py --quick              # smaller sizes, fewer repeats
+    python benchmarks/run_benchmarks.py --only selection,parse
+    python benchmarks/run_benchmarks.py --only startup --startup-budget-ms 100
+    python benchmarks/run_benchmarks.py --update-baseline    # store this run as the new baseline
+
+Results are written as JSON ({name: {p50_s, p95_s, mean_s, ops_per_s, ...}}).
+A benchmark regresses when its p50 is more than --tolerance slower than the
+baseline. The startup benchmarks also fail when importing the app's modules
+takes longer than --startup-budget-ms, or pulls in a module that should load
+lazily (DEFERRED_MODULES). The exit status is 1 if anything regressed.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from question_index import DIFFICULTY_ORDER, QuestionIndex, SeenSet, next_diff_with_unseen  # noqa: E402
+from utils import evaluate_cases, evaluate_code, parse_literal  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def measure(fn, repeat: int, number: int = 1) -> dict:
+    """Time `number` calls of fn, `repeat` times; report per-call statistics."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return summarize(samples, number)
+
+
+def summarize(samples, number: int = 1) -> dict:
+    """Statistics for per-call timings in seconds (as reported by measure)."""
+    samples = sorted(samples)
+    repeat = len(samples)
+    return {
+        "p50_s": statistics.median(samples),
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_s": statistics.fmean(samples),
+        "ops_per_s": 1.0 / statistics.fmean(samples) if statistics.fmean(samples) else float("inf"),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+# ----------------------------------------------------------------- evaluate
+SMALL_SUBMISSION = "def sum_two(a, b):\n    return a + b\n"
+LOOP_SUBMISSION = "def sum_two(a, b):\n    while True:\n        pass\n"
+ALLOC_SUBMISSION = "def sum_two(a, b):\n    return len(bytearray(1 << 40))\n"
+
+
+def bench_evaluate(results, quick):
+    results["evaluate_code.small"] = measure(
+        lambda: evaluate_code(SMALL_SUBMISSION, "sum_two", [3, 5], 8), repeat=20, number=200
+    )
+    cases = [([i, i], 2 * i) for i in range(50)]
+    results["evaluate_cases.small_50_cases"] = measure(
+        lambda: evaluate_cases(SMALL_SUBMISSION, "sum_two", cases), repeat=20, number=50
+    )
+
+    from sandbox import SandboxPool
+
+    pool = SandboxPool(workers=2, wall_timeout=1.0, cpu_timeout=1, memory_mb=256)
+    try:
+        results["sandbox.small"] = measure(
+            lambda: pool.evaluate_code(SMALL_SUBMISSION, "sum_two", [3, 5], 8), repeat=10, number=20
+        )
+
+        def parallel_small(n=40, threads=4):
+            ts = [
+                threading.Thread(target=lambda: [pool.evaluate_code(SMALL_SUBMISSION, "sum_two", [3, 5], 8)
+                                                 for _ in range(n // threads)])
+                for _ in range(threads)
+            ]
+            [t.start() for t in ts]
+            [t.join() for t in ts]
+
+        results["sandbox.small_x40_4_threads"] = measure(parallel_small, repeat=5)
+        results["sandbox.pathological_alloc"] = measure(
+            lambda: pool.evaluate_code(ALLOC_SUBMISSION, "sum_two", [3, 5], 8), repeat=3
+        )
+        # Each call burns the wall-clock timeout and respawns a worker
+        results["sandbox.pathological_loop"] = measure(
+            lambda: pool.evaluate_code(LOOP_SUBMISSION, "sum_two", [3, 5], 8), repeat=2 if quick else 3
+        )
+    finally:
+        pool.close()
+
+
+# ---------------------------------------------------------------- selection
+def synthetic_index(size: int, seed: int = 0) -> QuestionIndex:
+    rng = random.Random(seed)
+    return QuestionIndex(range(1, size + 1), (rng.choice(DIFFICULTY_ORDER) for _ in range(size)))
+
+
+def bench_selection(results, quick):
+    sizes = [10 ** k for k in range(2, 6 if quick else 7)]
+    for size in sizes:
+        index = synthetic_index(size)
+        seen = SeenSet()
+        rng = random.Random(1)
+        for qid in rng.sample(range(1, size + 1), size // 2):
+            index.mark_seen(seen, qid)
+
+        def select():
+            diff = next_diff_with_unseen("easy", seen, index)
+            return index.next_unseen(diff, seen, size // 3)
+
+        results[f"selection.index.n={size}"] = measure(select, repeat=20, number=100)
+        results[f"selection.build_index.n={size}"] = measure(lambda: synthetic_index(size), repeat=3)
+
+    try:
+        import pandas as pd
+    except ImportError:
+        return
+    # Previous implementation (DataFrame masking + subset slicing), for comparison
+    for size in sizes[:4]:
+        rng = random.Random(0)
+        df = pd.DataFrame({"id": range(1, size + 1),
+                           "difficulty": [rng.choice(DIFFICULTY_ORDER) for _ in range(size)]})
+        seen_ids = set(random.Random(1).sample(range(1, size + 1), size // 2))
+
+        def legacy_select():
+            for d in DIFFICULTY_ORDER:
+                if not df[(df["difficulty"] == d) & (~df["id"].isin(seen_ids))].empty:
+                    break
+            return df[(df["difficulty"] == d) & (~df["id"].isin(seen_ids))].reset_index(drop=True)
+
+        results[f"selection.legacy_dataframe.n={size}"] = measure(legacy_select, repeat=10, number=5)
+
+
+# -------------------------------------------------------------------- parse
+def _raw_literals():
+    """Literal columns exactly as they appear in the question CSVs."""
+    values = []
+    for name, cols in (("coding_questions.csv", ("test_input", "expected_output")), ("quiz_questions.csv", ("options",))):
+        with open(os.path.join(APP_DIR, name), newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                values.extend(row[c] for c in cols)
+    return values
+
+
+def bench_parse(results, quick):
+    values = _raw_literals()
+    results["parse_literal.csv_values"] = measure(lambda: [parse_literal(v) for v in values], repeat=20, number=10)
+    results["parse_literal.options_only"] = measure(
+        lambda: parse_literal("['O(1)', 'O(log n)', 'O(n)', 'O(n log n)']"), repeat=20, number=2000
+    )
+
+
+# --------------------------------------------------------------------- hint
+def bench_hint(results, quick):
+    import gemini_api
+    from governor import RequestGovernor
+    from llm_backends import StubBackend
+
+    gemini_api.set_backend(StubBackend(latency=0.05, jitter=0.01, seed=0))
+    # The app's governor (HINT_RATE=5/s, burst 10) would make these measure token-bucket waits
+    app_governor = gemini_api.GOVERNOR
+    gemini_api.GOVERNOR = RequestGovernor(rate=1e6, burst=10 ** 6, max_in_flight=64, max_queue=1024)
+    try:
+        _bench_hint(results, gemini_api)
+    finally:
+        gemini_api.GOVERNOR = app_governor
+
+
+def _bench_hint(results, gemini_api):
+    gemini_api.HINT_CACHE.clear()
+    counter = iter(range(10 ** 9))
+
+    results["hint.generate.miss"] = measure(
+        lambda: gemini_api.generate_hint(f"question {next(counter)}", "def f():\n    pass"), repeat=10
+    )
+    gemini_api.generate_hint("warm question", "def f():\n    pass")
+    results["hint.generate.hit"] = measure(
+        lambda: gemini_api.generate_hint("warm question", "def f():  # edited\n    pass"), repeat=20, number=100
+    )
+
+    def first_chunk():
+        next(iter(gemini_api.stream_hint(f"stream question {next(counter)}", "x = 1")))
+
+    results["hint.stream.time_to_first_chunk"] = measure(first_chunk, repeat=10)
+
+    def burst(n=50):
+        question = f"burst question {next(counter)}"
+        ts = [threading.Thread(target=gemini_api.generate_hint, args=(question, "x")) for _ in range(n)]
+        [t.start() for t in ts]
+        [t.join() for t in ts]
+
+    results["hint.burst_50_identical"] = measure(burst, repeat=5)
+
+
+# ------------------------------------------------------------------ startup
+# What a worker imports before serving its first page, besides Streamlit itself
+STARTUP_MODULES = (
+    "adaptive_engine", "hint_jobs", "metrics", "prefetch_hints", "prescreen", "progress_store",
+    "question_bank", "question_index", "sandbox", "service", "utils", "verdict_cache",
+)
+# Heavy modules that must only load on first use (hints, metrics server) or not at all
+DEFERRED_MODULES = ("pandas", "dotenv", "google.generativeai", "http.server", "aiohttp")
+
+_STARTUP_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+imported = time.perf_counter()
+from question_bank import open_bank
+banks = [open_bank(os.path.join({app_dir!r}, name)) for name in ("coding_questions.csv", "quiz_questions.csv")]
+opened = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "open_banks_s": opened - imported,
+                   "deferred_loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def _cold_start():
+    """Import the startup modules and open the banks in a fresh interpreter; returns its report."""
+    script = _STARTUP_SCRIPT.format(modules=STARTUP_MODULES, app_dir=APP_DIR, deferred=DEFERRED_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [APP_DIR, os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-c", script], env=env, cwd=APP_DIR, capture_output=True, text=True,
+                         check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(results, quick):
+    runs = [_cold_start() for _ in range(5 if quick else 15)]
+    results["startup.import_modules"] = summarize([run["import_s"] for run in runs])
+    results["startup.open_banks"] = summarize([run["open_banks_s"] for run in runs])
+    results["startup.import_modules"]["deferred_loaded"] = sorted({m for run in runs for m in run["deferred_loaded"]})
+
+
+def check_startup(results, budget_ms: float):
+    """Budget violations for the startup benchmarks, as printable strings."""
+    stats = results.get("startup.import_modules")
+    if stats is None:
+        return []
+    failures = [f"BUDGET startup imported {name} eagerly" for name in stats["deferred_loaded"]]
+    if stats["p50_s"] * 1000 > budget_ms:
+        failures.append(f"BUDGET startup.import_modules: p50 {stats['p50_s'] * 1000:.1f} ms > {budget_ms:.0f} ms")
+    return failures
+
+
+BENCHMARKS = {
+    "evaluate": bench_evaluate,
+    "selection": bench_selection,
+    "parse": bench_parse,
+    "hint": bench_hint,
+    "startup": bench_startup,
+}
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Return [(name, baseline_p50, p50, ratio)] for benchmarks slower than baseline by more than tolerance."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("p50_s"):
+            continue
+        ratio = stats["p50_s"] / base["p50_s"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, base["p50_s"], stats["p50_s"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--only", default="", help="comma-separated subset of: " + ",".join(BENCHMARKS))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--startup-budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "100")),
+                        help="max p50 time to import the app's modules in a fresh interpreter")
+    args = parser.parse_args(argv)
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()] or list(BENCHMARKS)
+    results = {}
+    for name in selected:
+        print(f"running {name} ...", flush=True)
+        BENCHMARKS[name](results, args.quick)
+
+    for name, stats in results.items():
+        print(f"  {name:45s} p50 {stats['p50_s'] * 1e6:12.1f} us   {stats['ops_per_s']:12.1f} ops/s")
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "quick": args.quick, "time": time.time()},
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    failures = check_startup(results, args.startup_budget_ms)
+    for failure in failures:
+        print(failure)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline found; run with --update-baseline to create one")
+        return 1 if failures else 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for name, base, now, ratio in regressions:
+        print(f"REGRESSION {name}: p50 {base * 1e6:.1f} us -> {now * 1e6:.1f} us ({ratio:.2f}x)")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
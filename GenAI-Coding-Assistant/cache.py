@@ -0,0 +1,218 @@
+# cache.py - bounded in-memory LRU/TTL cache with an optional shared tier (SQLite file or cache server socket)
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import inc
+
+logger = logging.getLogger(__name__)
+
+CACHE_SOCKET = os.getenv("CACHE_SOCKET")  # unix socket of a node-local cache_server.py
+
+
+class SQLiteTier:
+    """On-disk key/value tier (JSON values) shared by every process that opens the same file."""
+
+    def __init__(self, path: str, ttl: float = None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and time.time() - row[1] > self.ttl:
+            self.delete(key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+class SocketTier:
+    """
+    Client for cache_server.py over a unix socket: one cache shared by every
+    worker process on the node. Keys live under `namespace`; values are JSON.
+
+    The tier is an optimization, never a dependency: if the server is down
+    or slow, calls behave as misses/no-ops and the socket is retried after
+    `retry_after` seconds.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: float = None, timeout: float = 0.5, retry_after: float = 5.0):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()  # one connection per thread
+        self._down_until = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            conn = self._local.conn = sock.makefile("rwb")
+        return conn
+
+    def _request(self, op: str, **fields):
+        """Send one request; returns the response dict, or None if the server is unavailable."""
+        if time.monotonic() < self._down_until:
+            return None
+        request = json.dumps({"op": op, "ns": self.namespace, **fields}, default=str).encode("utf-8")
+        try:
+            conn = self._connection()
+            conn.write(request + b"\n")
+            conn.flush()
+            line = conn.readline()
+            if not line:
+                raise ConnectionError("cache server closed the connection")
+            return json.loads(line)
+        except (OSError, ValueError) as e:
+            conn = getattr(self._local, "conn", None)
+            self._local.conn = None
+            if conn is not None:
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+            self._down_until = time.monotonic() + self.retry_after
+            logger.warning("cache server at %s unavailable (%s); retrying in %ss", self.path, e, self.retry_after)
+            inc("cache_tier_errors_total", tier="socket")
+            return None
+
+    def get(self, key):
+        response = self._request("get", key=key)
+        return None if response is None else response.get("value")
+
+    def set(self, key, value):
+        self._request("set", key=key, value=value, ttl=self.ttl)
+
+    def delete(self, key):
+        self._request("delete", key=key)
+
+    def clear(self):
+        self._request("clear")
+
+
+def shared_tier(namespace: str, ttl: float = None, sqlite_path: str = None):
+    """
+    Second-level store for an LRUCache: the node's cache server when
+    CACHE_SOCKET is set, else a SQLite file if `sqlite_path` is given, else None.
+    """
+    if CACHE_SOCKET:
+        return SocketTier(CACHE_SOCKET, namespace, ttl=ttl)
+    if sqlite_path:
+        return SQLiteTier(sqlite_path, ttl=ttl)
+    return None
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional per-entry TTL. When `store` is given
+    (e.g. SQLiteTier), misses fall through to it and writes go to both tiers.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, store=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def _put(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        value = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self._put(key, value)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._put(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        """Presence check that doesn't touch hit/miss counters or LRU order."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                return True
+        return self.store is not None and self.store.get(key) is not None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,115 @@
+# cache_server.py - node-local cache shared by every app/API worker process over a unix socket
+"""
+Run:  python cache_server.py --socket /tmp/genai-cache.sock [--size 100000]
+then start each worker on the node with CACHE_SOCKET=/tmp/genai-cache.sock.
+
+Generated hints and grading verdicts go through it (cache.SocketTier), so a
+hint or verdict computed by one worker is a hit for all of them and adding
+workers doesn't multiply LLM calls. Each worker keeps its own small LRU in
+front of it. Question data needs no server: the .qbank files are memory
+mapped, so their pages are already shared by every process on the node.
+
+Protocol: one JSON object per line, each answered by one line:
+    {"op": "get", "ns": ns, "key": k}                          -> {"value": v | null}
+    {"op": "set", "ns": ns, "key": k, "value": v, "ttl": s}    -> {"ok": true}
+    {"op": "delete", "ns": ns, "key": k} / {"op": "clear", "ns": ns} -> {"ok": true}
+    {"op": "stats"}                                            -> {"stats": {ns: {...}}}
+"""
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+from cache import LRUCache
+
+DEFAULT_SOCKET = os.getenv("CACHE_SOCKET", "/tmp/genai-cache.sock")
+
+
+class CacheStore:
+    """One LRUCache per namespace; entries carry their own wall-clock expiry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, ns: str) -> LRUCache:
+        with self._lock:
+            cache = self._namespaces.get(ns)
+            if cache is None:
+                cache = self._namespaces[ns] = LRUCache(maxsize=self.maxsize)
+            return cache
+
+    def handle(self, request: dict) -> dict:
+        op, ns = request.get("op"), str(request.get("ns", ""))
+        if op == "get":
+            entry = self._cache(ns).get(request["key"])
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                self._cache(ns).delete(request["key"])
+                entry = None
+            return {"value": None if entry is None else entry[0]}
+        if op == "set":
+            ttl = request.get("ttl")
+            self._cache(ns).set(request["key"], (request.get("value"), time.time() + ttl if ttl else None))
+            return {"ok": True}
+        if op == "delete":
+            self._cache(ns).delete(request["key"])
+            return {"ok": True}
+        if op == "clear":
+            self._cache(ns).clear()
+            return {"ok": True}
+        if op == "stats":
+            with self._lock:
+                namespaces = dict(self._namespaces)
+            return {"stats": {name: cache.stats() for name, cache in namespaces.items()}}
+        return {"error": f"unknown op {op!r}"}
+
+
+class CacheRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.store.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class CacheServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, maxsize: int):
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from a previous run
+        super().__init__(path, CacheRequestHandler)
+        os.chmod(path, 0o660)
+        self.store = CacheStore(maxsize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Node-local hint/verdict cache shared by app workers.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="unix socket path (CACHE_SOCKET for workers)")
+    parser.add_argument("--size", type=int, default=int(os.getenv("CACHE_SERVER_SIZE", "100000")),
+                        help="max entries per namespace")
+    args = parser.parse_args(argv)
+
+    server = CacheServer(args.socket, args.size)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # clean up the socket on `kill` too
+    print(f"cache server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,158 @@
-import google.generativeai as genai
+import logging
 import os
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
-# Securely fetching the API key
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+from cache import LRUCache, shared_tier
+from governor import GovernorRejected, RequestGovernor, SingleFlight
+from llm_backends import backend_from_env
+from metrics import inc, register_collector, span
+from prompt_builder import build_prompt as build_compact_prompt
+from utils import code_fingerprint, normalize_code
 
-genai.configure(api_key=GOOGLE_API_KEY)
+logger = logging.getLogger(__name__)
 
-model = genai.GenerativeModel("gemini-1.5-flash")
+# LLM backend (Gemini by default, see llm_backends.backend_from_env); created on first use, so
+# processes that never ask for a hint never import dotenv or the Gemini SDK
+_backend = None
+_backend_lock = threading.Lock()
 
-def generate_hint(question, user_code):
-    prompt = f"""
-You are a coding tutor. A student is trying to solve the following problem:
 
-{question}
+def _load_dotenv():
+    """Read .env (GOOGLE_API_KEY, GEMINI_MODEL, HINT_BACKEND, ...) if python-dotenv is installed."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:  # optional: the settings can come from the environment alone (e.g. stub runs)
+        logger.debug("python-dotenv not installed; not reading .env")
+        return
+    load_dotenv()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _load_dotenv()
+                _backend = backend_from_env()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the backend used for hints (e.g. a StubBackend for offline load tests)."""
+    global _backend
+    _backend = backend
+
+
+# Hint cache: in-memory LRU, backed by the node's cache server (CACHE_SOCKET) so all workers share
+# hints, or by SQLite (HINT_CACHE_PATH) so they survive restarts
+HINT_CACHE_TTL = float(os.getenv("HINT_CACHE_TTL", "86400"))
+HINT_CACHE_PATH = os.getenv("HINT_CACHE_PATH")
+HINT_CACHE = LRUCache(
+    maxsize=int(os.getenv("HINT_CACHE_SIZE", "4096")),
+    ttl=HINT_CACHE_TTL,
+    store=shared_tier("hint", HINT_CACHE_TTL, HINT_CACHE_PATH),
+)
+
+
+# Admission control for upstream calls (rate limit, in-flight cap, retries, circuit breaker)
+GOVERNOR = RequestGovernor(
+    rate=float(os.getenv("HINT_RATE", "5")),
+    burst=int(os.getenv("HINT_BURST", "10")),
+    max_in_flight=int(os.getenv("HINT_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("HINT_MAX_QUEUE", "64")),
+    retries=int(os.getenv("HINT_RETRIES", "3")),
+)
+
+# Identical concurrent requests (same hint key) share one upstream call
+IN_FLIGHT = SingleFlight()
+
+register_collector("hint_cache", HINT_CACHE.stats)
+register_collector("hint_governor", GOVERNOR.metrics)
+register_collector("hint_singleflight", IN_FLIGHT.metrics)
+
+# Served (never cached) when the upstream call is rejected or fails
+FALLBACK_HINT = (
+    "Hints are temporarily unavailable. Re-read the problem statement, trace your code "
+    "by hand on the example input, and check edge cases such as empty or single-element inputs."
+)
+
+
+def hint_key(question, user_code):
+    """Cache key: question text + AST-normalized submission (or quiz option)."""
+    return code_fingerprint(question, normalize_code(user_code))
+
+
+def _count_tokens(text):
+    """Exact token count for prompt calibration: background priority, so it's shed when hints need the capacity."""
+    return GOVERNOR.call_background(get_backend().count_tokens, text)
+
+
+def build_prompt(question, user_code, func_name=None):
+    """Compacted, token-budgeted prompt (see prompt_builder)."""
+    count_tokens = _count_tokens if hasattr(get_backend(), "count_tokens") else None
+    return build_compact_prompt(question, user_code, func_name=func_name, count_tokens=count_tokens)
+
+
+def _fetch_hint(key, question, user_code, stream, func_name=None, background=False):
+    """Single upstream hint request (run once per key by IN_FLIGHT); caches the result."""
+    prompt = build_prompt(question, user_code, func_name)
+    if background:
+        hint = GOVERNOR.call_background(get_backend().generate, prompt)
+        yield hint
+    elif stream:
+        parts = []
+        for chunk in GOVERNOR.stream(get_backend().stream, prompt):
+            parts.append(chunk)
+            yield chunk
+        hint = "".join(parts)
+    else:
+        hint = GOVERNOR.call(get_backend().generate, prompt)
+        yield hint
+    HINT_CACHE.set(key, hint)
+
+
+def generate_hint(question, user_code, func_name=None, background=False):
+    """
+    Hint for a wrong submission (or quiz option); `func_name` is the graded
+    function, if known. Background (speculative) requests only use spare
+    upstream capacity and return FALLBACK_HINT when there is none.
+    """
+    with span("generate_hint"):
+        key = hint_key(question, user_code)
+        hint = HINT_CACHE.get(key)
+        if hint is not None:
+            inc("hint_cache_total", result="hit")
+            return hint
+        inc("hint_cache_total", result="miss")
+        try:
+            if background:
+                # Not coalesced: a shed background leader would hand its rejection to interactive followers
+                return "".join(_fetch_hint(key, question, user_code, False, func_name, background=True))
+            return "".join(IN_FLIGHT.stream(key, _fetch_hint, key, question, user_code, False, func_name))
+        except Exception as e:
+            if isinstance(e, GovernorRejected) and e.reason == "shed":
+                inc("hint_prefetch_total", result="shed")  # no spare capacity; not an error
+                return FALLBACK_HINT
+            logger.warning("hint generation failed: %s", e)
+            inc("hint_errors_total", error=type(e).__name__)
+            return FALLBACK_HINT
 
-They submitted this code:
-{user_code}
 
-Please provide constructive feedback or a hint without giving the full answer.
-"""
+def stream_hint(question, user_code, func_name=None):
+    """Yield hint text as it streams in. Cached hints are yielded in one piece."""
+    key = hint_key(question, user_code)
+    hint = HINT_CACHE.get(key)
+    if hint is not None:
+        inc("hint_cache_total", result="hit")
+        yield hint
+        return
+    inc("hint_cache_total", result="miss")
+    streamed = False
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        for chunk in IN_FLIGHT.stream(key, _fetch_hint, key, question, user_code, True, func_name):
+            streamed = True
+            yield chunk
     except Exception as e:
-        return f"Error generating feedback: {e}"
+        logger.warning("hint streaming failed: %s", e)
+        inc("hint_errors_total", error=type(e).__name__)
+        yield "\n\n(The hint was cut short, please try again.)" if streamed else FALLBACK_HINT
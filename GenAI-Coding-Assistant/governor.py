@@ -0,0 +1,356 @@
+# governor.py - client-side admission control for upstream LLM calls
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "GatewayTimeout",
+}
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Quota, timeout and transient server errors are worth retrying; bad requests are not."""
+    flag = getattr(exc, "retryable", None)
+    if flag is not None:
+        return bool(flag)
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class GovernorRejected(Exception):
+    """The call was not sent upstream (circuit open, queue full or rate limit wait timed out)."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"request rejected: {reason}")
+        self.reason = reason
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None, keep: float = 0) -> bool:
+        """Take one token, waiting up to `timeout` seconds; `keep` tokens must stay in the bucket afterwards."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1 + keep:
+                    self._tokens -= 1
+                    return True
+                wait = (1 + keep - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    A trial that never reports back is abandoned after another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and (
+                self._trial_started is None or time.monotonic() - self._trial_started >= self.reset_timeout
+            ):
+                self._trial_started = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_started = None
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RequestGovernor:
+    """
+    Wraps upstream calls with a circuit breaker, a bounded wait queue, a
+    max-in-flight semaphore, a token-bucket rate limit and jittered
+    exponential retries on retryable errors.
+
+    Background calls (call_background, e.g. hint prefetching) never wait and
+    never retry: they are shed unless the circuit is closed, nothing is
+    queued, and `background_reserve` slots and half the burst stay free for
+    interactive calls.
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_in_flight: int = 8,
+        max_queue: int = 64,
+        acquire_timeout: float = 10.0,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        breaker: CircuitBreaker = None,
+        background_reserve: int = None,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight
+        self.background_reserve = max_in_flight // 2 if background_reserve is None else background_reserve
+        self.breaker = breaker or CircuitBreaker()
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected_circuit_open": 0,
+                         "rejected_queue_full": 0, "rejected_timeout": 0, "rejected_shed": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _reject(self, reason: str):
+        self._count(f"rejected_{reason}")
+        raise GovernorRejected(reason)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @contextmanager
+    def slot(self):
+        """Admission only (no retries): hold one in-flight slot for the duration of the block."""
+        if not self.breaker.allow():
+            self._reject("circuit_open")
+        with self._lock:
+            if self.queue_depth >= self.max_queue:
+                self.counters["rejected_queue_full"] += 1
+                raise GovernorRejected("queue_full")
+            self.queue_depth += 1
+        deadline = time.monotonic() + self.acquire_timeout
+        try:
+            got_slot = self._slots.acquire(timeout=self.acquire_timeout)
+            if got_slot and not self.bucket.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self._slots.release()
+                got_slot = False
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+        if not got_slot:
+            self._reject("timeout")
+        with self._lock:
+            self.in_flight += 1
+            self.counters["calls"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def has_spare_capacity(self) -> bool:
+        """Whether a background call would be admitted right now (see the class docstring)."""
+        if self.breaker.state != "closed":
+            return False
+        with self._lock:
+            return self.queue_depth == 0 and self.in_flight < self.max_in_flight - self.background_reserve
+
+    @contextmanager
+    def background_slot(self):
+        """Admission for background work: take a slot and a token now, or raise GovernorRejected("shed")."""
+        if not self.has_spare_capacity() or not self.bucket.acquire(timeout=0, keep=self.bucket.capacity / 2):
+            self._reject("shed")
+        if not self._slots.acquire(blocking=False):
+            self._reject("shed")
+        with self._lock:
+            self.in_flight += 1
+            self.counters["calls"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def call_background(self, func, *args, **kwargs):
+        """Run func only if there is spare capacity (no waiting, no retries); else raise GovernorRejected."""
+        with self.background_slot():
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                self._count("failures")
+                raise
+        self.breaker.record_success()
+        return result
+
+    def call(self, func, *args, **kwargs):
+        """Run func under admission control, retrying retryable errors with backoff."""
+        attempt = 0
+        while True:
+            try:
+                with self.slot():
+                    result = func(*args, **kwargs)
+                self.breaker.record_success()
+                return result
+            except GovernorRejected:
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()  # only upstream health problems trip the breaker
+                if not retryable or attempt >= self.retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+
+    def stream(self, func, *args, **kwargs):
+        """Like call() for generator functions; retries only happen before the first chunk."""
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self.slot():
+                    for chunk in func(*args, **kwargs):
+                        started = True
+                        yield chunk
+                self.breaker.record_success()
+                return
+            except GovernorRejected:
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                if started or not retryable or attempt >= self.retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.counters, queue_depth=self.queue_depth, in_flight=self.in_flight,
+                        circuit=self.breaker.state)
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent callers with the same key share one
+    in-flight call. The first caller (leader) runs the generator function;
+    followers replay its chunks as they arrive and see the same error, if any.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def stream(self, key, func, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if leader:
+            return self._lead(key, flight, func(*args, **kwargs))
+        return self._follow(flight)
+
+    def _finish(self, key, flight, error=None):
+        with self._lock:
+            self._flights.pop(key, None)
+        with flight.cond:
+            flight.error = error
+            flight.done = True
+            flight.cond.notify_all()
+
+    def _lead(self, key, flight, chunks):
+        try:
+            for chunk in chunks:
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                yield chunk
+        except GeneratorExit:
+            self._finish(key, flight, RuntimeError("shared request abandoned by its leader"))
+            raise
+        except BaseException as e:
+            self._finish(key, flight, e)
+            raise
+        self._finish(key, flight)
+
+    @staticmethod
+    def _follow(flight):
+        i = 0
+        while True:
+            with flight.cond:
+                while i >= len(flight.chunks) and not flight.done:
+                    flight.cond.wait()
+                pending = flight.chunks[i:]
+                done, error = flight.done, flight.error
+            yield from pending
+            i += len(pending)
+            if done and i >= len(flight.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._flights)}
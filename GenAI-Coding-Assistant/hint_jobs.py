@@ -0,0 +1,51 @@
+# hint_jobs.py - background hint generation shared by all sessions of a server process
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from gemini_api import stream_hint
+
+HINT_WORKERS = int(os.getenv("HINT_WORKERS", "8"))
+
+EXECUTOR = ThreadPoolExecutor(max_workers=HINT_WORKERS, thread_name_prefix="hint")
+
+
+class HintJob:
+    """A hint being generated in the background; `text` grows as chunks stream in."""
+
+    def __init__(self, question, user_code, func_name=None):
+        self.question = question
+        self.user_code = user_code
+        self.func_name = func_name
+        self.chunks = []
+        self.future = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def _run(self):
+        try:
+            for chunk in stream_hint(self.question, self.user_code, self.func_name):
+                self.chunks.append(chunk)
+        except Exception as e:
+            self.chunks.append(f"(hint generation failed: {e})")
+
+
+def submit_hint(question, user_code, func_name=None) -> HintJob:
+    """Start generating a hint on the shared executor and return its job handle."""
+    job = HintJob(question, user_code, func_name)
+    job.future = EXECUTOR.submit(job._run)
+    return job
+
+
+def local_hint(text: str) -> HintJob:
+    """An already finished job holding a locally generated hint (e.g. a pre-screen diagnosis)."""
+    job = HintJob(None, None)
+    job.chunks.append(text)
+    job.future = Future()
+    job.future.set_result(None)
+    return job
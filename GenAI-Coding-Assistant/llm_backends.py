@@ -0,0 +1,136 @@
+# llm_backends.py - LLM backends behind generate_hint (Gemini + local stub for offline load tests)
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from typing import Iterator, Protocol
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+
+class LLMBackend(Protocol):
+    def generate(self, prompt: str) -> str:
+        ...
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        ...
+
+    def count_tokens(self, text: str) -> int:
+        ...
+
+
+class GeminiBackend:
+    """Google Gemini via google.generativeai (imported and configured on construction)."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, api_key: str = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+    def count_tokens(self, text: str) -> int:
+        return self.model.count_tokens(text).total_tokens
+
+
+class StubBackendError(Exception):
+    """Simulated upstream failure raised by StubBackend."""
+
+    retryable = True
+
+
+class StubBackend:
+    """
+    Local stand-in with no network. Latency is drawn from a seeded distribution
+    ("normal", "uniform" or "exponential") with mean `latency` and spread
+    `jitter` seconds; `error_rate` of the calls raise StubBackendError. The
+    hint text depends only on the prompt, so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.1,
+        error_rate: float = 0.0,
+        distribution: str = "normal",
+        chunks: int = 4,
+        seed: int = 0,
+    ):
+        if distribution not in ("normal", "uniform", "exponential"):
+            raise ValueError(f"unknown latency distribution: {distribution}")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.distribution = distribution
+        self.chunks = max(1, chunks)
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        """Return (delay, fail) for one call."""
+        with self._lock:
+            self.calls += 1
+            if self.distribution == "normal":
+                delay = self._rng.gauss(self.latency, self.jitter)
+            elif self.distribution == "uniform":
+                delay = self._rng.uniform(self.latency - self.jitter, self.latency + self.jitter)
+            else:
+                delay = self._rng.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+            fail = self._rng.random() < self.error_rate
+        return max(0.0, delay), fail
+
+    @staticmethod
+    def _text(prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        hint = f"[stub hint {digest}] Re-read the problem statement and check your edge cases."
+        # Multi-part (batch) prompts get one "### Submission N" section per part, like a real model
+        parts = re.findall(r"^### Submission (\d+)$", prompt, re.MULTILINE)
+        if parts:
+            return "\n\n".join(f"### Submission {n}\n{hint} (part {n})" for n in parts)
+        return hint
+
+    def count_tokens(self, text: str) -> int:
+        """Rough tokenizer stand-in: words and punctuation marks (no latency, never fails)."""
+        return len(re.findall(r"\w+|[^\w\s]", text))
+
+    def generate(self, prompt: str) -> str:
+        delay, fail = self._sample()
+        time.sleep(delay)
+        if fail:
+            raise StubBackendError("simulated upstream error (429 resource exhausted)")
+        return self._text(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        delay, fail = self._sample()
+        text = self._text(prompt)
+        step = -(-len(text) // self.chunks)
+        for i in range(0, len(text), step):
+            time.sleep(delay / self.chunks)
+            if fail:
+                raise StubBackendError("simulated upstream error (429 resource exhausted)")
+            yield text[i:i + step]
+
+
+def backend_from_env() -> LLMBackend:
+    """HINT_BACKEND=gemini (default) or stub; STUB_* variables tune the stub."""
+    kind = os.getenv("HINT_BACKEND", "gemini").lower()
+    if kind == "stub":
+        return StubBackend(
+            latency=float(os.getenv("STUB_LATENCY", "0.5")),
+            jitter=float(os.getenv("STUB_JITTER", "0.1")),
+            error_rate=float(os.getenv("STUB_ERROR_RATE", "0")),
+            distribution=os.getenv("STUB_DISTRIBUTION", "normal"),
+            seed=int(os.getenv("STUB_SEED", "0")),
+        )
+    if kind == "gemini":
+        return GeminiBackend(os.getenv("GEMINI_MODEL", DEFAULT_MODEL), api_key=os.getenv("GOOGLE_API_KEY"))
+    raise ValueError(f"unknown HINT_BACKEND: {kind}")
@@ -0,0 +1,341 @@
+# loadgen.py - headless load generator: simulated learners driving the app's selection/grading/hint paths
+"""
+Usage (from the app folder):
+    python loadgen.py --learners 2000 --duration 60
+    python loadgen.py --learners 200 --steps 20 --quiz-share 0.5 --correct-rate 0.7 --json report.json
+
+Each simulated learner has a hidden skill rating and walks the same flow as
+app.py without Streamlit: pick a level (adaptive_engine.select_level) and the
+next unseen question (QuestionIndex.next_unseen), "think" for a sampled answer
+time, answer, get graded (service.grade_code: pre-screen, verdict cache and
+SandboxPool, as in the app) and ask for a hint (gemini_api.generate_hint
+against the stub backend) after a wrong answer that the pre-screen didn't
+already explain. Correct coding answers are synthesized from the question's test
+cases; wrong ones are runnable functions returning a wrong constant (one of
+WRONG_VARIANTS per question), so they get past the pre-screen and exercise
+the sandbox and code-hint paths.
+
+Hints go through the same rate limiter as the app (HINT_RATE etc.), so raise
+those limits when the goal is to load the rest of the system.
+"""
+import argparse
+import json
+import math
+import os
+import queue
+import random
+import resource
+import sys
+import threading
+import time
+
+import gemini_api
+from adaptive_engine import LEVEL_RATINGS, LearnerModel, expected_score, select_level
+from llm_backends import StubBackend
+from question_bank import open_bank
+from prescreen import Diagnosis
+from question_index import SeenSet
+from sandbox import SandboxPool
+from service import FAST_SECONDS, func_name_for, grade_code
+from utils import evaluate_cases, question_test_cases
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPONENTS = ("select", "evaluate", "hint")
+PATHOLOGICAL_CODE = "def {name}(*args):\n    n = 0\n    while True:\n        n += 1\n    return n\n"
+WRONG_CODE = "def {name}(*args):\n    return {value!r}\n"
+WRONG_VARIANTS = 8  # distinct wrong submissions per question, so verdict/hint caches don't absorb all of them
+
+
+def solution_for(row, func_name: str) -> str:
+    """A submission that passes the question's test cases (answers looked up by argument tuple)."""
+    answers = {}
+    for test_input, expected in question_test_cases(row):
+        args = tuple(test_input) if isinstance(test_input, list) else (test_input,)
+        answers[repr(args)] = expected
+    return f"def {func_name}(*args, _answers={answers!r}):\n    return _answers[repr(args)]\n"
+
+
+def sample_think_time(rng: random.Random, mean: float, distribution: str) -> float:
+    if mean <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "lognormal":
+        sigma = 0.75
+        return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    return rng.expovariate(1.0 / mean)
+
+
+class Stats:
+    """Per-component latency samples and thread CPU time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {c: [] for c in COMPONENTS}
+        self.cpu = {c: 0.0 for c in COMPONENTS}
+        self.outcomes = {}
+        self.steps = 0
+
+    def record(self, component: str, seconds: float, cpu_seconds: float):
+        with self._lock:
+            self.latencies[component].append(seconds)
+            self.cpu[component] += cpu_seconds
+
+    def outcome(self, name: str):
+        with self._lock:
+            self.outcomes[name] = self.outcomes.get(name, 0) + 1
+            self.steps += 1
+
+    def timed(self, component: str, func, *args):
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            return func(*args)
+        finally:
+            self.record(component, time.perf_counter() - start, time.thread_time() - cpu_start)
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class SimulatedLearner:
+    def __init__(self, learner_id: int, skill: float, rng: random.Random):
+        self.id = learner_id
+        self.skill = skill
+        self.rng = rng
+        self.models = {"coding": LearnerModel(), "quiz": LearnerModel()}
+        self.seen = {"coding": SeenSet(), "quiz": SeenSet()}
+        self.cursor = {"coding": 0, "quiz": 0}
+        self.steps = 0
+        self.finished = False
+        self.answer_time = 0.0  # seconds spent on the current question (sampled when it's scheduled)
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.stats = Stats()
+        self.banks = {
+            "coding": open_bank(os.path.join(APP_DIR, "coding_questions.csv")),
+            "quiz": open_bank(os.path.join(APP_DIR, "quiz_questions.csv")),
+        }
+        self.pool = None if args.no_sandbox else SandboxPool(workers=args.sandbox_workers)
+        gemini_api.set_backend(
+            StubBackend(latency=args.hint_latency, jitter=args.hint_latency / 4, error_rate=args.hint_error_rate,
+                        seed=args.seed)
+        )
+
+    def evaluate_cases(self, code, func_name, cases):
+        """Sandbox interface for service.grade_code: the pool, or in-process with --no-sandbox."""
+        if self.pool is not None:
+            return self.pool.evaluate_cases(code, func_name, cases)
+        return evaluate_cases(code, func_name, cases)
+
+    def answers_correctly(self, learner: SimulatedLearner, level: str) -> bool:
+        if self.args.correct_rate is not None:
+            p = self.args.correct_rate
+        else:
+            p = expected_score(learner.skill, LEVEL_RATINGS[level])
+        return learner.rng.random() < p
+
+    def step(self, learner: SimulatedLearner):
+        """One question for one learner: select, answer, grade, hint on failure."""
+        mode = "quiz" if learner.rng.random() < self.args.quiz_share else "coding"
+        bank, model, seen = self.banks[mode], learner.models[mode], learner.seen[mode]
+
+        def select():
+            level = select_level(model.level(), seen, bank.index)
+            return level, None if level is None else bank.index.next_unseen(level, seen, learner.cursor[mode])
+
+        level, pos = self.stats.timed("select", select)
+        if pos is None:
+            learner.finished = True
+            self.stats.outcome("exhausted")
+            return
+        row = bank.row(pos)
+        correct = self.answers_correctly(learner, level)
+
+        if mode == "quiz":
+            options = row.get("options") if isinstance(row.get("options"), list) else []
+            wrong = [o for o in options if o != row.get("correct_answer")]
+            answer = row.get("correct_answer") if correct or not wrong else learner.rng.choice(wrong)
+            passed = answer == row.get("correct_answer")
+            hint_args = (row.get("question", ""), answer)
+        else:
+            func_name = func_name_for(row)
+            if learner.rng.random() < self.args.pathological_rate:
+                code = PATHOLOGICAL_CODE.format(name=func_name)
+            elif correct and func_name:
+                code = solution_for(row, func_name)
+            elif func_name:
+                code = WRONG_CODE.format(name=func_name, value=f"wrong answer {learner.rng.randrange(WRONG_VARIANTS)}")
+            else:
+                code = row.get("template", "")
+            passed, result = self.stats.timed("evaluate", grade_code, row, code, self)
+            # Pre-screen rejections come with a local hint, as in the app
+            hint_args = None if isinstance(result, Diagnosis) else (row.get("description", ""), code, func_name)
+
+        model.update(level, passed, learner.answer_time, FAST_SECONDS[mode])
+        if passed:
+            bank.index.mark_seen(seen, row["id"])
+            learner.cursor[mode] = pos + 1
+            self.stats.outcome(f"{mode}_correct")
+        else:
+            if hint_args is not None:
+                self.stats.timed("hint", gemini_api.generate_hint, *hint_args)
+            if learner.rng.random() < self.args.skip_rate:
+                bank.index.mark_seen(seen, row["id"])
+                learner.cursor[mode] = pos + 1
+            self.stats.outcome(f"{mode}_wrong")
+        learner.steps += 1
+
+    def run(self):
+        args = self.args
+        rng = random.Random(args.seed)
+        learners = [
+            SimulatedLearner(i, rng.gauss(args.skill_mean, args.skill_sd), random.Random(args.seed * 100003 + i))
+            for i in range(args.learners)
+        ]
+        # Sessions wait on a shared schedule ordered by their next "answer" time;
+        # `concurrency` threads stand in for the server's request threads.
+        schedule = queue.PriorityQueue()
+        start = time.monotonic()
+        deadline = start + args.duration if args.duration else None
+        for learner in learners:
+            delay = rng.uniform(0, args.ramp_up) if args.ramp_up else 0.0
+            learner.answer_time = sample_think_time(learner.rng, args.think_mean, args.think_distribution)
+            schedule.put((start + delay + learner.answer_time * args.time_scale, learner.id, learner))
+
+        def worker():
+            while True:
+                try:
+                    due, _, learner = schedule.get(timeout=0.2)
+                except queue.Empty:
+                    if schedule.unfinished_tasks == 0:
+                        return
+                    continue
+                try:
+                    if deadline is not None and due >= deadline:
+                        continue
+                    wait = due - time.monotonic()
+                    if wait > 0:
+                        time.sleep(wait)
+                    try:
+                        self.step(learner)
+                    except Exception as e:
+                        self.stats.outcome(f"error_{type(e).__name__}")
+                    done = learner.finished or (args.steps and learner.steps >= args.steps)
+                    if not done:
+                        learner.answer_time = sample_think_time(learner.rng, args.think_mean, args.think_distribution)
+                        schedule.put((time.monotonic() + learner.answer_time * args.time_scale, learner.id, learner))
+                finally:
+                    schedule.task_done()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.monotonic() - start
+        sandbox_usage = {}
+        if self.pool is not None:
+            # The workers are forkserver children, invisible to RUSAGE_CHILDREN; the pool
+            # keeps their totals from /proc (zeros elsewhere), including workers it stopped
+            self.pool.close()
+            sandbox_usage = self.pool.usage()
+        return self.report(wall, sandbox_usage)
+
+    def report(self, wall: float, sandbox_usage: dict = None) -> dict:
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        sandbox_usage = sandbox_usage or {}
+        components = {}
+        for name in COMPONENTS:
+            values = sorted(self.stats.latencies[name])
+            components[name] = {
+                "count": len(values),
+                "per_s": len(values) / wall if wall else 0.0,
+                "mean_s": sum(values) / len(values) if values else 0.0,
+                "p50_s": percentile(values, 0.50),
+                "p99_s": percentile(values, 0.99),
+                "max_s": values[-1] if values else 0.0,
+                "thread_cpu_s": self.stats.cpu[name],
+            }
+        return {
+            "config": vars(self.args),
+            "wall_s": wall,
+            "steps": self.stats.steps,
+            "steps_per_s": self.stats.steps / wall if wall else 0.0,
+            "outcomes": self.stats.outcomes,
+            "components": components,
+            "resources": {
+                "cpu_user_s": self_usage.ru_utime,
+                "cpu_system_s": self_usage.ru_stime,
+                "max_rss_kb": self_usage.ru_maxrss,
+                "sandbox_cpu_user_s": sandbox_usage.get("cpu_user_s", 0.0),
+                "sandbox_cpu_system_s": sandbox_usage.get("cpu_system_s", 0.0),
+                "sandbox_max_rss_kb": sandbox_usage.get("max_rss_kb", 0),
+            },
+            "hint_cache": gemini_api.HINT_CACHE.stats(),
+            "hint_governor": gemini_api.GOVERNOR.metrics(),
+        }
+
+
+def print_report(report: dict):
+    print(f"{report['steps']} answers in {report['wall_s']:.1f}s ({report['steps_per_s']:.1f}/s)")
+    print("outcomes:", ", ".join(f"{k}={v}" for k, v in sorted(report["outcomes"].items())))
+    print(f"{'component':10s} {'count':>8s} {'per s':>9s} {'p50 ms':>9s} {'p99 ms':>9s} {'max ms':>9s} {'cpu s':>8s}")
+    for name, c in report["components"].items():
+        print(f"{name:10s} {c['count']:8d} {c['per_s']:9.1f} {c['p50_s'] * 1e3:9.2f} {c['p99_s'] * 1e3:9.2f} "
+              f"{c['max_s'] * 1e3:9.2f} {c['thread_cpu_s']:8.2f}")
+    r = report["resources"]
+    print(f"app process: user {r['cpu_user_s']:.2f}s, system {r['cpu_system_s']:.2f}s, max RSS {r['max_rss_kb'] / 1024:.1f} MB")
+    print(f"sandbox workers: user {r['sandbox_cpu_user_s']:.2f}s, system {r['sandbox_cpu_system_s']:.2f}s, "
+          f"max RSS {r['sandbox_max_rss_kb'] / 1024:.1f} MB")
+    print("hint cache:", report["hint_cache"])
+    print("hint governor:", report["hint_governor"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32, help="threads serving learner requests")
+    parser.add_argument("--duration", type=float, default=0, help="stop after N seconds (0 = until --steps)")
+    parser.add_argument("--steps", type=int, default=10, help="answers per learner (0 = until --duration)")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="spread session starts over N seconds")
+    parser.add_argument("--quiz-share", type=float, default=0.5, help="fraction of answers in quiz mode")
+    parser.add_argument("--correct-rate", type=float, default=None,
+                        help="fixed probability of a correct answer (default: from each learner's skill vs level)")
+    parser.add_argument("--skill-mean", type=float, default=950.0)
+    parser.add_argument("--skill-sd", type=float, default=150.0)
+    parser.add_argument("--skip-rate", type=float, default=0.5, help="chance of skipping after a wrong answer")
+    parser.add_argument("--pathological-rate", type=float, default=0.0,
+                        help="fraction of coding submissions that loop forever")
+    parser.add_argument("--think-mean", type=float, default=20.0, help="mean answer time in seconds")
+    parser.add_argument("--think-distribution", default="lognormal",
+                        choices=["lognormal", "exponential", "uniform", "fixed"])
+    parser.add_argument("--time-scale", type=float, default=0.01,
+                        help="multiply think times by this when sleeping (0 = no waiting)")
+    parser.add_argument("--hint-latency", type=float, default=0.3)
+    parser.add_argument("--hint-error-rate", type=float, default=0.0)
+    parser.add_argument("--sandbox-workers", type=int, default=4)
+    parser.add_argument("--no-sandbox", action="store_true", help="grade in-process (utils.evaluate_cases)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if not args.duration and not args.steps:
+        parser.error("set --duration and/or --steps")
+
+    report = LoadGenerator(args).run()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
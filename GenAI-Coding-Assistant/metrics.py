@@ -0,0 +1,203 @@
+# metrics.py - lightweight counters, sampled timing spans and Prometheus-style export
+"""
+    from metrics import span, inc
+
+    with span("evaluate"):
+        ...
+    inc("hint_cache_total", result="hit")
+
+Spans feed the `span_seconds` histogram (label `span`). Only a sampled
+fraction (METRICS_SAMPLE_RATE, default 0.1) is timed, so an unsampled span
+costs one random() call. Counters are always exact.
+
+Export (both optional, started by start_exporters()):
+- METRICS_PORT: serve the text format on http://0.0.0.0:PORT/metrics
+- METRICS_FILE: rewrite that file every METRICS_INTERVAL seconds
+"""
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "0.1"))
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) for one label set."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Thread-safe store of counters, histograms and gauge collectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: Histogram}
+        self._collectors = {}  # prefix -> callable returning {name: number}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+        """Record value in histogram `name` (its buckets are fixed by the first observation)."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def register_collector(self, prefix: str, collect):
+        """Expose collect()'s numeric values as gauges named `<prefix>_<key>` at export time."""
+        with self._lock:
+            self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+            collectors = list(self._collectors.items())
+        for prefix, collect in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                logger.warning("metrics collector %s failed: %s", prefix, e)
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+register_collector = REGISTRY.register_collector
+
+
+@contextmanager
+def span(name: str, sample_rate: float = None):
+    """Time the block into `span_seconds{span=name}` for a sampled fraction of calls."""
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate < 1.0 and random.random() >= rate:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe("span_seconds", time.perf_counter() - start, span=name)
+
+
+def start_http_server(port: int, host: str = "0.0.0.0", registry: Registry = REGISTRY):
+    """Serve `registry` on http://host:port/metrics from a daemon thread; returns the ThreadingHTTPServer."""
+    # Imported here: http.server (with http.client, email, ssl) is a large share of this module's import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_snapshot(path: str, registry: Registry = REGISTRY):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def start_file_dump(path: str, interval: float = 15.0, registry: Registry = REGISTRY) -> threading.Thread:
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot(path, registry)
+            except OSError as e:
+                logger.warning("metrics dump to %s failed: %s", path, e)
+
+    thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the exporters configured via METRICS_PORT / METRICS_FILE (once per process)."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        port = os.getenv("METRICS_PORT")
+        if port:
+            try:
+                start_http_server(int(port))
+            except OSError as e:
+                logger.warning("metrics endpoint on port %s not started: %s", port, e)
+        path = os.getenv("METRICS_FILE")
+        if path:
+            start_file_dump(path, float(os.getenv("METRICS_INTERVAL", "15")))
@@ -0,0 +1,112 @@
+# prefetch_hints.py - precompute hints for wrong quiz answers
+"""
+Offline:  python prefetch_hints.py [--csv quiz_questions.csv] [--workers 4]
+          (set CACHE_SOCKET or HINT_CACHE_PATH so the hints land in a shared tier)
+Runtime:  prefetch_question / prefetch_next warm the cache for upcoming questions.
+
+Runtime prefetching is speculative, so it never competes with hints a
+learner asked for: it runs on its own small executor (HINT_PREFETCH_WORKERS)
+and through GOVERNOR.call_background, which sheds it whenever interactive
+calls are queued or the reserved capacity is in use.
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_engine import select_level
+from gemini_api import GOVERNOR, HINT_CACHE, generate_hint, hint_key
+from metrics import inc
+from question_bank import open_bank
+from utils import parse_literal
+
+PREFETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HINT_PREFETCH_WORKERS", "2")), thread_name_prefix="prefetch"
+)
+
+_submitted = set()  # hint keys already queued by this process
+_submitted_lock = threading.Lock()
+
+
+def wrong_options(row):
+    """All options of a quiz row except the correct answer."""
+    options = parse_literal(row.get("options", ""))
+    if not isinstance(options, list):
+        return []
+    correct = str(row.get("correct_answer", ""))
+    return [opt for opt in options if str(opt) != correct]
+
+
+def pending_hints(row):
+    """(question, option, key) for wrong options of this row whose hints aren't cached or queued yet."""
+    question = row.get("question", "")
+    candidates = [(question, opt, hint_key(question, opt)) for opt in wrong_options(row)]
+    with _submitted_lock:
+        candidates = [c for c in candidates if c[2] not in _submitted]
+    # Cache lookups may hit the shared tier (a socket or SQLite round trip), so they run unlocked
+    uncached = [c for c in candidates if c[2] not in HINT_CACHE]
+    pending = []
+    with _submitted_lock:
+        for candidate in uncached:
+            if candidate[2] not in _submitted:  # another session may have queued it meanwhile
+                _submitted.add(candidate[2])
+                pending.append(candidate)
+    return pending
+
+
+def _warm(question, option, key, background=True):
+    hint = generate_hint(question, option, background=background)
+    if key not in HINT_CACHE:
+        # Generation failed (errors aren't cached); allow a later retry
+        with _submitted_lock:
+            _submitted.discard(key)
+    return hint
+
+
+def prefetch_question(row, executor=None):
+    """
+    Queue hint generation for every uncached wrong option of a quiz row: as
+    low-priority background work, or at full priority on `executor` (offline
+    warm-up). Nothing is queued while interactive hints need the capacity.
+    """
+    if executor is not None:
+        return [executor.submit(_warm, *pending, background=False) for pending in pending_hints(row)]
+    if not GOVERNOR.has_spare_capacity():
+        inc("hint_prefetch_total", result="skipped")
+        return []
+    return [PREFETCH_EXECUTOR.submit(_warm, *pending) for pending in pending_hints(row)]
+
+
+def prefetch_next(bank, seen, difficulty, cursor=0):
+    """Warm hints for the question a session will most likely see next (at `difficulty`, or nearest)."""
+    target = select_level(difficulty, seen, bank.index)
+    if target is None:
+        return []
+    pos = bank.index.next_unseen(target, seen, cursor)
+    if pos is None:
+        return []
+    return prefetch_question(bank.row(pos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute hints for every wrong quiz option.")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(__file__), "quiz_questions.csv"))
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if HINT_CACHE.store is None:
+        print("warning: neither CACHE_SOCKET nor HINT_CACHE_PATH is set, hints will only live in this process")
+
+    bank = open_bank(args.csv)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = []
+        for pos in range(len(bank)):
+            futures.extend(prefetch_question(bank.row(pos), executor=pool))
+        for done, future in enumerate(futures, 1):
+            future.result()
+            print(f"\r{done}/{len(futures)} hints generated", end="", flush=True)
+    print(f"\ncache: {HINT_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# prescreen.py - static (AST) checks that reject obviously wrong submissions before they run
+"""
+Catches the common trivial failures without executing anything: syntax
+errors, an untouched template, a missing or misnamed function, a signature
+that can't accept the test inputs, and a function that never returns a
+value. Each rejection carries a short, locally generated hint, so these
+submissions need neither the sandbox nor an LLM call.
+"""
+import ast
+import re
+from functools import lru_cache
+
+SYNTAX_ERROR = "syntax_error"
+UNCHANGED_TEMPLATE = "unchanged_template"
+MISSING_FUNCTION = "missing_function"
+WRONG_FUNCTION_NAME = "wrong_function_name"
+WRONG_ARITY = "wrong_arity"
+NO_RETURN = "no_return"
+
+_DEF_RE = re.compile(r"def\s+([A-Za-z_]\w*)\s*\(([^)]*)\)")
+
+
+class Diagnosis:
+    """Why a submission was rejected before execution, with a hint to show the learner."""
+
+    __slots__ = ("kind", "message", "hint", "line")
+
+    def __init__(self, kind: str, message: str, hint: str, line: int = None):
+        self.kind = kind
+        self.message = message
+        self.hint = hint
+        self.line = line
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "message": self.message, "hint": self.hint, "line": self.line}
+
+    def __repr__(self):
+        return f"Diagnosis({self.kind!r}, {self.message!r})"
+
+
+class Signature:
+    """Name and parameter names of the function a template asks for."""
+
+    __slots__ = ("name", "params")
+
+    def __init__(self, name: str, params):
+        self.name = name
+        self.params = tuple(params)
+
+
+@lru_cache(maxsize=1024)
+def template_signature(template: str):
+    """
+    Signature of the first function defined in a question template, or None.
+    Falls back to a regex when the template itself doesn't parse.
+    """
+    try:
+        for node in ast.parse(template).body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                return Signature(node.name, [a.arg for a in node.args.posonlyargs + node.args.args])
+    except (SyntaxError, ValueError):
+        pass
+    match = _DEF_RE.search(template or "")
+    if match is None:
+        return None
+    params = [p.split("=")[0].split(":")[0].strip() for p in match.group(2).split(",")]
+    return Signature(match.group(1), [p for p in params if p and not p.startswith("*")])
+
+
+@lru_cache(maxsize=1024)
+def _template_dump(template: str):
+    """AST dump of the template (so comment/whitespace edits still count as unchanged), or None."""
+    try:
+        return ast.dump(ast.parse(template))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def is_stub_body(body) -> bool:
+    """True for a body of only `pass`, `...` and/or a docstring."""
+    for stmt in body:
+        if isinstance(stmt, ast.Pass):
+            continue
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and (
+            stmt.value.value is Ellipsis or isinstance(stmt.value.value, str)
+        ):
+            continue
+        return False
+    return True
+
+
+def _accepts(func: ast.FunctionDef, count: int) -> bool:
+    """Whether func can be called with `count` positional arguments (what the grader does)."""
+    args = func.args
+    positional = len(args.posonlyargs) + len(args.args)
+    required = positional - len(args.defaults)
+    if any(default is None for default in args.kw_defaults):
+        return False  # keyword-only parameter without a default
+    return required <= count and (count <= positional or args.vararg is not None)
+
+
+def _binds(tree, name: str) -> bool:
+    """Whether `name` is defined anywhere other than a top-level def (assignment, import, nested def...)."""
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == name:
+            return True
+        if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Store):
+            return True
+        if isinstance(node, ast.alias) and (node.asname or node.name) == name:
+            return True
+    return False
+
+
+def _returns_value(func: ast.FunctionDef) -> bool:
+    for node in ast.walk(func):
+        if isinstance(node, ast.Return) and node.value is not None:
+            return True
+        if isinstance(node, (ast.Yield, ast.YieldFrom)):
+            return True
+    return False
+
+
+def prescreen(template: str, code: str, cases=()):
+    """
+    Return a Diagnosis if `code` certainly fails the question built on
+    `template`, else None (run it). `cases` are the question's
+    (test_input, expected_output) pairs, used by the "never returns a value"
+    check (skipped without them, or when a test expects None).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        where = f"line {e.lineno}" if e.lineno else "your code"
+        return Diagnosis(
+            SYNTAX_ERROR,
+            f"SyntaxError: {e.msg} ({where})",
+            f"Python can't parse {where}: {e.msg}. Check brackets, quotes, colons and indentation there.",
+            e.lineno,
+        )
+    except ValueError as e:  # e.g. null bytes
+        return Diagnosis(SYNTAX_ERROR, str(e), "Your code contains characters Python can't read.")
+
+    signature = template_signature(template)
+    if ast.dump(tree) == _template_dump(template):
+        return Diagnosis(
+            UNCHANGED_TEMPLATE,
+            "Submission is the unchanged template",
+            "You haven't changed the template yet: replace `pass` with your solution.",
+        )
+    if signature is None:
+        return None
+
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    func = next((node for node in functions if node.name == signature.name), None)
+    if func is None:
+        if _binds(tree, signature.name):
+            return None  # defined some other way (lambda, import, ...); let the tests decide
+        if functions:
+            found = ", ".join(f"`{node.name}`" for node in functions)
+            return Diagnosis(
+                WRONG_FUNCTION_NAME,
+                f"Expected a function named {signature.name}, found {found}",
+                f"The grader calls `{signature.name}`, but your code defines {found}. Keep the template's function name.",
+                functions[0].lineno,
+            )
+        return Diagnosis(
+            MISSING_FUNCTION,
+            f"No function named {signature.name}",
+            f"Define your solution as `def {signature.name}({', '.join(signature.params)}):`, as in the template.",
+        )
+
+    if is_stub_body(func.body):
+        return Diagnosis(
+            UNCHANGED_TEMPLATE,
+            f"{signature.name} has an empty body",
+            f"`{signature.name}` doesn't do anything yet: replace `pass` with your solution.",
+            func.lineno,
+        )
+    # Compared with the template rather than the test inputs: a learner who keeps the template's
+    # signature is never rejected here
+    if not _accepts(func, len(signature.params)):
+        return Diagnosis(
+            WRONG_ARITY,
+            f"{signature.name} can't be called with {len(signature.params)} argument(s)",
+            f"The tests call `{signature.name}({', '.join(signature.params)})`; keep the template's parameters.",
+            func.lineno,
+        )
+    if cases and all(expected is not None for _, expected in cases) and not _returns_value(func):
+        return Diagnosis(
+            NO_RETURN,
+            f"{signature.name} never returns a value",
+            f"`{signature.name}` never returns anything, so it gives None. Use `return` (not `print`) for the result.",
+            func.lineno,
+        )
+    return None
@@ -0,0 +1,250 @@
+# profiler.py - empirical time/memory complexity of a passing submission
+"""
+Runs the graded function on inputs grown from the question's test_input
+(PROFILE_SIZES, doubling by default), timing each size and recording its
+peak allocation with tracemalloc, then fits the measurements to the usual
+complexity classes:
+
+- container arguments are grown to size n: lists/tuples/strings/dicts to
+  n items (elements varied so they stay distinct, the worst case for `in`
+  checks); scalars, ints included, are left alone, since an int grown to n
+  mostly measures big-int arithmetic (a factorial or Fibonacci result) and
+  not the algorithm. Inputs without a container can't be profiled;
+- each size is timed on fresh copies of the input until PROFILE_MIN_SECONDS
+  of calls (or MAX_REPEATS calls), keeping the fastest call;
+- growth stops at the first size that raises (e.g. RecursionError), runs
+  out of memory, or would overrun PROFILE_MAX_SECONDS of calls. Copying the
+  inputs isn't counted: for a fast function it can take longer than the calls.
+
+The fit (least squares t = a + b*f(n) per class, simplest class within
+tolerance of the best) tells linear from quadratic reliably; O(n) and
+O(n log n) are close over a 32x range and may be confused on noisy timings.
+Exponential code never finishes the larger sizes and is cut off by the
+sandbox's CPU limit instead.
+"""
+import copy
+import gc
+import math
+import os
+import time
+import tracemalloc
+
+from utils import _call
+
+PROFILE_SIZES = tuple(int(n) for n in os.getenv("PROFILE_SIZES", "64,128,256,512,1024,2048").split(","))
+MIN_SECONDS = float(os.getenv("PROFILE_MIN_SECONDS", "0.005"))
+MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "1.0"))
+MIN_POINTS = 3  # sizes needed before a class is fitted
+MAX_REPEATS = 50  # timed calls per size at most, each on its own copy of the input
+
+# Simplest first: ties go to the slower-growing class
+CLASSES = (
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) ** 2),
+    ("O(n^3)", lambda n: float(n) ** 3),
+)
+RANK = {name: i for i, (name, _) in enumerate(CLASSES)}
+FIT_TOLERANCE = 1.25  # a class is "as good" as the best fit if its error is within this factor (+ noise floor)
+NOISE_FLOOR = 0.0025  # mean squared relative error (5% rms) that timings can't resolve
+MEMORY_FLOOR = 4096  # peak bytes below this are interpreter noise, not the submission's working set
+
+
+def _vary(value, k: int):
+    """A variant of one element for the k-th repetition, so grown sequences don't repeat values."""
+    if k == 0 or isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value + k * 1000003
+    if isinstance(value, str):
+        return f"{value}{k}"
+    if isinstance(value, list):
+        return [_vary(item, k) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_vary(item, k) for item in value)
+    return value
+
+
+def growable(value) -> bool:
+    """Whether grow() changes an argument of this type."""
+    return isinstance(value, (str, list, tuple, dict))
+
+
+def grow(value, n: int):
+    """One argument grown to size n (see the module docstring); other types are returned unchanged."""
+    if isinstance(value, str):
+        seed = value or "a"
+        return (seed * (n // len(seed) + 1))[:n]
+    if isinstance(value, (list, tuple)):
+        items = list(value) or [0]
+        grown = [_vary(items[i % len(items)], i // len(items)) for i in range(n)]
+        return grown if isinstance(value, list) else tuple(grown)
+    if isinstance(value, dict):
+        items = list(value.items()) or [("k", 0)]
+        grown = {}
+        for i in range(n):
+            key, val = items[i % len(items)]
+            grown[_vary(key, i // len(items))] = _vary(val, i // len(items))
+        return grown
+    return value
+
+
+def scale_input(test_input, n: int):
+    """test_input grown to size n, keeping utils._call's convention (a list is the argument list)."""
+    if isinstance(test_input, list):
+        return [grow(arg, n) for arg in test_input]
+    return grow(test_input, n)
+
+
+def _time_call(func, test_input):
+    """
+    (fastest call, total time in calls) over calls on fresh copies, repeated
+    until MIN_SECONDS has been spent in calls or MAX_REPEATS calls were made.
+
+    Copies are made in doubling batches and their calls timed back to back:
+    right after a large copy the first call runs on a cold cache and is slower
+    in proportion to n. The garbage collector is off meanwhile, as in timeit,
+    so a collection triggered by the copies isn't timed as part of a call.
+    """
+    best, spent, repeats, batch = math.inf, 0.0, 0, 1
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while repeats == 0 or (spent < MIN_SECONDS and repeats < MAX_REPEATS):
+            copies = [copy.deepcopy(test_input) for _ in range(batch)]  # the function may mutate its input
+            for args in copies:
+                start = time.perf_counter()
+                _call(func, args)
+                elapsed = time.perf_counter() - start
+                best, spent = min(best, elapsed), spent + elapsed
+            repeats += batch
+            batch = min(batch * 2, MAX_REPEATS - repeats)
+            del copies
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best, spent
+
+
+def _peak_bytes(func, test_input):
+    """(peak bytes allocated, time in the call) for one traced call on a fresh copy."""
+    args = copy.deepcopy(test_input)
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        _call(func, args)
+        elapsed = time.perf_counter() - start
+        return tracemalloc.get_traced_memory()[1], elapsed
+    finally:
+        tracemalloc.stop()
+
+
+def fit_complexity(sizes, values, floor: float = 1e-6):
+    """
+    Best-fitting class name for values measured at sizes, or None with fewer
+    than MIN_POINTS points. Fits v = a + b*f(n) (b >= 0) per class and picks
+    the simplest class whose mean squared relative error is close to the best.
+    Errors are relative to at least `floor` (timer resolution, allocator noise).
+    """
+    if len(sizes) < MIN_POINTS:
+        return None
+    scale = [max(v, floor) for v in values]
+    errors = []
+    for name, f in CLASSES:
+        xs = [f(n) for n in sizes]
+        mean_x, mean_v = sum(xs) / len(xs), sum(values) / len(values)
+        var = sum((x - mean_x) ** 2 for x in xs)
+        b = max(0.0, sum((x - mean_x) * (v - mean_v) for x, v in zip(xs, values)) / var) if var else 0.0
+        a = mean_v - b * mean_x
+        errors.append(sum(((a + b * x) - v) ** 2 / d ** 2 for x, v, d in zip(xs, values, scale)) / len(xs))
+    threshold = min(errors) * FIT_TOLERANCE + NOISE_FLOOR
+    return next(name for (name, _), error in zip(CLASSES, errors) if error <= threshold)
+
+
+def profile_submission(user_code, func_name, test_input, sizes=PROFILE_SIZES):
+    """
+    Grow test_input through `sizes`, timing and tracing the submission at
+    each. Returns (True, report) where report has sizes, seconds, peak_bytes,
+    time_class, memory_class, stopped (why growth stopped early, or None) and
+    exceeded (stopped by running out of memory, or by the time budget after
+    MIN_POINTS sizes, rather than by an error); (False, message) if the
+    submission doesn't load.
+    Meant to run in a sandbox worker (SandboxPool.profile), after the
+    submission has passed.
+    """
+    try:
+        local_env = {}
+        exec(compile(user_code, "<submission>", "exec"), {}, local_env)
+        func = local_env[func_name]
+    except MemoryError:
+        raise
+    except Exception as e:
+        return False, str(e)
+
+    measured, seconds, peaks, stopped, exceeded = [], [], [], None, False
+    args = test_input if isinstance(test_input, list) else [test_input]
+    if not any(growable(arg) for arg in args):
+        sizes, stopped = (), "no list, string or dict argument to grow"
+    spent = 0.0  # in calls to the submission, not in copying inputs
+    for n in sizes:
+        if seconds:
+            # Assume the last doubling's growth repeats; stop before a size that would blow the budget
+            growth = seconds[-1] / seconds[-2] if len(seconds) > 1 and seconds[-2] > 0 else 2.0
+            if spent + seconds[-1] * max(growth, 1.0) * 3 > MAX_SECONDS:
+                # With fewer sizes than a fit needs, a slow submission can't be told from a slow machine
+                stopped, exceeded = f"time budget reached before n={n}", len(measured) >= MIN_POINTS
+                break
+        scaled = scale_input(test_input, n)
+        try:
+            elapsed, timed = _time_call(func, scaled)
+            peak, traced = _peak_bytes(func, scaled)
+        except MemoryError:
+            stopped, exceeded = f"out of memory at n={n}", True
+            break
+        except Exception as e:
+            stopped = f"{type(e).__name__} at n={n}: {e}"
+            break
+        spent += timed + traced
+        measured.append(n)
+        seconds.append(elapsed)
+        peaks.append(peak)
+
+    return True, {
+        "sizes": measured,
+        "seconds": seconds,
+        "peak_bytes": peaks,
+        "time_class": fit_complexity(measured, seconds),
+        "memory_class": fit_complexity(measured, peaks, floor=MEMORY_FLOOR),
+        "stopped": stopped,
+        "exceeded": exceeded,
+    }
+
+
+def budget_for(row):
+    """
+    Largest acceptable time class for the question, from its optional
+    `complexity_budget` column; None (no budget) when it has none. O(n)
+    budgets are possible but flaky, since O(n) and O(n log n) timings are
+    hard to tell apart.
+    """
+    budget = row.get("complexity_budget")
+    if isinstance(budget, str) and budget.strip() in RANK:
+        return budget.strip()
+    return None
+
+
+def within_budget(report: dict, budget):
+    """
+    True/False for a profile report against a budget class. None when the
+    class couldn't be fitted because the input had nothing to grow, growing
+    it broke the function (say, a grown list that no longer makes a valid
+    board) or the time budget ran out before MIN_POINTS sizes: that says
+    nothing about the submission. No budget means anything goes.
+    """
+    if budget is None:
+        return True
+    if report.get("time_class") is None:
+        return False if report.get("exceeded") else None
+    return RANK[report["time_class"]] <= RANK[budget]
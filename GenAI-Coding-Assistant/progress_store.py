@@ -0,0 +1,145 @@
+# progress_store.py - durable learner progress (SQLite WAL) with batched background write-back
+"""
+The database must live on a node-local disk. WAL mode coordinates its
+readers and writers through a shared-memory file, which only works between
+processes on the same host, so a PROGRESS_DB on NFS/SMB risks corruption and
+lost writes. Deployments with several nodes route each session (the `sid`
+URL parameter) to the same node, or use api.py, whose clients carry their
+own state.
+"""
+import atexit
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from question_index import QuestionIndex, SeenSet
+
+
+def encode_seen(index: QuestionIndex, bits: int) -> bytes:
+    """
+    Compress a SeenSet's position bitset into a bitmap over question *ids*, so
+    it stays valid if the bank is rebuilt with rows in a different order.
+    """
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    ids = []
+    for i, byte in enumerate(raw):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    ids.append(index.ids[i * 8 + bit])
+    bitmap = bytearray((max(ids) >> 3) + 1 if ids else 0)
+    for qid in ids:
+        bitmap[qid >> 3] |= 1 << (qid & 7)
+    return zlib.compress(bytes(bitmap))
+
+
+def decode_seen(index: QuestionIndex, blob: bytes) -> SeenSet:
+    """Inverse of encode_seen; ids no longer in the bank are dropped."""
+    seen = SeenSet()
+    for i, byte in enumerate(zlib.decompress(blob)):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    index.mark_seen(seen, i * 8 + bit)
+    return seen
+
+
+class ProgressStore:
+    """
+    Progress keyed by session id. save() only records the latest snapshot in
+    memory; a background thread writes all pending snapshots in one
+    transaction every `flush_interval` seconds (and at exit).
+
+    Snapshots are (state, seen): `state` is a JSON-serializable dict of
+    scalars, `seen` maps a mode name to (QuestionIndex, SeenSet.bits). The
+    bitmaps are encoded on the writer thread, off the request path.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 2.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress (session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (session_id TEXT NOT NULL, mode TEXT NOT NULL, bitmap BLOB NOT NULL, "
+            "PRIMARY KEY (session_id, mode))"
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._pending = {}
+        self._inflight = {}  # batch being written by flush(); still visible to load() until it commits
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.writes = 0
+        self.flushes = 0
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, session_id: str, state: dict, seen: dict = None):
+        with self._pending_lock:
+            self._pending[session_id] = (dict(state), dict(seen or {}))
+
+    def load(self, session_id: str):
+        """Return (state, {mode: bitmap blob}) for a session, or None if unknown."""
+        with self._pending_lock:
+            pending = self._pending.get(session_id) or self._inflight.get(session_id)
+        if pending is not None:
+            state, seen = pending
+            return dict(state), {mode: encode_seen(index, bits) for mode, (index, bits) in seen.items()}
+        with self._db_lock:
+            row = self._conn.execute("SELECT state FROM progress WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            blobs = self._conn.execute("SELECT mode, bitmap FROM seen WHERE session_id = ?", (session_id,)).fetchall()
+        return json.loads(row[0]), {mode: bytes(blob) for mode, blob in blobs}
+
+    def flush(self):
+        with self._pending_lock:
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+        if not batch:
+            return
+        now = time.time()
+        progress_rows, seen_rows = [], []
+        for session_id, (state, seen) in batch.items():
+            progress_rows.append((session_id, json.dumps(state), now))
+            for mode, (index, bits) in seen.items():
+                seen_rows.append((session_id, mode, encode_seen(index, bits)))
+        try:
+            with self._db_lock:
+                with self._conn:
+                    self._conn.executemany("INSERT OR REPLACE INTO progress VALUES (?, ?, ?)", progress_rows)
+                    self._conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?)", seen_rows)
+        except sqlite3.Error:
+            # Put the batch back unless a newer snapshot arrived meanwhile
+            with self._pending_lock:
+                for session_id, snapshot in batch.items():
+                    self._pending.setdefault(session_id, snapshot)
+                self._inflight = {}
+            raise
+        with self._pending_lock:
+            self._inflight = {}
+        self.writes += len(progress_rows)
+        self.flushes += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # keep the writer alive; the next flush retries with newer snapshots
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        self._conn.close()
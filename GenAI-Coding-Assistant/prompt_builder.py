@@ -0,0 +1,283 @@
+# prompt_builder.py - compact, token-budgeted hint prompts
+"""
+Builds the hint prompt from a question and a submission while keeping it
+small:
+
+- comments, blank lines and leftover template code (`pass` next to real
+  statements, helper functions still stubbed out) are stripped from the
+  submission;
+- the question's part of the prompt is built once per question and reused;
+- the whole prompt is held to HINT_PROMPT_TOKENS. Over budget, the
+  submission is cut to a window around the failing line (a syntax error's
+  line, or the graded function) and the description is shortened last.
+
+Token counts are estimated from a chars-per-token ratio, which is
+calibrated against the backend's count_tokens() on every
+PROMPT_MEASURE_EVERY-th prompt (0 disables measuring). The exact count runs
+on a background thread, so it never adds latency to a hint; the caller
+decides how it reaches the backend (gemini_api sends it through the
+governor as background work, so it is skipped while the circuit is open).
+"""
+import ast
+import io
+import logging
+import os
+import re
+import threading
+import tokenize
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from metrics import inc, observe
+from prescreen import is_stub_body
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("HINT_PROMPT_TOKENS", "1024"))
+MEASURE_EVERY = int(os.getenv("PROMPT_MEASURE_EVERY", "50"))
+DEFAULT_CHARS_PER_TOKEN = 3.5  # conservative for code; refined by measurement
+TOKEN_BUCKETS = (64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096, 8192)
+
+INSTRUCTIONS = "Please provide constructive feedback or a hint without giving the full answer."
+OMITTED = "# ... {count} line(s) omitted ..."
+
+
+def strip_comments(code: str) -> str:
+    """Drop comments and blank lines, keeping line structure otherwise. Non-Python text is returned unchanged."""
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code
+    lines = code.splitlines()
+    # Blank out comments right-to-left so column offsets stay valid
+    for tok in reversed(tokens):
+        if tok.type == tokenize.COMMENT:
+            row, col = tok.start
+            lines[row - 1] = lines[row - 1][:col].rstrip()
+    return "\n".join(line for line in lines if line.strip())
+
+
+def _dead_lines(code: str, func_name: str = None):
+    """
+    Line numbers of template leftovers: `pass` statements sharing a block
+    with real code, and top-level functions other than `func_name` that
+    still have a stub body.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return set()
+    lines = set()
+    for node in tree.body:
+        if (
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and func_name and node.name != func_name
+            and is_stub_body(node.body)
+        ):
+            first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            lines.update(range(first, node.end_lineno + 1))
+    for node in ast.walk(tree):
+        for field in ("body", "orelse", "finalbody"):
+            body = getattr(node, field, None)
+            if isinstance(body, list) and len(body) > 1:
+                lines.update(stmt.lineno for stmt in body if isinstance(stmt, ast.Pass))
+    return lines
+
+
+def compact_code(code: str, func_name: str = None) -> str:
+    """The submission without comments, blank lines and leftover template code."""
+    drop = _dead_lines(code, func_name)
+    if drop:
+        code = "\n".join(line for i, line in enumerate(code.splitlines(), 1) if i not in drop)
+    return strip_comments(code)
+
+
+def focus_line(code: str, func_name: str = None):
+    """Line to center truncation on: a syntax error's line, else the graded function's def, else None."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return e.lineno
+    except ValueError:
+        return None
+    if func_name:
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == func_name:
+                return node.lineno
+    return None
+
+
+def truncate_around(code: str, max_chars: int, line: int = None) -> str:
+    """
+    Cut `code` to about `max_chars`, keeping whole lines in a window that
+    starts at `line` (1-based; default: the top) and grows downwards first,
+    then upwards. Omitted stretches are replaced by a marker comment, which
+    counts towards `max_chars`.
+    """
+    lines = code.splitlines()
+    if len(code) <= max_chars or not lines:
+        return code
+    max_chars -= 2 * (len(OMITTED.format(count=len(lines))) + 1)  # room for a marker above and below
+    start = min(max(1, line or 1), len(lines)) - 1
+    lo, hi, size = start, start, len(lines[start]) + 1
+    while True:
+        grew = False
+        if hi + 1 < len(lines) and size + len(lines[hi + 1]) + 1 <= max_chars:
+            hi += 1
+            size += len(lines[hi]) + 1
+            grew = True
+        if lo > 0 and size + len(lines[lo - 1]) + 1 <= max_chars:
+            lo -= 1
+            size += len(lines[lo]) + 1
+            grew = True
+        if not grew:
+            break
+    kept = lines[lo:hi + 1]
+    if lo > 0:
+        kept.insert(0, OMITTED.format(count=lo))
+    if hi + 1 < len(lines):
+        kept.append(OMITTED.format(count=len(lines) - hi - 1))
+    return "\n".join(kept)
+
+
+@lru_cache(maxsize=2048)
+def question_context(question: str) -> str:
+    """Question part of the prompt, built once per question (whitespace-normalized)."""
+    text = re.sub(r"[ \t]+", " ", str(question)).strip()
+    text = re.sub(r"\n\s*\n+", "\n", text)
+    return f"You are a coding tutor. A student is trying to solve the following problem:\n\n{text}\n"
+
+
+class TokenEstimator:
+    """Chars-per-token estimate, calibrated by occasionally asking the backend for an exact count."""
+
+    def __init__(self, measure_every: int = MEASURE_EVERY):
+        self.measure_every = measure_every
+        self.chars_per_token = DEFAULT_CHARS_PER_TOKEN
+        self._seen = 0
+        self._measuring = False
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def estimate(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1
+
+    def sample(self, text: str, count_tokens) -> bool:
+        """
+        Every measure_every-th call, count `text` exactly with count_tokens(text)
+        on a background thread and fold the result into the ratio. Returns
+        whether a count was started (never more than one at a time).
+        """
+        if count_tokens is None or self.measure_every <= 0:
+            return False
+        with self._lock:
+            self._seen += 1
+            if (self._seen - 1) % self.measure_every or self._measuring:
+                return False
+            self._measuring = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token-count")
+        self._executor.submit(self.measure, text, count_tokens)
+        return True
+
+    def measure(self, text: str, count_tokens):
+        """Exact count of `text` (None on failure), folded into chars_per_token."""
+        try:
+            tokens = count_tokens(text)
+        except Exception as e:
+            logger.debug("count_tokens failed: %s", e)
+            tokens = None
+        with self._lock:
+            self._measuring = False
+            if tokens:
+                # Exponential moving average; clamp so one odd prompt can't skew it much
+                ratio = min(8.0, max(1.5, len(text) / tokens))
+                self.chars_per_token = 0.8 * self.chars_per_token + 0.2 * ratio
+        return tokens
+
+
+ESTIMATOR = TokenEstimator()
+
+
+def _assemble(context: str, code: str) -> str:
+    return f"{context}\nThey submitted this code:\n{code}\n\n{INSTRUCTIONS}\n"
+
+
+def _fit(context: str, code: str, budget: int, func_name: str = None) -> str:
+    """Assemble the prompt, truncating code (then the description) until the estimate fits `budget`."""
+    prompt = _assemble(context, code)
+    if ESTIMATOR.estimate(prompt) <= budget:
+        return prompt
+    max_chars = int(budget * ESTIMATOR.chars_per_token)
+    code_chars = max_chars - len(_assemble(context, ""))
+    if code_chars < 200:
+        # The description alone nearly fills the budget: give the code at least a few lines
+        context = context[:max(200, max_chars // 2)].rstrip() + " ...\n"
+        code_chars = max_chars - len(_assemble(context, ""))
+    return _assemble(context, truncate_around(code, max(code_chars, 80), focus_line(code, func_name)))
+
+
+def build_prompt(question, user_code, func_name=None, budget=None, count_tokens=None) -> str:
+    """
+    Hint prompt for `question` and `user_code` within `budget` tokens
+    (default HINT_PROMPT_TOKENS). `func_name` (the graded function) helps
+    strip template leftovers and pick the region to keep; `count_tokens`,
+    if given, is used off the request path to calibrate the estimate.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    raw_code = str(user_code)
+    context = question_context(question)
+    code = compact_code(raw_code, func_name)
+
+    prompt = _fit(context, code, budget, func_name)
+    ESTIMATOR.sample(prompt, count_tokens)
+
+    tokens = ESTIMATOR.estimate(prompt)
+    raw_tokens = ESTIMATOR.estimate(_assemble(context, raw_code))
+    observe("hint_prompt_tokens", tokens, buckets=TOKEN_BUCKETS)
+    inc("hint_prompt_tokens_saved_total", max(0, raw_tokens - tokens))
+    logger.info("hint prompt: %d chars, ~%d tokens (raw ~%d tokens)", len(prompt), tokens, raw_tokens)
+    return prompt
+
+
+BATCH_HEADER = "### Submission {n}"
+_BATCH_SPLIT_RE = re.compile(r"^#{2,4}\s*Submission\s+(\d+)\s*:?\s*$", re.MULTILINE)
+
+
+def build_batch_prompt(question, submissions, func_name=None, budget=None) -> str:
+    """
+    One prompt asking for a separate hint for each of several submissions to
+    the same question. The budget is split evenly between the submissions.
+    The reply is expected to have one BATCH_HEADER section per submission,
+    in order (see split_batch_response).
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET * 2
+    context = question_context(question)
+    per_part = max(80, int((budget * ESTIMATOR.chars_per_token - len(context) - 400) / max(1, len(submissions))))
+    parts = []
+    for n, code in enumerate(submissions, 1):
+        compact = compact_code(str(code), func_name)
+        parts.append(f"{BATCH_HEADER.format(n=n)}\n{truncate_around(compact, per_part, focus_line(compact, func_name))}")
+    prompt = (
+        f"{context}\n{len(submissions)} students submitted these attempts:\n\n" + "\n\n".join(parts) + "\n\n"
+        f"For each submission, {INSTRUCTIONS[0].lower()}{INSTRUCTIONS[1:]} "
+        f"Answer with exactly one section per submission, in order, each starting with its own "
+        f"'{BATCH_HEADER.format(n='N')}' line.\n"
+    )
+    tokens = ESTIMATOR.estimate(prompt)
+    observe("hint_prompt_tokens", tokens, buckets=TOKEN_BUCKETS)
+    logger.info("batch hint prompt: %d submissions, %d chars, ~%d tokens", len(submissions), len(prompt), tokens)
+    return prompt
+
+
+def split_batch_response(text: str, count: int):
+    """Per-submission hints from a batch reply: a list of `count` strings (None where a section is missing)."""
+    sections = [None] * count
+    matches = list(_BATCH_SPLIT_RE.finditer(text or ""))
+    for i, match in enumerate(matches):
+        n = int(match.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[match.end():end].strip()
+        if 1 <= n <= count and body and sections[n - 1] is None:
+            sections[n - 1] = body
+    return sections
@@ -0,0 +1,347 @@
+# question_bank.py - compiled, memory-mapped question bank with lazily loaded rows
+"""
+Build:  python question_bank.py coding_questions.csv quiz_questions.csv
+
+Each CSV compiles to a sibling `.qbank` file:
+
+    MAGIC | meta length (8 bytes, little endian) | meta pickle | row pickles...
+
+The meta block holds the source file's size/mtime and content hash, the
+column names, and the id, difficulty, raw-row hash, offset and length of every
+row. Opening a bank reads only the meta block. Row bodies (with literal
+columns already parsed) are unpickled from the memory map on demand. .qbank
+files are trusted build artifacts.
+
+When the CSV changes under a running server, ReloadingBank recompiles it
+incrementally: rows whose raw text is unchanged are copied over without being
+re-parsed, existing questions keep their positions, new ones are appended and
+removed ones are retired in place (see RETIRED), so sessions' seen-bitsets
+stay valid.
+"""
+import csv
+import hashlib
+import io
+import logging
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from cache import LRUCache
+from metrics import inc
+from question_index import QuestionIndex
+from utils import parse_literal, question_test_cases
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"QBANK\x01"
+LITERAL_COLUMNS = {"test_input", "expected_output", "test_cases", "options"}
+ROW_CACHE_SIZE = int(os.getenv("QBANK_ROW_CACHE", "256"))
+RELOAD_INTERVAL = float(os.getenv("QBANK_RELOAD_INTERVAL", "2"))  # seconds between CSV checks; < 0 disables
+
+# Index difficulty of a question removed from the CSV: never selected, but its
+# position and row stay so in-flight sessions can finish it
+RETIRED = "retired"
+
+
+def compiled_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".qbank"
+
+
+def _source_stamp(csv_path: str):
+    st = os.stat(csv_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _content_hash(csv_path: str) -> str:
+    with open(csv_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _row_hash(raw: dict) -> bytes:
+    return hashlib.blake2b("\x1f".join(f"{k}\x1e{v}" for k, v in raw.items()).encode("utf-8"), digest_size=16).digest()
+
+
+def parse_row(raw: dict) -> dict:
+    """
+    One raw CSV record as a question dict: int id, lower-case difficulty,
+    literal columns pre-parsed. Coding rows also get `test_cases` resolved from
+    the raw text, so graders never re-parse (and mangle) already-parsed strings.
+    """
+    row = {}
+    for col, value in raw.items():
+        if col in LITERAL_COLUMNS:
+            value = parse_literal(value) if value != "" else value
+        row[col] = value
+    if "test_input" in raw:
+        row["test_cases"] = question_test_cases(raw)
+    row["id"] = int(row["id"])
+    row["difficulty"] = str(row.get("difficulty", "")).lower()
+    return row
+
+
+def read_rows(csv_path: str):
+    """Parse a question CSV into question dicts (see parse_row)."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for raw in csv.DictReader(f):
+            yield parse_row(raw)
+
+
+def compile_bank(csv_path: str, out_path: str = None, previous: "CompiledBank" = None) -> str:
+    """
+    Compile a question CSV to its .qbank file (written atomically). Returns the output path.
+
+    With `previous` (the bank currently in use) the build is incremental:
+    rows whose raw text is unchanged reuse previous's pickled body instead of
+    being parsed, and positions are kept stable (see the module docstring).
+    """
+    out_path = out_path or compiled_path(csv_path)
+    stamp = _source_stamp(csv_path)  # taken first: a write during the build shows up as a newer stamp
+    with open(csv_path, "rb") as f:
+        content = f.read()
+    records = [(int(raw["id"]), _row_hash(raw), raw) for raw in csv.DictReader(io.StringIO(content.decode("utf-8"), newline=""))]
+
+    # (qid, difficulty, hash, body) per output position
+    slots, appended = [], []
+    if previous is not None:
+        old_hashes = previous.meta.get("hashes") or [None] * len(previous)
+        slots = [None] * len(previous)
+        for qid, digest, raw in records:
+            pos = previous.index.positions.get(qid)
+            if pos is None or slots[pos] is not None:
+                appended.append((qid, digest, raw))
+            elif digest == old_hashes[pos]:
+                difficulty = previous.index.difficulties[pos]
+                if difficulty == RETIRED:  # removed earlier, now back unchanged
+                    difficulty = previous.row(pos)["difficulty"]
+                slots[pos] = (qid, difficulty, digest, previous.body(pos))
+            else:
+                slots[pos] = (qid, digest, raw)
+        for pos, slot in enumerate(slots):
+            if slot is None:  # removed from the CSV
+                slots[pos] = (previous.index.ids[pos], RETIRED, old_hashes[pos], previous.body(pos))
+    else:
+        appended = records
+
+    entries = []
+    for slot in slots + appended:
+        if len(slot) == 3:  # new or changed: parse it
+            qid, digest, raw = slot
+            row = parse_row(raw)
+            slot = (qid, row["difficulty"], digest, pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL))
+        entries.append(slot)
+
+    ids, difficulties, hashes, offsets, lengths = array("q"), [], [], array("Q"), array("Q")
+    pos = 0
+    for qid, difficulty, digest, body in entries:
+        ids.append(qid)
+        difficulties.append(difficulty)
+        hashes.append(digest)
+        offsets.append(pos)
+        lengths.append(len(body))
+        pos += len(body)
+    columns = list(records[0][2]) if records else []
+    if "test_input" in columns:
+        columns.append("test_cases")
+
+    meta = pickle.dumps(
+        {
+            "source": stamp,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "columns": columns,
+            "ids": ids,
+            "difficulties": difficulties,
+            "hashes": hashes,
+            "offsets": offsets,
+            "lengths": lengths,
+        },
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(meta)))
+        f.write(meta)
+        for entry in entries:
+            f.write(entry[3])
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class CompiledBank:
+    """Read-only view of a .qbank file: metadata index in memory, row bodies fetched lazily."""
+
+    def __init__(self, path: str, previous: "CompiledBank" = None):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled question bank")
+        (meta_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        self._base = len(MAGIC) + 8 + meta_len
+        self.meta = pickle.loads(self._mm[len(MAGIC) + 8 : self._base])
+        self.columns = self.meta["columns"]
+        if previous is not None and self.extends(previous):
+            self.index = previous.index.updated(self.meta["ids"], self.meta["difficulties"])
+        else:
+            self.index = QuestionIndex(self.meta["ids"], self.meta["difficulties"])
+        self._offsets = self.meta["offsets"]
+        self._lengths = self.meta["lengths"]
+        self._rows = LRUCache(maxsize=ROW_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self.index)
+
+    def body(self, pos: int) -> bytes:
+        """Pickled row at position `pos`."""
+        start = self._base + self._offsets[pos]
+        return self._mm[start : start + self._lengths[pos]]
+
+    def row(self, pos: int) -> dict:
+        """Row at index position `pos` (treat as read-only; it may be shared)."""
+        row = self._rows.get(pos)
+        if row is None:
+            row = pickle.loads(self.body(pos))
+            self._rows.set(pos, row)
+        return row
+
+    def get(self, qid) -> dict:
+        return self.row(self.index.position(qid))
+
+    def is_stale(self, csv_path: str) -> bool:
+        """Whether the CSV changed since this bank was built: by size/mtime, then (if those moved) by content hash."""
+        if tuple(self.meta["source"]) == _source_stamp(csv_path):
+            return False
+        return "sha256" not in self.meta or self.meta["sha256"] != _content_hash(csv_path)
+
+    def extends(self, other: "CompiledBank") -> bool:
+        """Whether every question of `other` keeps its position here (true of incremental rebuilds)."""
+        n = len(other.meta["ids"])
+        return len(self.meta["ids"]) >= n and self.meta["ids"][:n] == other.meta["ids"]
+
+    def changed_ids(self, other: "CompiledBank"):
+        """Ids of `other`'s questions that are edited or retired here (assumes self.extends(other))."""
+        new_hashes, old_hashes = self.meta.get("hashes"), other.meta.get("hashes")
+        changed = []
+        for pos, qid in enumerate(other.index.ids):
+            if (
+                new_hashes is None or old_hashes is None or new_hashes[pos] != old_hashes[pos]
+                or (self.index.difficulties[pos] == RETIRED) != (other.index.difficulties[pos] == RETIRED)
+            ):
+                changed.append(qid)
+        return changed
+
+    def close(self):
+        self._mm.close()
+
+
+def open_bank(csv_path: str, previous: CompiledBank = None) -> CompiledBank:
+    """
+    Open the compiled bank for a CSV, (re)building it first if it's missing or
+    out of date. With `previous`, the result keeps previous's positions (a
+    compiled file that doesn't is rebuilt incrementally from previous).
+    """
+    path = compiled_path(csv_path)
+    if os.path.exists(path):
+        try:
+            bank = CompiledBank(path, previous)
+            if not bank.is_stale(csv_path) and (previous is None or bank.extends(previous)):
+                return bank
+            bank.close()
+        except (ValueError, OSError, pickle.UnpicklingError, struct.error):
+            pass
+    return CompiledBank(compile_bank(csv_path, path, previous), previous)
+
+
+class ReloadingBank:
+    """
+    A CompiledBank that follows its CSV. `current()` returns the bank to use
+    and, at most every `interval` seconds, checks the CSV's size/mtime; on a
+    change it rebuilds incrementally in a background thread and swaps the
+    new bank in when ready. Callers keep using the previous bank meanwhile,
+    and one already handed out stays valid (it is never closed here: its
+    memory map is released once nothing references it).
+    """
+
+    def __init__(self, csv_path: str, interval: float = RELOAD_INTERVAL):
+        self.csv_path = csv_path
+        self.interval = interval
+        self._bank = open_bank(csv_path)
+        self._stamp = _source_stamp(csv_path)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def current(self) -> CompiledBank:
+        if self.interval >= 0 and time.monotonic() - self._checked >= self.interval:
+            self._checked = time.monotonic()
+            self._check()
+        return self._bank
+
+    def _check(self):
+        try:
+            stamp = _source_stamp(self.csv_path)
+        except OSError:
+            return  # mid-replace; look again next time
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload_in_background, args=(stamp,), name="qbank-reload", daemon=True).start()
+
+    def _reload_in_background(self, stamp):
+        try:
+            self.reload()
+        except Exception as e:  # a half-written CSV, say: keep serving the current bank, retry on the next change
+            logger.warning("reloading %s failed: %s", self.csv_path, e)
+            inc("qbank_reloads_total", result="error")
+            self._stamp = stamp
+        finally:
+            self._reloading = False
+
+    def reload(self):
+        """Rebuild and swap now if the CSV changed. Returns the ids of edited/removed questions."""
+        stamp = _source_stamp(self.csv_path)
+        old = self._bank
+        if not old.is_stale(self.csv_path):
+            self._stamp = stamp  # touched, content unchanged
+            return []
+        started = time.perf_counter()
+        new = open_bank(self.csv_path, previous=old)
+        changed = new.changed_ids(old)
+        self._bank = new
+        self._stamp = stamp
+        inc("qbank_reloads_total", result="ok")
+        logger.info(
+            "reloaded %s in %.3fs: %d question(s), %d added, %d changed or removed",
+            self.csv_path, time.perf_counter() - started, len(new), len(new) - len(old), len(changed),
+        )
+        return changed
+
+    def __len__(self):
+        return len(self.current())
+
+    def close(self):
+        self._bank.close()
+
+
+def main(argv):
+    if not argv:
+        print("usage: python question_bank.py CSV [CSV ...]")
+        return 2
+    for csv_path in argv:
+        out_path = compile_bank(csv_path)
+        bank = CompiledBank(out_path)
+        print(f"{csv_path} -> {out_path} ({len(bank)} questions, {os.path.getsize(out_path)} bytes)")
+        bank.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,343 @@
+# sandbox.py - pre-started worker processes that run student code with time/memory limits
+import json
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import threading
+import types
+from contextlib import contextmanager
+
+from metrics import inc, span
+from profiler import PROFILE_SIZES, profile_submission
+from utils import evaluate_cases, evaluate_code
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+DEFAULT_WORKERS = int(os.getenv("SANDBOX_WORKERS", "2"))
+DEFAULT_WALL_TIMEOUT = float(os.getenv("SANDBOX_WALL_TIMEOUT", "5"))
+DEFAULT_CPU_TIMEOUT = int(os.getenv("SANDBOX_CPU_TIMEOUT", "2"))
+DEFAULT_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "256"))
+MAX_RESULT_BYTES = 1 << 20  # larger results are replaced by RESULT_TOO_LARGE
+
+# Results produced by the sandbox itself rather than by the submission's own code
+TIME_LIMIT_EXCEEDED = "Time limit exceeded"
+CPU_LIMIT_EXCEEDED = "CPU time limit exceeded"
+MEMORY_LIMIT_EXCEEDED = "Memory limit exceeded"
+WORKER_DIED = "Execution failed (worker process died)"
+RESULT_TOO_LARGE = "Result too large to report"
+SANDBOX_ERRORS = {TIME_LIMIT_EXCEEDED, CPU_LIMIT_EXCEEDED, MEMORY_LIMIT_EXCEEDED, WORKER_DIED}
+_OUTCOME_LABELS = {
+    TIME_LIMIT_EXCEEDED: "timeout",
+    CPU_LIMIT_EXCEEDED: "cpu_limit",
+    MEMORY_LIMIT_EXCEEDED: "memory_limit",
+    WORKER_DIED: "worker_died",
+}
+
+
+class CpuTimeExceeded(BaseException):
+    """Raised inside a worker on SIGXCPU. BaseException so student `except Exception` can't swallow it."""
+
+
+def _on_sigxcpu(signum, frame):
+    raise CpuTimeExceeded()
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_soft_limit(soft):
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY and soft != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+_PLAIN_SCALARS = (type(None), bool, int, float, str)
+
+
+def _to_plain(value, depth: int = 0):
+    """
+    JSON-safe copy of a result built only from exact builtin types: lists and
+    tuples become lists, dicts with string keys stay dicts, anything else
+    (including subclasses of builtins) becomes its repr. Runs in the worker,
+    so the submission's own methods never run in the parent.
+    """
+    kind = type(value)
+    if kind in _PLAIN_SCALARS:
+        return value
+    if depth < 32:
+        if kind is list or kind is tuple:
+            return [_to_plain(item, depth + 1) for item in value]
+        if kind is dict and all(type(key) is str for key in value):
+            return {key: _to_plain(item, depth + 1) for key, item in value.items()}
+    try:
+        return repr(value)
+    except Exception:
+        return f"<unrepresentable {kind.__name__}>"
+
+
+def _encode(payload) -> bytes:
+    """(passed, result) as JSON bytes; the parent only ever json.loads what a worker sends."""
+    passed, result = payload
+    data = json.dumps([bool(passed), _to_plain(result)]).encode("utf-8")
+    if len(data) > MAX_RESULT_BYTES:
+        data = json.dumps([bool(passed), RESULT_TOO_LARGE]).encode("utf-8")
+    return data
+
+
+def _worker_main(conn, memory_bytes):
+    """Worker loop: receive (cpu_seconds, func, args) jobs and send back func(*args) as JSON (see _encode)."""
+    limits = resource is not None and hasattr(signal, "SIGXCPU")
+    if limits:
+        if memory_bytes:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        cpu_seconds, func, args = job
+
+        try:
+            if limits and cpu_seconds:
+                # RLIMIT_CPU counts the whole process lifetime, so arm it relative to usage so far
+                _set_cpu_soft_limit(int(_cpu_used()) + int(cpu_seconds) + 1)
+            # Encoding may call the submission's __repr__, so it runs under the same limits
+            data = _encode(func(*args))
+        except CpuTimeExceeded:
+            data = _encode((False, CPU_LIMIT_EXCEEDED))
+        except MemoryError:
+            data = _encode((False, MEMORY_LIMIT_EXCEEDED))
+        except Exception as e:
+            data = _encode((False, f"{type(e).__name__}: {e}"))
+        finally:
+            if limits and cpu_seconds:
+                _set_cpu_soft_limit(resource.RLIM_INFINITY)
+
+        conn.send_bytes(data)
+
+
+@contextmanager
+def _plain_main():
+    """
+    Streamlit executes the app script as __main__, and spawn/forkserver children
+    re-import the parent's __main__ by path, i.e. they would re-run the whole
+    app. Present an empty __main__ while starting processes.
+    """
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _proc_usage(pid: int):
+    """
+    (user CPU s, system CPU s, peak RSS kB) of a live process, read from
+    /proc/<pid>; None where /proc isn't available (non-Linux) or it has exited.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()  # fields after the command name, from state on
+        with open(f"/proc/{pid}/status") as f:
+            peak_rss = next((int(line.split()[1]) for line in f if line.startswith("VmHWM:")), 0)
+    except (OSError, ValueError, IndexError):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return int(fields[11]) / ticks, int(fields[12]) / ticks, peak_rss
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def usage(self):
+        return _proc_usage(self.process.pid)
+
+    def kill(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+
+class SandboxPool:
+    """
+    Pool of pre-started worker processes for evaluating submissions.
+
+    Each call borrows an idle worker, so up to `workers` submissions run in
+    parallel while the calling threads wait on a pipe (GIL released). A worker
+    that overruns the wall-clock timeout or dies is killed and replaced.
+
+    usage() reports the workers' CPU time and peak RSS. They are forkserver
+    children, not children of this process, so RUSAGE_CHILDREN never sees
+    them; each worker's /proc entry is read instead, and a worker's totals
+    are kept when it is stopped.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        wall_timeout: float = DEFAULT_WALL_TIMEOUT,
+        cpu_timeout: int = DEFAULT_CPU_TIMEOUT,
+        memory_mb: int = DEFAULT_MEMORY_MB,
+        start_method: str = None,
+    ):
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self._ctx = mp.get_context(start_method)
+        self.wall_timeout = wall_timeout
+        self.cpu_timeout = cpu_timeout
+        self.memory_bytes = memory_mb * 1024 * 1024 if memory_mb else 0
+        self._idle = queue.Queue()
+        self._live = set()  # started and not yet stopped, idle or busy
+        self._retired = [0.0, 0.0, 0]  # user s, system s, peak RSS kB of stopped workers
+        self._usage_lock = threading.Lock()
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.memory_bytes), daemon=True
+        )
+        with _plain_main():
+            process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        with self._usage_lock:
+            self._live.add(worker)
+        return worker
+
+    def _retire(self, worker):
+        """Fold a worker's usage into the retired totals; call just before stopping it."""
+        usage = worker.usage()
+        with self._usage_lock:
+            self._live.discard(worker)
+            if usage is not None:
+                self._retired[0] += usage[0]
+                self._retired[1] += usage[1]
+                self._retired[2] = max(self._retired[2], usage[2])
+
+    def usage(self) -> dict:
+        """
+        CPU seconds used by all workers so far (live and stopped) and the
+        largest peak RSS of any of them, in kB. Zeros where /proc isn't available.
+        """
+        with self._usage_lock:
+            user, system, peak_rss = self._retired
+            live = list(self._live)
+        for worker in live:
+            usage = worker.usage()
+            if usage is not None:
+                user, system, peak_rss = user + usage[0], system + usage[1], max(peak_rss, usage[2])
+        return {"cpu_user_s": user, "cpu_system_s": system, "max_rss_kb": peak_rss}
+
+    def run(self, func, *args, wall_timeout: float = None):
+        """Run func(*args) in a worker; func must return a (passed, result) pair."""
+        with span("sandbox_run"):
+            passed, result = self._run(func, args, wall_timeout)
+        if passed:
+            outcome = "passed"
+        elif isinstance(result, str):
+            outcome = _OUTCOME_LABELS.get(result, "error")
+        else:
+            outcome = "failed"
+        inc("evaluations_total", outcome=outcome)
+        return passed, result
+
+    def _run(self, func, args, wall_timeout):
+        timeout = self.wall_timeout if wall_timeout is None else wall_timeout
+        worker = self._take()
+        try:
+            worker.conn.send((self.cpu_timeout, func, args))
+            if worker.conn.poll(timeout):
+                # Never unpickle what a worker sends: its results come from untrusted code
+                passed, result = json.loads(worker.conn.recv_bytes(MAX_RESULT_BYTES))
+                self._idle.put(worker)
+                return passed, result
+            outcome = TIME_LIMIT_EXCEEDED
+        except (EOFError, OSError, ValueError):
+            outcome = WORKER_DIED
+        except BaseException:
+            self._replace(worker)
+            raise
+        self._replace(worker)
+        return False, outcome
+
+    def _take(self) -> _Worker:
+        """Borrow an idle worker, starting one for a slot whose previous respawn failed."""
+        worker = self._idle.get()
+        if worker is None:
+            try:
+                worker = self._spawn()
+            except BaseException:
+                self._idle.put(None)
+                raise
+        return worker
+
+    def _replace(self, worker):
+        """
+        Kill a worker and put a fresh one in its place. If none can be started,
+        the slot is kept empty (None) for the next call to retry, and the error
+        is raised: a dead worker is never returned to the pool.
+        """
+        self._retire(worker)
+        worker.kill()
+        try:
+            fresh = self._spawn()
+        except BaseException:
+            self._idle.put(None)
+            inc("sandbox_spawn_failures_total")
+            raise
+        self._idle.put(fresh)
+
+    def evaluate_code(self, user_code, func_name, test_input, expected_output):
+        """Sandboxed equivalent of utils.evaluate_code: returns (passed, result)."""
+        return self.run(evaluate_code, user_code, func_name, test_input, expected_output)
+
+    def evaluate_cases(self, user_code, func_name, cases, stop_on_failure=True):
+        """Sandboxed utils.evaluate_cases; the CPU/wall limits apply to the whole batch."""
+        return self.run(evaluate_cases, user_code, func_name, cases, stop_on_failure)
+
+    def profile(self, user_code, func_name, test_input, sizes=PROFILE_SIZES):
+        """
+        Sandboxed profiler.profile_submission: (True, report) or (False, message).
+        Counted under profiles_total rather than evaluations_total.
+        """
+        with span("sandbox_profile"):
+            passed, result = self._run(profile_submission, (user_code, func_name, test_input, sizes), None)
+        inc("profiles_total", outcome="ok" if passed else _OUTCOME_LABELS.get(result, "error"))
+        return passed, result
+
+    def close(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is None:
+                continue
+            self._retire(worker)
+            try:
+                worker.conn.send(None)
+                worker.process.join(timeout=1)
+            except OSError:
+                pass
+            worker.kill()
@@ -0,0 +1,200 @@
+# service.py - UI-independent question selection, grading and learner-state handling
+"""
+The pieces of a learner's turn that don't depend on Streamlit, shared by
+app.py (state kept in st.session_state), api.py (state carried by the client)
+and loadgen.py.
+"""
+import base64
+import os
+
+from adaptive_engine import LEVELS, LearnerModel, select_level
+from metrics import inc, span
+from prescreen import prescreen, template_signature
+from profiler import PROFILE_SIZES, budget_for, within_budget
+from progress_store import decode_seen, encode_seen
+from question_index import SeenSet
+from sandbox import SANDBOX_ERRORS
+from utils import question_test_cases
+from verdict_cache import VERDICT_CACHE, cached_verdict, question_version, verdict_key
+
+MODES = ("coding", "quiz")
+
+# Correct answers faster than this (seconds) earn full credit in the learner model
+FAST_SECONDS = {"coding": 40, "quiz": 30}
+
+# Profile passing submissions (time/memory growth, see profiler.py); with PERF_ENFORCE, over-budget ones fail
+PROFILE_SUBMISSIONS = os.getenv("PROFILE_SUBMISSIONS", "0") == "1"
+ENFORCE_BUDGETS = os.getenv("PERF_ENFORCE", "0") == "1"
+
+# Row fields a client may see (no answers or test cases)
+PUBLIC_FIELDS = {
+    "coding": ("id", "difficulty", "title", "description", "template"),
+    "quiz": ("id", "difficulty", "question", "options"),
+}
+
+
+def pick_question(index, difficulty: str, seen, cursor: int):
+    """
+    Choose the next question: the level closest to `difficulty` with unseen
+    questions, then the first unseen one at/after `cursor` (which restarts at
+    0 when the level changes). Returns (difficulty, cursor, position); the
+    position is None when every question has been seen.
+    """
+    with span("select_level"):
+        level = select_level(difficulty, seen, index)
+    if level is None:
+        return difficulty, cursor, None
+    if level != difficulty:
+        difficulty, cursor = level, 0
+    with span("next_unseen"):
+        return difficulty, cursor, index.next_unseen(difficulty, seen, cursor)
+
+
+def advance(learner: LearnerModel, difficulty: str, pos: int):
+    """(difficulty, cursor) after leaving the question at `pos`: follow the learner's level, else move past pos."""
+    level = learner.level()
+    if level != difficulty:
+        return level, 0
+    return difficulty, pos + 1
+
+
+def func_name_for(row):
+    """Name of the function the coding question's template defines, or None."""
+    signature = template_signature(row.get("template", ""))
+    return signature.name if signature else None
+
+
+def grade_code(row, code: str, sandbox):
+    """
+    Pre-screen a submission and, if it might pass, run it against the
+    question's test cases in `sandbox` (a SandboxPool). Duplicate
+    (AST-identical) submissions reuse the cached verdict.
+
+    Returns (passed, result) as SandboxPool.evaluate_cases does, except that
+    a pre-screen rejection returns (False, Diagnosis) with a local hint.
+    """
+    func_name = func_name_for(row)
+    if not func_name:
+        return False, "Question template does not define a function"
+    cases = question_test_cases(row)
+    with span("prescreen"):
+        diagnosis = prescreen(row.get("template", ""), code, cases)
+    inc("prescreen_total", verdict=diagnosis.kind if diagnosis else "pass")
+    if diagnosis is not None:
+        return False, diagnosis
+    return cached_verdict(row["id"], code, lambda: sandbox.evaluate_cases(code, func_name, cases), question_version(row))
+
+
+def profile_code(row, code: str, sandbox) -> dict:
+    """
+    Profile a submission that passed grade_code: the profiler's report plus
+    the question's `budget` and `within_budget` (True/False, or None when the
+    question's input couldn't be grown). A submission the sandbox had to stop
+    counts as too slow. Reports are cached alongside the verdicts, except
+    sandbox stops, which depend on load as much as on the code.
+    """
+    key = verdict_key(row["id"], code, f"profile:{PROFILE_SIZES}:{question_version(row)}")
+    report = VERDICT_CACHE.get(key)
+    if report is None:
+        with span("profile"):
+            ok, result = sandbox.profile(code, func_name_for(row), question_test_cases(row)[0][0])
+        if ok:
+            report = result
+        else:
+            report = {"sizes": [], "seconds": [], "peak_bytes": [], "time_class": None, "memory_class": None,
+                      "stopped": result, "exceeded": result in SANDBOX_ERRORS}
+        if ok or result not in SANDBOX_ERRORS:
+            VERDICT_CACHE.set(key, report)
+    report = dict(report, budget=budget_for(row))
+    report["within_budget"] = within_budget(report, report["budget"])
+    inc("profile_budget_total", result={True: "within", False: "over", None: "unknown"}[report["within_budget"]])
+    return report
+
+
+def performance_note(report: dict) -> str:
+    """One sentence for the learner about how a profiled submission scales."""
+    time_class, budget = report.get("time_class"), report.get("budget")
+    aim = f" Aim for {budget} or better." if report.get("within_budget") is False and budget else ""
+    if time_class is None:
+        if report.get("within_budget") is False:
+            return "It is too slow on larger inputs." + aim
+        return "Its running time couldn't be measured on larger inputs."
+    return f"Its running time grows like {time_class} and its memory like {report.get('memory_class')}." + aim
+
+
+def performance_question(row, report: dict) -> str:
+    """Question text for a hint on speeding up a correct but over-budget submission."""
+    return (
+        f"{row.get('description', '')}\n\nThe submission below returns correct results. "
+        f"{performance_note(report)} Hint at a more efficient approach."
+    )
+
+
+def public_question(mode: str, row) -> dict:
+    return {field: row[field] for field in PUBLIC_FIELDS[mode] if field in row}
+
+
+class ModeState:
+    """
+    One mode's progress for one learner: skill estimate, current level,
+    cursor, seen questions and the ids of questions already answered wrong
+    (`missed`), so that, as in the app, only the first wrong attempt at a
+    question counts against the skill estimate.
+    """
+
+    def __init__(
+        self, learner: LearnerModel = None, difficulty: str = None, cursor: int = 0, seen: SeenSet = None, missed=()
+    ):
+        self.learner = learner or LearnerModel()
+        self.difficulty = difficulty or self.learner.level()
+        self.cursor = cursor
+        self.seen = seen or SeenSet()
+        self.missed = set(missed)
+
+    def current(self, index):
+        """Position of the question to show now (None when exhausted); may move level/cursor."""
+        self.difficulty, self.cursor, pos = pick_question(index, self.difficulty, self.seen, self.cursor)
+        return pos
+
+    def answer(self, index, pos: int, correct: bool, elapsed: float = None, fast_threshold: float = None):
+        """Grade the question at `pos`; a question already seen (answered or skipped) is left alone."""
+        if self.seen.bits >> pos & 1:
+            return
+        qid = index.ids[pos]
+        if correct or qid not in self.missed:
+            self.learner.update(self.difficulty, correct, elapsed, fast_threshold)
+        if correct:
+            self.leave(index, pos)
+        else:
+            self.missed.add(qid)
+
+    def leave(self, index, pos: int):
+        """Mark the question at `pos` seen (answered or skipped) and move on."""
+        index.mark_seen(self.seen, index.ids[pos])
+        self.missed.discard(index.ids[pos])
+        self.difficulty, self.cursor = advance(self.learner, self.difficulty, pos)
+
+    def to_dict(self, index) -> dict:
+        return {
+            "rating": self.learner.rating,
+            "answered": self.learner.answered,
+            "difficulty": self.difficulty,
+            "cursor": self.cursor,
+            "seen": base64.b64encode(encode_seen(index, self.seen.bits)).decode("ascii"),
+            "missed": sorted(self.missed),
+        }
+
+    @classmethod
+    def from_dict(cls, index, data: dict) -> "ModeState":
+        """Inverse of to_dict. Raises ValueError on malformed input."""
+        if not data:
+            return cls()
+        try:
+            learner = LearnerModel(float(data["rating"]), int(data["answered"]))
+            if data["difficulty"] not in LEVELS:
+                raise ValueError(f"unknown difficulty {data['difficulty']!r}")
+            seen = decode_seen(index, base64.b64decode(data["seen"])) if data.get("seen") else SeenSet()
+            missed = [int(qid) for qid in data.get("missed", ())]
+            return cls(learner, str(data["difficulty"]), int(data["cursor"]), seen, missed)
+        except Exception as e:
+            raise ValueError(f"invalid learner state: {e}") from e
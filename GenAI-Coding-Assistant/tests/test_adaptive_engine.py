@@ -0,0 +1,77 @@
+# test_adaptive_engine.py - Elo-style learner model and level selection
+import pytest
+
+from adaptive_engine import (
+    LEVEL_RATINGS,
+    SLOW_CORRECT_SCORE,
+    START_RATING,
+    LearnerModel,
+    expected_score,
+    level_for,
+    select_level,
+)
+from question_index import QuestionIndex, SeenSet
+
+
+def test_expected_score():
+    assert expected_score(1000, 1000) == pytest.approx(0.5)
+    assert expected_score(1400, 1000) == pytest.approx(10 / 11)
+    assert expected_score(800, 1200) < 0.1
+
+
+def test_level_for_picks_the_nearest_rating():
+    assert level_for(START_RATING) == "easy"
+    assert level_for(940) == "medium"
+    assert level_for(1150) == "hard"
+
+
+def test_correct_answers_raise_and_wrong_answers_lower_the_rating():
+    up, down = LearnerModel(), LearnerModel()
+    assert up.update("medium", True) > START_RATING
+    assert down.update("medium", False) < START_RATING
+    assert up.answered == down.answered == 1
+
+
+def test_update_is_the_elo_step():
+    learner = LearnerModel(1000.0, answered=0)
+    k = learner.k_factor()
+    assert learner.update("hard", True) == pytest.approx(1000 + k * (1 - expected_score(1000, LEVEL_RATINGS["hard"])))
+
+
+def test_slow_correct_answers_earn_partial_credit():
+    fast, slow = LearnerModel(), LearnerModel()
+    fast.update("easy", True, elapsed=10, fast_threshold=30)
+    slow.update("easy", True, elapsed=45, fast_threshold=30)
+    k = LearnerModel().k_factor()
+    assert slow.rating - START_RATING == pytest.approx(k * (SLOW_CORRECT_SCORE - 0.5))
+    assert START_RATING < slow.rating < fast.rating
+
+
+def test_k_factor_settles():
+    assert LearnerModel(answered=0).k_factor() == 120.0
+    assert LearnerModel(answered=10).k_factor() == 60.0
+    assert LearnerModel(answered=1000).k_factor() == 24.0
+
+
+def test_a_strong_learner_moves_up_a_level():
+    learner = LearnerModel()
+    for _ in range(5):
+        learner.update(learner.level(), True)
+    assert learner.level() in ("medium", "hard")
+    for _ in range(20):
+        learner.update(learner.level(), False)
+    assert learner.level() == "easy"
+
+
+def test_select_level_falls_back_to_the_nearest_level_with_questions():
+    index = QuestionIndex([1, 2, 3, 4], ["easy", "medium", "hard", "hard"])
+    seen = SeenSet()
+    assert select_level("medium", seen, index) == "medium"
+    index.mark_seen(seen, 2)
+    assert select_level("medium", seen, index) == "hard"  # ties prefer the harder level
+    index.mark_seen(seen, 3)
+    index.mark_seen(seen, 4)
+    assert select_level("hard", seen, index) == "easy"
+    index.mark_seen(seen, 1)
+    assert select_level("easy", seen, index) is None
+
@@ -0,0 +1,74 @@
+# test_api.py - JSON API: who decides when submissions are profiled
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import api
+from sandbox import SandboxPool
+
+SUM_TWO = 1  # coding_questions.csv: "Sum of Two Numbers", def sum_two(a, b)
+SOLUTION = "def sum_two(a, b):\n    return a + b\n"
+
+
+@pytest.fixture(scope="module")
+def sandbox():
+    pool = SandboxPool(workers=1)
+    yield pool
+    pool.close()
+
+
+def call(sandbox, path, body):
+    """POST body to a fresh app; returns the JSON response."""
+    async def run():
+        app = api.create_app(sandbox=sandbox)
+        app.on_cleanup.clear()  # the module's sandbox outlives each app
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post(path, json=body)
+            assert response.status == 200
+            return await response.json()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def hint_questions(monkeypatch):
+    """The question text each generated hint was asked for."""
+    questions = []
+
+    def fake_hint(question, attempt, func_name=None):
+        questions.append(question)
+        return "hint"
+
+    monkeypatch.setattr(api, "generate_hint", fake_hint)
+    return questions
+
+
+def test_client_cannot_turn_on_profiling(sandbox, monkeypatch):
+    monkeypatch.setattr(api, "API_ALLOW_PROFILE", False)
+    body = {"state": None, "question_id": SUM_TWO, "code": SOLUTION, "profile": True}
+    response = call(sandbox, "/api/coding/submit", body)
+    assert response["correct"] is True and "profile" not in response
+
+    monkeypatch.setattr(api, "API_ALLOW_PROFILE", True)
+    response = call(sandbox, "/api/coding/submit", body)
+    assert response["profile"]["stopped"] == "no list, string or dict argument to grow"
+
+
+def test_hint_ignores_a_client_supplied_profile(sandbox, monkeypatch, hint_questions):
+    monkeypatch.setattr(api, "API_ALLOW_PROFILE", True)
+    forged = {"within_budget": False, "time_class": "O(n^2)", "budget": "O(1)"}
+    call(sandbox, "/api/coding/hint", {"question_id": SUM_TWO, "code": SOLUTION, "profile": forged})
+    # The server's own profile of the code has no budget to exceed
+    assert len(hint_questions) == 1 and "more efficient" not in hint_questions[0]
+
+
+def test_hint_uses_the_servers_profile(sandbox, monkeypatch, hint_questions):
+    over = {"within_budget": False, "time_class": "O(n^2)", "memory_class": "O(1)", "budget": "O(n)"}
+    monkeypatch.setattr(api, "_passing_profile", lambda row, code, pool: over)
+    monkeypatch.setattr(api, "API_ALLOW_PROFILE", False)
+    call(sandbox, "/api/coding/hint", {"question_id": SUM_TWO, "code": SOLUTION, "profile": True})
+    monkeypatch.setattr(api, "API_ALLOW_PROFILE", True)
+    call(sandbox, "/api/coding/hint", {"question_id": SUM_TWO, "code": SOLUTION, "profile": True})
+    assert "more efficient" not in hint_questions[0]
+    assert "grows like O(n^2)" in hint_questions[1] and "Aim for O(n)" in hint_questions[1]
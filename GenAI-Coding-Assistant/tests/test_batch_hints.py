@@ -0,0 +1,46 @@
+# test_batch_hints.py - resuming an interrupted batch run
+import json
+
+from batch_hints import done_ids, end_partial_line
+
+RECORD = {"id": "a", "mode": "coding", "question_id": 1, "hint": "h", "source": "batch"}
+
+
+def write(path, text):
+    path.write_bytes(text.encode("utf-8"))
+
+
+def test_a_line_cut_short_is_truncated(tmp_path):
+    out = tmp_path / "hints.jsonl"
+    complete = json.dumps(RECORD) + "\n"
+    write(out, complete + json.dumps(dict(RECORD, id="b"))[:20])
+    end_partial_line(str(out))
+    assert out.read_text() == complete
+    with open(out, "a", encoding="utf-8") as f:  # the next run's records start on their own line
+        f.write(json.dumps(dict(RECORD, id="c")) + "\n")
+    assert done_ids(str(out)) == {"a", "c"}
+
+
+def test_a_complete_last_line_is_terminated(tmp_path):
+    out = tmp_path / "hints.jsonl"
+    write(out, json.dumps(RECORD))
+    end_partial_line(str(out))
+    assert out.read_text() == json.dumps(RECORD) + "\n" and done_ids(str(out)) == {"a"}
+
+
+def test_whole_lines_and_missing_files_are_left_alone(tmp_path):
+    out = tmp_path / "hints.jsonl"
+    end_partial_line(str(out))
+    assert not out.exists()
+    for text in ("", json.dumps(RECORD) + "\n"):
+        write(out, text)
+        end_partial_line(str(out))
+        assert out.read_text() == text
+
+
+def test_a_partial_line_longer_than_a_block(tmp_path):
+    out = tmp_path / "hints.jsonl"
+    complete = json.dumps(dict(RECORD, hint="x" * 70000)) + "\n"
+    write(out, complete + json.dumps(dict(RECORD, id="b", hint="y" * 140000))[:-2])
+    end_partial_line(str(out))
+    assert out.read_text() == complete
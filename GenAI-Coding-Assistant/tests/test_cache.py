@@ -0,0 +1,68 @@
+# test_cache.py - LRU/TTL hint cache, its SQLite tier and hint key normalization
+import time
+
+from cache import LRUCache, SQLiteTier
+from utils import code_fingerprint, normalize_code
+
+
+def test_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(maxsize=8, ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a", "gone") == "gone"
+    assert len(cache) == 0
+
+
+def test_hit_and_miss_counters():
+    cache = LRUCache(maxsize=8)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_misses_fall_through_to_the_sqlite_tier(tmp_path):
+    path = str(tmp_path / "hints.db")
+    LRUCache(maxsize=8, store=SQLiteTier(path)).set("a", {"hint": "x"})
+    cache = LRUCache(maxsize=8, store=SQLiteTier(path))  # e.g. another process, or after a restart
+    assert cache.get("a") == {"hint": "x"}
+    cache.delete("a")
+    assert LRUCache(maxsize=8, store=SQLiteTier(path)).get("a") is None
+
+
+def test_sqlite_tier_ttl(tmp_path):
+    tier = SQLiteTier(str(tmp_path / "hints.db"), ttl=0.05)
+    tier.set("a", "hint")
+    assert tier.get("a") == "hint"
+    time.sleep(0.06)
+    assert tier.get("a") is None
+
+
+def test_normalization_ignores_comments_and_formatting():
+    a = "def f(x):\n    # double it\n    return x*2\n"
+    b = "def f( x ):\n\n    return (x * 2)  # same\n"
+    assert normalize_code(a) == normalize_code(b)
+    assert normalize_code(a) != normalize_code("def f(x):\n    return x * 3\n")
+    # Unparseable code still normalizes, by whitespace
+    assert normalize_code("def f(x)\n  return  x") == normalize_code("def f(x) return x")
+
+
+def test_hint_key():
+    from gemini_api import hint_key
+
+    code = "def f(x):\n    return x*2\n"
+    assert hint_key("Double x", code) == hint_key("Double x", "def f(x):  # comment\n    return x * 2")
+    assert hint_key("Double x", code) != hint_key("Triple x", code)
+    assert hint_key("Double x", code) == code_fingerprint("Double x", normalize_code(code))
@@ -0,0 +1,92 @@
+# test_cache_server.py - the node-local cache server's protocol and its SocketTier client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from cache import LRUCache, SocketTier
+from cache_server import CacheServer, CacheStore
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "cache.sock")
+    server = CacheServer(path, maxsize=100)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def raw_request(path, *requests):
+    """Send newline-delimited JSON requests on one connection; returns the decoded responses."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(2)
+        sock.connect(path)
+        stream = sock.makefile("rwb")
+        responses = []
+        for request in requests:
+            stream.write((request if isinstance(request, bytes) else json.dumps(request).encode()) + b"\n")
+            stream.flush()
+            responses.append(json.loads(stream.readline()))
+        return responses
+
+
+def test_store_operations():
+    store = CacheStore(maxsize=10)
+    assert store.handle({"op": "get", "ns": "hint", "key": "k"}) == {"value": None}
+    assert store.handle({"op": "set", "ns": "hint", "key": "k", "value": [1, "a"]}) == {"ok": True}
+    assert store.handle({"op": "get", "ns": "hint", "key": "k"}) == {"value": [1, "a"]}
+    assert store.handle({"op": "get", "ns": "verdict", "key": "k"}) == {"value": None}  # namespaces are separate
+    store.handle({"op": "delete", "ns": "hint", "key": "k"})
+    assert store.handle({"op": "get", "ns": "hint", "key": "k"}) == {"value": None}
+    assert "error" in store.handle({"op": "explode"})
+
+
+def test_store_ttl_and_clear():
+    store = CacheStore(maxsize=10)
+    store.handle({"op": "set", "ns": "hint", "key": "short", "value": 1, "ttl": 0.05})
+    store.handle({"op": "set", "ns": "hint", "key": "long", "value": 2, "ttl": 60})
+    time.sleep(0.06)
+    assert store.handle({"op": "get", "ns": "hint", "key": "short"}) == {"value": None}
+    assert store.handle({"op": "get", "ns": "hint", "key": "long"}) == {"value": 2}
+    store.handle({"op": "clear", "ns": "hint"})
+    assert store.handle({"op": "get", "ns": "hint", "key": "long"}) == {"value": None}
+
+
+def test_protocol_over_the_socket(server):
+    responses = raw_request(
+        server,
+        {"op": "set", "ns": "hint", "key": "k", "value": "a hint"},
+        {"op": "get", "ns": "hint", "key": "k"},
+        b"not json",
+        {"op": "get", "ns": "hint"},
+        {"op": "stats"},
+    )
+    assert responses[0] == {"ok": True}
+    assert responses[1] == {"value": "a hint"}
+    assert "error" in responses[2] and "error" in responses[3]  # the connection survives bad requests
+    assert responses[4]["stats"]["hint"]["size"] == 1
+
+
+def test_workers_share_entries_through_the_socket_tier(server):
+    first = LRUCache(maxsize=10, store=SocketTier(server, "hint"))
+    second = LRUCache(maxsize=10, store=SocketTier(server, "hint"))
+    first.set("k", {"hint": "x"})
+    assert second.get("k") == {"hint": "x"}
+    assert "k" in second and "other" not in second
+    second.delete("k")
+    assert LRUCache(maxsize=10, store=SocketTier(server, "hint")).get("k") is None
+
+
+def test_unavailable_server_degrades_to_misses(tmp_path):
+    tier = SocketTier(str(tmp_path / "missing.sock"), "hint", retry_after=60)
+    cache = LRUCache(maxsize=10, store=tier)
+    cache.set("k", 1)  # still cached locally
+    assert cache.get("k") == 1
+    assert tier.get("k") is None
+    started = time.monotonic()
+    assert tier.get("k") is None and time.monotonic() - started < 0.1  # backing off, no reconnect
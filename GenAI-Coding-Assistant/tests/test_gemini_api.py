@@ -0,0 +1,12 @@
+# test_gemini_api.py - backend selection
+import sys
+
+import gemini_api
+from llm_backends import StubBackend
+
+
+def test_stub_backend_without_dotenv(monkeypatch):
+    monkeypatch.setitem(sys.modules, "dotenv", None)  # makes `import dotenv` raise ImportError
+    monkeypatch.setenv("HINT_BACKEND", "stub")
+    monkeypatch.setattr(gemini_api, "_backend", None)
+    assert isinstance(gemini_api.get_backend(), StubBackend)
@@ -0,0 +1,105 @@
+# test_governor.py - token bucket, circuit breaker and RequestGovernor retries
+import time
+
+import pytest
+
+from governor import CircuitBreaker, GovernorRejected, RequestGovernor, TokenBucket
+
+
+class Flaky(Exception):
+    retryable = True
+
+
+class BadRequest(Exception):
+    retryable = False
+
+
+def failing(exc, times):
+    """A function that raises `exc` on its first `times` calls, then returns the number of calls."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= times:
+            raise exc
+        return len(calls)
+
+    return func
+
+
+def test_bucket_spends_burst_then_refuses():
+    bucket = TokenBucket(rate=1.0, capacity=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0)
+
+
+def test_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=50.0, capacity=1)
+    assert bucket.acquire(timeout=0)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert 0.01 <= time.monotonic() - start < 0.5
+
+
+def test_bucket_keep_reserve():
+    bucket = TokenBucket(rate=0.001, capacity=4)
+    assert bucket.acquire(timeout=0, keep=2)
+    assert bucket.acquire(timeout=0, keep=2)
+    assert not bucket.acquire(timeout=0, keep=2)
+    assert bucket.acquire(timeout=0)
+
+
+def test_breaker_opens_then_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_call_retries_retryable_errors():
+    governor = RequestGovernor(rate=1000, burst=100, retries=3, base_delay=0)
+    assert governor.call(failing(Flaky(), 2)) == 3
+    assert governor.counters["retries"] == 2 and governor.breaker.state == "closed"
+
+
+def test_call_does_not_retry_bad_requests():
+    governor = RequestGovernor(rate=1000, burst=100, retries=3, base_delay=0)
+    with pytest.raises(BadRequest):
+        governor.call(failing(BadRequest(), 1))
+    assert governor.counters["retries"] == 0 and governor.counters["failures"] == 1
+
+
+def test_open_circuit_rejects_without_calling():
+    governor = RequestGovernor(rate=1000, burst=100, retries=0, breaker=CircuitBreaker(1, reset_timeout=60))
+    with pytest.raises(Flaky):
+        governor.call(failing(Flaky(), 1))
+    calls = []
+    with pytest.raises(GovernorRejected) as info:
+        governor.call(calls.append, 1)
+    assert info.value.reason == "circuit_open" and calls == []
+    assert governor.counters["rejected_circuit_open"] == 1
+
+
+def test_rate_limit_wait_times_out():
+    governor = RequestGovernor(rate=0.001, burst=1, acquire_timeout=0.05)
+    assert governor.call(lambda: "ok") == "ok"
+    with pytest.raises(GovernorRejected) as info:
+        governor.call(lambda: "ok")
+    assert info.value.reason == "timeout"
+    assert governor.in_flight == 0
@@ -0,0 +1,47 @@
+# test_prefetch_hints.py - which wrong-answer hints get queued for prefetching
+import pytest
+
+import prefetch_hints
+from cache import LRUCache
+from gemini_api import hint_key
+from prefetch_hints import pending_hints, wrong_options
+
+ROW = {"question": "2 + 2?", "options": "['3', '4', '5']", "correct_answer": "4"}
+
+
+class SpyTier:
+    """Second-level store that records whether it was queried under the prefetch lock."""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.locked_calls = 0
+
+    def get(self, key):
+        self.locked_calls += prefetch_hints._submitted_lock.locked()
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+@pytest.fixture
+def tier(monkeypatch):
+    tier = SpyTier({hint_key(ROW["question"], "5"): "cached hint"})
+    monkeypatch.setattr(prefetch_hints, "HINT_CACHE", LRUCache(store=tier))
+    monkeypatch.setattr(prefetch_hints, "_submitted", set())
+    return tier
+
+
+def test_wrong_options():
+    assert wrong_options(ROW) == ["3", "5"]
+    assert wrong_options({"options": "not a list"}) == []
+
+
+def test_only_uncached_unqueued_hints_are_pending(tier):
+    assert [option for _, option, _ in pending_hints(ROW)] == ["3"]
+    assert pending_hints(ROW) == []  # already queued
+
+
+def test_cache_lookups_run_outside_the_lock(tier):
+    pending_hints(ROW)
+    assert tier.locked_calls == 0
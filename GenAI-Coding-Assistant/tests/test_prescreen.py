@@ -0,0 +1,79 @@
+# test_prescreen.py - static rejection of submissions that can't pass
+import pytest
+
+from prescreen import (
+    MISSING_FUNCTION,
+    NO_RETURN,
+    SYNTAX_ERROR,
+    UNCHANGED_TEMPLATE,
+    WRONG_ARITY,
+    WRONG_FUNCTION_NAME,
+    prescreen,
+    template_signature,
+)
+
+TEMPLATE = "def add(a, b):\n    # Your code here\n    pass"
+CASES = [([1, 2], 3)]
+
+
+@pytest.mark.parametrize(
+    "code, kind",
+    [
+        ("def add(a, b)\n    return a + b\n", SYNTAX_ERROR),
+        ("def add(a, b):\n    return a + \x00b\n", SYNTAX_ERROR),
+        (TEMPLATE, UNCHANGED_TEMPLATE),
+        ("def add(a, b):\n    pass  # TODO\n", UNCHANGED_TEMPLATE),
+        ("def add(a, b):\n    '''Add them.'''\n    ...\n", UNCHANGED_TEMPLATE),
+        ("print(1 + 2)\n", MISSING_FUNCTION),
+        ("def plus(a, b):\n    return a + b\n", WRONG_FUNCTION_NAME),
+        ("def add(a):\n    return a\n", WRONG_ARITY),
+        ("def add(a, b, c):\n    return a + b + c\n", WRONG_ARITY),
+        ("def add(a, b, *, c):\n    return a + b + c\n", WRONG_ARITY),
+        ("def add(a, b):\n    print(a + b)\n", NO_RETURN),
+    ],
+)
+def test_rejects(code, kind):
+    diagnosis = prescreen(TEMPLATE, code, CASES)
+    assert diagnosis is not None and diagnosis.kind == kind
+    assert diagnosis.hint
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "def add(a, b):\n    return a + b\n",
+        "def add(a, b):\n    return a - b\n",  # wrong, but only running it can tell
+        "def add(x, y):\n    return x + y\n",
+        "def add(a, b, c=0):\n    return a + b + c\n",
+        "def add(*args):\n    return sum(args)\n",
+        "def helper(a, b):\n    return a + b\n\ndef add(a, b):\n    return helper(a, b)\n",
+        "add = lambda a, b: a + b\n",
+        "from operator import add\n",
+        "def add(a, b):\n    yield a + b\n",
+    ],
+)
+def test_accepts(code):
+    assert prescreen(TEMPLATE, code, CASES) is None
+
+
+def test_no_return_check_needs_non_none_expectations():
+    code = "def add(a, b):\n    print(a + b)\n"
+    assert prescreen(TEMPLATE, code) is None
+    assert prescreen(TEMPLATE, code, [([1, 2], None)]) is None
+
+
+def test_syntax_error_reports_line():
+    diagnosis = prescreen(TEMPLATE, "def add(a, b):\n    return (a + b\n\n", CASES)
+    assert diagnosis.kind == SYNTAX_ERROR and diagnosis.line is not None
+
+
+def test_template_signature_falls_back_to_regex():
+    signature = template_signature('def sum_two(a, b):\n    # Your code here\n    pass"')
+    assert signature.name == "sum_two" and signature.params == ("a", "b")
+
+
+def test_loadgen_wrong_answers_reach_the_sandbox():
+    from loadgen import WRONG_CODE
+
+    code = WRONG_CODE.format(name="add", value="wrong answer 0")
+    assert prescreen(TEMPLATE, code, CASES) is None
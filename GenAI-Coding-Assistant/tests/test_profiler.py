@@ -0,0 +1,72 @@
+# test_profiler.py - complexity fitting, budgets and the profiling loop
+import pytest
+
+import profiler
+from profiler import MIN_POINTS, fit_complexity, profile_submission, within_budget
+
+SIZES = [64, 128, 256, 512, 1024, 2048]
+
+
+@pytest.mark.parametrize("name, f", [
+    ("O(1)", lambda n: 3e-6),
+    ("O(n)", lambda n: 2e-6 + 1e-8 * n),
+    ("O(n log n)", lambda n: 1e-8 * n * (n.bit_length() - 1)),
+    ("O(n^2)", lambda n: 1e-6 + 1e-9 * n * n),
+])
+def test_fit_complexity_recovers_the_class(name, f):
+    assert fit_complexity(SIZES, [f(n) for n in SIZES]) == name
+
+
+def test_fit_complexity_tolerates_noise():
+    noise = [1.03, 0.97, 1.02, 0.98, 1.04, 0.96]
+    assert fit_complexity(SIZES, [1e-8 * n * e for n, e in zip(SIZES, noise)]) == "O(n)"
+    assert fit_complexity(SIZES, [2e-7 * e for e in noise]) == "O(1)"  # below the floor, flat
+
+
+def test_fit_complexity_needs_min_points():
+    assert fit_complexity(SIZES[:MIN_POINTS - 1], [1e-6, 4e-6]) is None
+
+
+@pytest.mark.parametrize("report, budget, expected", [
+    ({"time_class": "O(n)"}, "O(n log n)", True),
+    ({"time_class": "O(n log n)"}, "O(n log n)", True),
+    ({"time_class": "O(n^2)"}, "O(n log n)", False),
+    ({"time_class": "O(n^2)"}, None, True),  # no budget
+    ({"time_class": None, "exceeded": True}, "O(n)", False),  # ran out of memory
+    ({"time_class": None, "exceeded": False}, "O(n)", None),  # nothing to grow, or broke when grown
+])
+def test_within_budget(report, budget, expected):
+    assert within_budget(report, budget) is expected
+
+
+def test_a_fast_function_on_a_nested_input_is_profiled_at_every_size():
+    # Copying a grown grid takes far longer than len(); only the calls count against the budget
+    ok, report = profile_submission("def f(grid):\n    return len(grid)\n", "f", [[[1, 2, 3], [4, 5, 6]]])
+    assert ok and report["sizes"] == list(profiler.PROFILE_SIZES)
+    assert report["stopped"] is None and report["exceeded"] is False
+    assert within_budget(report, "O(n)") is True
+
+
+@pytest.fixture
+def quadratic_timings(monkeypatch):
+    """Calls that take 1e-7 * n^2 seconds, so budget cutoffs don't depend on the machine."""
+    def fake_time_call(func, test_input):
+        seconds = 1e-7 * len(test_input[0]) ** 2
+        return seconds, seconds
+
+    monkeypatch.setattr(profiler, "_time_call", fake_time_call)
+    monkeypatch.setattr(profiler, "_peak_bytes", lambda func, test_input: (0, 0.0))
+
+
+def test_a_budget_cutoff_before_min_points_is_unknown(monkeypatch, quadratic_timings):
+    monkeypatch.setattr(profiler, "MAX_SECONDS", 0.005)
+    ok, report = profile_submission("def f(values):\n    return values\n", "f", [[3, 1, 2]], sizes=SIZES)
+    assert ok and report["sizes"] == [64, 128] and report["stopped"] == "time budget reached before n=256"
+    assert report["exceeded"] is False and within_budget(report, "O(n)") is None
+
+
+def test_a_budget_cutoff_after_min_points_is_fitted(monkeypatch, quadratic_timings):
+    monkeypatch.setattr(profiler, "MAX_SECONDS", 0.1)
+    ok, report = profile_submission("def f(values):\n    return values\n", "f", [[3, 1, 2]], sizes=SIZES)
+    assert ok and report["sizes"] == [64, 128, 256, 512] and report["exceeded"] is True
+    assert report["time_class"] == "O(n^2)" and within_budget(report, "O(n log n)") is False
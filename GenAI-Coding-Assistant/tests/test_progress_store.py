@@ -0,0 +1,77 @@
+# test_progress_store.py - seen-bitmap encoding and ProgressStore round trips
+import threading
+import time
+
+from progress_store import ProgressStore, decode_seen, encode_seen
+from question_index import QuestionIndex, SeenSet
+
+IDS = [7, 3, 100, 42, 1, 64, 9]
+DIFFICULTIES = ["easy", "medium", "hard", "easy", "hard", "medium", "easy"]
+
+
+def seen_of(index, ids):
+    seen = SeenSet()
+    for qid in ids:
+        index.mark_seen(seen, qid)
+    return seen
+
+
+def test_round_trip():
+    index = QuestionIndex(IDS, DIFFICULTIES)
+    seen = seen_of(index, [3, 100, 1, 9])
+    decoded = decode_seen(index, encode_seen(index, seen.bits))
+    assert decoded.bits == seen.bits
+    assert decoded.counts == seen.counts == {"medium": 1, "hard": 2, "easy": 1}
+
+
+def test_empty_round_trip():
+    index = QuestionIndex(IDS, DIFFICULTIES)
+    decoded = decode_seen(index, encode_seen(index, 0))
+    assert decoded.bits == 0 and len(decoded) == 0
+
+
+def test_survives_a_reordered_bank():
+    index = QuestionIndex(IDS, DIFFICULTIES)
+    blob = encode_seen(index, seen_of(index, [42, 64]).bits)
+    reordered = QuestionIndex(IDS[::-1], DIFFICULTIES[::-1])
+    assert decode_seen(reordered, blob).bits == seen_of(reordered, [42, 64]).bits
+
+
+def test_drops_ids_no_longer_in_the_bank():
+    index = QuestionIndex(IDS, DIFFICULTIES)
+    blob = encode_seen(index, seen_of(index, [7, 100]).bits)
+    smaller = QuestionIndex([7, 3], ["easy", "medium"])
+    decoded = decode_seen(smaller, blob)
+    assert decoded.bits == seen_of(smaller, [7]).bits and len(decoded) == 1
+
+
+def test_store_round_trip(tmp_path):
+    index = QuestionIndex(IDS, DIFFICULTIES)
+    seen = seen_of(index, [3, 42])
+    path = str(tmp_path / "progress.db")
+    store = ProgressStore(path, flush_interval=60)
+    store.save("s1", {"score": 5}, {"coding": (index, seen.bits)})
+    state, blobs = store.load("s1")  # still pending, not yet written
+    assert state == {"score": 5} and decode_seen(index, blobs["coding"]).bits == seen.bits
+    store.close()
+
+    store = ProgressStore(path, flush_interval=60)
+    state, blobs = store.load("s1")
+    assert state == {"score": 5} and decode_seen(index, blobs["coding"]).bits == seen.bits
+    assert store.load("unknown") is None
+    store.close()
+
+
+def test_load_sees_a_batch_while_it_is_being_written(tmp_path):
+    store = ProgressStore(str(tmp_path / "progress.db"), flush_interval=60)
+    store.save("s1", {"score": 5})
+    with store._db_lock:  # hold the write back before its commit
+        writer = threading.Thread(target=store.flush)
+        writer.start()
+        while store._pending:
+            time.sleep(0.001)
+        state, _ = store.load("s1")
+        assert state == {"score": 5}
+    writer.join()
+    assert store.load("s1")[0] == {"score": 5} and not store._inflight
+    store.close()
@@ -0,0 +1,122 @@
+# test_prompt_builder.py - compacted hint prompts held to a token budget
+import threading
+
+from prompt_builder import (
+    ESTIMATOR,
+    TokenEstimator,
+    build_prompt,
+    compact_code,
+    focus_line,
+    strip_comments,
+    truncate_around,
+)
+
+QUESTION = "Write a function that returns the sum of a list of numbers."
+
+
+def long_submission(lines=400):
+    body = "\n".join(f"    total_{i} = values[{i} % len(values)] * {i}  # step {i}" for i in range(lines))
+    return f"def helper(x):\n    pass\n\ndef total(values):\n{body}\n    return total_0\n"
+
+
+def test_strip_comments_and_blank_lines():
+    code = "def f(x):  # doc\n\n    # note\n    return '#not a comment'\n"
+    assert strip_comments(code) == "def f(x):\n    return '#not a comment'"
+    assert strip_comments("def f(:\n  'unterminated") == "def f(:\n  'unterminated"
+
+
+def test_compact_code_drops_template_leftovers():
+    code = "def helper(x):\n    pass\n\ndef f(x):\n    pass\n    return x + 1\n"
+    assert compact_code(code, "f") == "def f(x):\n    return x + 1"
+    # The graded function itself is kept even if it is still a stub
+    assert compact_code("def f(x):\n    pass\n", "f") == "def f(x):\n    pass"
+
+
+def test_focus_line():
+    assert focus_line("x = 1\ndef f(:\n", "f") == 2
+    assert focus_line("x = 1\n\ndef f(a):\n    return a\n", "f") == 3
+    assert focus_line("x = 1\n", "f") is None
+
+
+def test_truncate_around_keeps_a_window_at_the_line():
+    code = "\n".join(f"line {i}" for i in range(1, 101))
+    cut = truncate_around(code, 100, line=50)
+    kept = [line for line in cut.splitlines() if line.startswith("line")]
+    assert "line 50" in kept and len(cut) <= 100  # markers included
+    first, last = cut.splitlines()[0], cut.splitlines()[-1]
+    assert first == f"# ... {int(kept[0][5:]) - 1} line(s) omitted ..."
+    assert last == f"# ... {100 - int(kept[-1][5:])} line(s) omitted ..."
+    assert truncate_around("short", 100) == "short"
+
+
+def test_short_prompts_are_not_truncated():
+    prompt = build_prompt(QUESTION, "def total(values):\n    # add them\n    return sum(values)\n", "total")
+    assert QUESTION in prompt
+    assert "return sum(values)" in prompt and "# add them" not in prompt
+    assert "omitted" not in prompt
+
+
+def test_long_prompts_fit_the_budget():
+    for budget in (128, 256, 1024):
+        prompt = build_prompt(QUESTION, long_submission(), "total", budget=budget)
+        assert ESTIMATOR.estimate(prompt) <= budget
+        assert "def total(values):" in prompt and "omitted" in prompt
+        assert "def helper" not in prompt
+
+
+def test_long_descriptions_are_shortened_last():
+    prompt = build_prompt(QUESTION + " More detail." * 200, long_submission(), "total", budget=128)
+    assert ESTIMATOR.estimate(prompt) <= 128 + 20
+    assert "def total(values):" in prompt
+
+
+class CountingBackend:
+    def __init__(self, chars_per_token, release=None):
+        self.chars_per_token = chars_per_token
+        self.release = release
+        self.calls = 0
+
+    def count_tokens(self, text):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        return int(len(text) / self.chars_per_token)
+
+
+def drain(estimator):
+    estimator._executor.submit(lambda: None).result(5)
+
+
+def test_estimator_is_calibrated_in_the_background():
+    estimator = TokenEstimator(measure_every=3)
+    backend = CountingBackend(chars_per_token=5.0)
+    started = [estimator.sample("x" * 500, backend.count_tokens) for _ in range(6)]
+    drain(estimator)
+    assert started == [True, False, False, True, False, False]
+    assert backend.calls == 2
+    assert 3.5 < estimator.chars_per_token < 5.0
+
+
+def test_one_count_at_a_time():
+    release = threading.Event()
+    estimator = TokenEstimator(measure_every=1)
+    backend = CountingBackend(chars_per_token=5.0, release=release)
+    assert estimator.sample("x" * 500, backend.count_tokens)
+    assert not estimator.sample("x" * 500, backend.count_tokens)  # the first count is still running
+    release.set()
+    drain(estimator)
+    assert estimator.sample("x" * 500, backend.count_tokens)
+    drain(estimator)
+    assert backend.calls == 2
+
+
+def test_failed_counts_leave_the_estimate_alone():
+    estimator = TokenEstimator(measure_every=1)
+
+    def shed(text):
+        raise RuntimeError("request rejected: shed")
+
+    assert estimator.sample("text", shed)
+    drain(estimator)
+    assert estimator.chars_per_token == TokenEstimator().chars_per_token
+    assert not estimator.sample("text", None)
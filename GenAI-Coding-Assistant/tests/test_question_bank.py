@@ -0,0 +1,149 @@
+# test_question_bank.py - incremental index updates and bank reloads, checked against full rebuilds
+import csv
+import random
+
+import pytest
+
+from question_bank import RETIRED, CompiledBank, ReloadingBank, compile_bank
+from question_index import QuestionIndex, SeenSet
+
+COLUMNS = ["id", "difficulty", "title", "description", "template", "test_input", "expected_output"]
+LEVELS = ["easy", "medium", "hard"]
+
+
+def question(qid, difficulty, title=None):
+    return {
+        "id": qid,
+        "difficulty": difficulty,
+        "title": title or f"Question {qid}",
+        "description": f"Return {qid} plus the argument.",
+        "template": "def f(x):\n    # Your code here\n    pass",
+        "test_input": "1",
+        "expected_output": str(qid + 1),
+    }
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def assert_same_index(index, expected):
+    assert index.ids == expected.ids
+    assert index.difficulties == expected.difficulties
+    assert index.positions == expected.positions
+    assert {d: m for d, m in index.masks.items() if m} == {d: m for d, m in expected.masks.items() if m}
+    assert {d: n for d, n in index.sizes.items() if n} == {d: n for d, n in expected.sizes.items() if n}
+
+
+def test_updated_matches_a_fresh_index():
+    rng = random.Random(7)
+    ids = list(range(1, 201))
+    difficulties = [rng.choice(LEVELS) for _ in ids]
+    index = QuestionIndex(ids, difficulties)
+    for _ in range(5):
+        difficulties = [rng.choice(LEVELS) if rng.random() < 0.1 else d for d in difficulties]
+        ids = ids + list(range(ids[-1] + 1, ids[-1] + 1 + rng.randrange(20)))
+        difficulties += [rng.choice(LEVELS) for _ in range(len(ids) - len(difficulties))]
+        updated = index.updated(ids, difficulties)
+        assert_same_index(updated, QuestionIndex(ids, difficulties))
+        assert updated.generation != index.generation
+        index = updated
+
+
+def test_updated_leaves_the_old_index_alone():
+    index = QuestionIndex([1, 2, 3], ["easy", "easy", "hard"])
+    masks, difficulties = dict(index.masks), list(index.difficulties)
+    index.updated([1, 2, 3, 4], ["easy", "medium", "hard", "easy"])
+    assert index.masks == masks and index.difficulties == difficulties
+
+
+def test_updated_rejects_dropped_positions():
+    with pytest.raises(ValueError):
+        QuestionIndex([1, 2, 3], LEVELS).updated([1, 2], LEVELS[:2])
+
+
+def test_seen_counts_follow_an_update():
+    index = QuestionIndex([1, 2, 3], ["easy", "easy", "hard"])
+    seen = SeenSet()
+    index.mark_seen(seen, 1)
+    index.mark_seen(seen, 3)
+    updated = index.updated([1, 2, 3, 4], ["medium", "easy", "hard", "easy"])
+    assert updated.unseen_count("easy", seen) == 2
+    assert updated.unseen_count("medium", seen) == 0
+    assert updated.unseen_count("hard", seen) == 0
+    assert updated.next_unseen("easy", seen) == 1
+
+
+def test_incremental_compile_matches_full_rebuild(tmp_path):
+    csv_path = str(tmp_path / "questions.csv")
+    rows = [question(qid, LEVELS[qid % 3]) for qid in range(1, 31)]
+    write_csv(csv_path, rows)
+    old = CompiledBank(compile_bank(csv_path, str(tmp_path / "old.qbank")))
+
+    # Edit two questions (one changes difficulty), remove two and add three
+    rows[4] = question(5, "hard", "Edited")
+    rows[10] = question(11, "medium", "Also edited")
+    del rows[20], rows[7]
+    rows += [question(qid, LEVELS[qid % 3]) for qid in (31, 32, 33)]
+    write_csv(csv_path, rows)
+    incremental = CompiledBank(compile_bank(csv_path, str(tmp_path / "new.qbank"), previous=old), previous=old)
+    full = CompiledBank(compile_bank(csv_path, str(tmp_path / "full.qbank")))
+
+    # Positions are kept and new questions appended; removed ones are retired in place
+    assert incremental.extends(old)
+    assert incremental.index.ids[: len(old)] == old.index.ids
+    live = {row["id"] for row in rows}
+    for pos, qid in enumerate(incremental.index.ids):
+        if qid in live:
+            assert incremental.row(pos) == full.get(qid)
+            assert incremental.index.difficulties[pos] == full.index.difficulties[full.index.position(qid)]
+        else:
+            assert incremental.index.difficulties[pos] == RETIRED
+    assert sorted(incremental.changed_ids(old)) == [5, 8, 11, 21]
+
+    # The updated index is the one a from-scratch build of the same layout would give
+    assert_same_index(incremental.index, QuestionIndex(incremental.meta["ids"], incremental.meta["difficulties"]))
+    for level in LEVELS:
+        assert incremental.index.sizes[level] == full.index.sizes[level]
+    for bank in (old, incremental, full):
+        bank.close()
+
+
+def test_removed_question_comes_back(tmp_path):
+    csv_path = str(tmp_path / "questions.csv")
+    rows = [question(qid, "easy") for qid in (1, 2, 3)]
+    write_csv(csv_path, rows)
+    first = CompiledBank(compile_bank(csv_path, str(tmp_path / "1.qbank")))
+    write_csv(csv_path, rows[:1] + rows[2:])
+    second = CompiledBank(compile_bank(csv_path, str(tmp_path / "2.qbank"), previous=first), previous=first)
+    write_csv(csv_path, rows)
+    third = CompiledBank(compile_bank(csv_path, str(tmp_path / "3.qbank"), previous=second), previous=second)
+    assert second.index.difficulties == ["easy", RETIRED, "easy"]
+    assert third.index.difficulties == ["easy", "easy", "easy"]
+    assert third.get(2) == first.get(2)
+    for bank in (first, second, third):
+        bank.close()
+
+
+def test_reloading_bank_swaps_in_changes(tmp_path):
+    csv_path = str(tmp_path / "questions.csv")
+    rows = [question(qid, "easy") for qid in (1, 2, 3)]
+    write_csv(csv_path, rows)
+    bank = ReloadingBank(csv_path, interval=-1)
+    before = bank.current()
+    seen = SeenSet()
+    before.index.mark_seen(seen, 2)
+
+    rows[0] = question(1, "medium", "Edited")
+    rows.append(question(4, "easy"))
+    write_csv(csv_path, rows)
+    assert bank.reload() == [1]
+    after = bank.current()
+    assert after is not before and len(after) == 4
+    assert after.get(1)["title"] == "Edited" and before.get(1)["title"] == "Question 1"
+    assert after.index.unseen_count("easy", seen) == 2
+    assert bank.reload() == []  # unchanged since the last reload
+    bank.close()
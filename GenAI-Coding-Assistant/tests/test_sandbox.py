@@ -0,0 +1,123 @@
+# test_sandbox.py - SandboxPool limits, worker reuse and result transport
+import os
+
+import pytest
+
+from sandbox import (
+    CPU_LIMIT_EXCEEDED,
+    MEMORY_LIMIT_EXCEEDED,
+    RESULT_TOO_LARGE,
+    TIME_LIMIT_EXCEEDED,
+    SandboxPool,
+)
+from utils import evaluate_code
+
+# Submissions run with separate globals and locals, so imports go inside the function
+GET_PID = "def f():\n    import os\n    return os.getpid()\n"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(workers=1, wall_timeout=5, cpu_timeout=1, memory_mb=256)
+    yield pool
+    pool.close()
+
+
+def test_passing_and_failing_submissions(pool):
+    assert pool.evaluate_code("def f(a, b):\n    return a + b\n", "f", [1, 2], 3) == (True, 3)
+    assert pool.evaluate_code("def f(a, b):\n    return a - b\n", "f", [1, 2], 3) == (False, -1)
+
+
+def test_worker_is_reused(pool):
+    _, first = pool.evaluate_code(GET_PID, "f", [], None)
+    _, second = pool.evaluate_code(GET_PID, "f", [], None)
+    assert isinstance(first, int) and first == second
+
+
+def test_cpu_limit_keeps_the_worker(pool):
+    _, before = pool.evaluate_code(GET_PID, "f", [], None)
+    assert pool.evaluate_code("def f():\n    while True:\n        pass\n", "f", [], None) == (False, CPU_LIMIT_EXCEEDED)
+    _, after = pool.evaluate_code(GET_PID, "f", [], None)
+    assert isinstance(before, int) and after == before  # SIGXCPU is caught in the worker, which keeps serving
+
+
+def test_memory_limit(pool):
+    code = "def f():\n    return len(bytearray(1 << 30))\n"
+    assert pool.evaluate_code(code, "f", [], None) == (False, MEMORY_LIMIT_EXCEEDED)
+    assert pool.evaluate_code("def f():\n    return 1\n", "f", [], 1) == (True, 1)
+
+
+def test_wall_timeout_respawns_worker(pool):
+    _, before = pool.evaluate_code(GET_PID, "f", [], None)
+    code = "def f():\n    import time\n    time.sleep(10)\n"
+    assert pool.run(evaluate_code, code, "f", [], None, wall_timeout=0.5) == (False, TIME_LIMIT_EXCEEDED)
+    _, after = pool.evaluate_code(GET_PID, "f", [], None)
+    assert isinstance(after, int) and after != before
+
+
+def test_results_are_plain_json(pool):
+    passed, result = pool.evaluate_code("def f():\n    return (1, {'a': [2.5, None]})\n", "f", [], None)
+    assert passed is False and result == [1, {"a": [2.5, None]}]
+
+
+def test_untrusted_objects_come_back_as_repr(pool, tmp_path):
+    # Unpickling this in the parent would create the marker file
+    marker = tmp_path / "unpickled"
+    code = (
+        "def f():\n"
+        "    class E:\n"
+        "        def __reduce__(self):\n"
+        f"            return (open, ({str(marker)!r}, 'w'))\n"
+        "        def __repr__(self):\n"
+        "            return 'E()'\n"
+        "    return E()\n"
+    )
+    assert pool.evaluate_code(code, "f", [], None) == (False, "E()")
+    assert not marker.exists()
+
+
+def test_oversized_result(pool):
+    assert pool.evaluate_code("def f():\n    return 'x' * (2 << 20)\n", "f", [], None) == (False, RESULT_TOO_LARGE)
+
+
+def test_memory_error_reaches_the_sandbox():
+    with pytest.raises(MemoryError):
+        evaluate_code("def f():\n    raise MemoryError\n", "f", [], None)
+
+
+def test_failed_respawn_never_returns_a_dead_worker(monkeypatch):
+    pool = SandboxPool(workers=1, wall_timeout=0.5, cpu_timeout=1, memory_mb=256)
+    try:
+        spawn = pool._spawn
+
+        def broken_spawn():
+            raise OSError("fork failed")
+
+        monkeypatch.setattr(pool, "_spawn", broken_spawn)
+        code = "def f():\n    import time\n    time.sleep(10)\n"
+        with pytest.raises(OSError):
+            pool.evaluate_code(code, "f", [], None)
+        assert list(pool._idle.queue) == [None]
+        with pytest.raises(OSError):
+            pool.evaluate_code(GET_PID, "f", [], None)  # the empty slot is retried, not lost
+
+        monkeypatch.setattr(pool, "_spawn", spawn)
+        _, pid = pool.evaluate_code(GET_PID, "f", [], None)
+        assert isinstance(pid, int)
+    finally:
+        pool.close()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="worker usage is read from /proc")
+def test_usage_counts_live_and_stopped_workers():
+    pool = SandboxPool(workers=1, wall_timeout=0.5, cpu_timeout=5, memory_mb=256)
+    try:
+        pool.evaluate_code("def f():\n    while True:\n        pass\n", "f", [], None)  # killed and replaced
+        stopped = pool.usage()
+        assert stopped["cpu_user_s"] + stopped["cpu_system_s"] >= 0.2 and stopped["max_rss_kb"] > 0
+        pool.evaluate_code("def f():\n    n = 0\n    for i in range(3_000_000):\n        n += i\n    return n\n",
+                           "f", [], None)
+        assert pool.usage()["cpu_user_s"] > stopped["cpu_user_s"]
+    finally:
+        pool.close()
+    assert pool.usage()["cpu_user_s"] > stopped["cpu_user_s"]  # kept after close
@@ -0,0 +1,33 @@
+# test_service.py - learner state handling shared by the app, the API and the load generator
+from question_index import QuestionIndex
+from service import ModeState
+
+IDS = [1, 2, 3, 4]
+DIFFICULTIES = ["easy", "easy", "medium", "hard"]
+
+
+def test_a_wrong_retry_does_not_lower_the_rating_again():
+    index, state = QuestionIndex(IDS, DIFFICULTIES), ModeState()
+    state.answer(index, 0, False)
+    after_first = state.learner.rating
+    state.answer(index, 0, False)
+    assert state.learner.rating == after_first and state.missed == {1}
+
+
+def test_answers_to_seen_questions_are_ignored():
+    index, state = QuestionIndex(IDS, DIFFICULTIES), ModeState()
+    state.answer(index, 0, True)
+    rating, answered = state.learner.rating, state.learner.answered
+    for _ in range(3):  # a replayed correct answer
+        state.answer(index, 0, True)
+    state.leave(index, 1)
+    state.answer(index, 1, True)  # an answer to a skipped question
+    assert (state.learner.rating, state.learner.answered) == (rating, answered)
+
+
+def test_state_round_trip():
+    index, state = QuestionIndex(IDS, DIFFICULTIES), ModeState()
+    state.answer(index, 0, True)
+    state.answer(index, 2, False)
+    restored = ModeState.from_dict(index, state.to_dict(index))
+    assert restored.to_dict(index) == state.to_dict(index)
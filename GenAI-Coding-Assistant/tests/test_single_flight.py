@@ -0,0 +1,87 @@
+# test_single_flight.py - request coalescing for identical concurrent calls
+import threading
+import time
+
+import pytest
+
+from governor import SingleFlight
+
+
+def gated(gate, calls, chunks=("a", "b", "c"), error=None):
+    """Generator function that waits for `gate` before streaming `chunks` (then raising `error`, if any)."""
+
+    def func():
+        calls.append(1)
+        gate.wait(5)
+        yield from chunks
+        if error is not None:
+            raise error
+
+    return func
+
+
+def consume(flights, key, func, results):
+    try:
+        results.append("".join(flights.stream(key, func)))
+    except Exception as e:
+        results.append(e)
+
+
+def run_concurrently(flights, key, func, n):
+    results = []
+    threads = [threading.Thread(target=consume, args=(flights, key, func, results)) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for_followers(flights, n):
+    for _ in range(500):
+        if flights.followers >= n:
+            return
+        time.sleep(0.01)
+    raise AssertionError("followers never joined")
+
+
+def test_concurrent_callers_share_one_call():
+    flights, gate, calls = SingleFlight(), threading.Event(), []
+    threads, results = run_concurrently(flights, "k", gated(gate, calls), 4)
+    wait_for_followers(flights, 3)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["abc"] * 4
+    assert calls == [1] and flights.leaders == 1
+    assert flights.metrics()["in_flight"] == 0
+
+
+def test_followers_see_the_leaders_error():
+    flights, gate, calls = SingleFlight(), threading.Event(), []
+    threads, results = run_concurrently(flights, "k", gated(gate, calls, error=ValueError("upstream")), 3)
+    wait_for_followers(flights, 2)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 3 and all(isinstance(r, ValueError) for r in results)
+    assert calls == [1]
+
+
+def test_different_keys_and_later_calls_are_not_shared():
+    flights, gate, calls = SingleFlight(), threading.Event(), []
+    gate.set()
+    assert "".join(flights.stream("a", gated(gate, calls))) == "abc"
+    assert "".join(flights.stream("a", gated(gate, calls))) == "abc"
+    assert "".join(flights.stream("b", gated(gate, calls))) == "abc"
+    assert len(calls) == 3 and flights.followers == 0
+
+
+def test_abandoned_leader_releases_followers():
+    flights, gate, calls = SingleFlight(), threading.Event(), []
+    gate.set()
+    leader = flights.stream("k", gated(gate, calls))
+    assert next(leader) == "a"
+    follower = flights.stream("k", gated(gate, calls))
+    leader.close()
+    with pytest.raises(RuntimeError):
+        list(follower)
+    assert calls == [1]
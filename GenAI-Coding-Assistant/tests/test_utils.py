@@ -0,0 +1,63 @@
+# test_utils.py - batch evaluation of a question's test cases
+from utils import evaluate_cases, evaluate_code, parse_literal, question_test_cases
+
+SQUARE = "def square(x):\n    return x * x\n"
+# Right for small inputs only
+SQUARE_UP_TO_TWO = "def square(x):\n    return x * x if x <= 2 else 0\n"
+
+
+def test_question_test_cases_prefers_the_test_cases_column():
+    row = {"test_input": "2", "expected_output": "4", "test_cases": "[[1, 1], [[2, 3], 5]]"}
+    assert question_test_cases(row) == [(1, 1), ([2, 3], 5)]
+
+
+def test_question_test_cases_falls_back_to_the_single_pair():
+    assert question_test_cases({"test_input": "[1, 2]", "expected_output": "3"}) == [([1, 2], 3)]
+    assert question_test_cases({"test_input": "2", "expected_output": "4", "test_cases": ""}) == [(2, 4)]
+
+
+def test_parse_literal():
+    assert parse_literal("[1, 'a']") == [1, "a"]
+    assert parse_literal("not a literal") == "not a literal"
+    assert parse_literal([1]) == [1]
+
+
+def test_all_cases_pass():
+    passed, results = evaluate_cases(SQUARE, "square", [(1, 1), (2, 4), (3, 9)])
+    assert passed is True
+    assert [r["result"] for r in results] == [1, 4, 9]
+    assert all(r["passed"] for r in results)
+
+
+def test_stops_at_the_first_failure():
+    passed, results = evaluate_cases(SQUARE_UP_TO_TWO, "square", [(1, 1), (3, 9), (4, 16)])
+    assert passed is False
+    assert len(results) == 2
+    assert results[-1] == {"input": 3, "expected": 9, "result": 0, "passed": False, "seconds": results[-1]["seconds"]}
+
+
+def test_runs_every_case_without_stop_on_failure():
+    passed, results = evaluate_cases(SQUARE_UP_TO_TWO, "square", [(3, 9), (1, 1), (4, 16)], stop_on_failure=False)
+    assert passed is False
+    assert [r["passed"] for r in results] == [False, True, False]
+
+
+def test_records_per_case_timings():
+    code = "def wait(seconds):\n    import time\n    time.sleep(seconds)\n    return seconds\n"
+    _, results = evaluate_cases(code, "wait", [(0, 0), (0.05, 0.05)])
+    assert all(isinstance(r["seconds"], float) for r in results)
+    assert results[1]["seconds"] >= 0.05 > results[0]["seconds"]
+
+
+def test_exceptions_fail_only_their_case():
+    code = "def inverse(x):\n    return 1 / x\n"
+    passed, results = evaluate_cases(code, "inverse", [(0, None), (2, 0.5)], stop_on_failure=False)
+    assert passed is False
+    assert results[0]["result"] == "division by zero" and results[1]["passed"]
+
+
+def test_load_errors_are_reported_like_evaluate_code():
+    assert evaluate_cases("def square(x)\n", "square", [(1, 1)])[0] is False
+    assert evaluate_cases(SQUARE, "cube", [(1, 1)]) == (False, "'cube'")
+    assert evaluate_code(SQUARE, "cube", 1, 1) == (False, "'cube'")
+
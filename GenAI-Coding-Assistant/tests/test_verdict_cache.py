@@ -0,0 +1,75 @@
+# test_verdict_cache.py - memoized verdicts for duplicate submissions
+import pytest
+
+import verdict_cache
+from cache import LRUCache, SQLiteTier
+from sandbox import TIME_LIMIT_EXCEEDED
+from verdict_cache import cached_verdict, question_version, verdict_key
+
+CODE = "def add(a, b):\n    return a + b\n"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    verdict_cache.VERDICT_CACHE.clear()
+    yield
+    verdict_cache.VERDICT_CACHE.clear()
+
+
+def counting(verdict):
+    calls = []
+
+    def evaluate():
+        calls.append(1)
+        return verdict
+
+    return evaluate, calls
+
+
+def test_keys_ignore_formatting_but_not_the_question():
+    assert verdict_key(1, CODE) == verdict_key(1, "def add(a, b):  # sum\n    return (a + b)\n")
+    assert verdict_key(1, CODE) != verdict_key(2, CODE)
+    assert verdict_key(1, CODE) != verdict_key(1, "def add(a, b):\n    return a - b\n")
+
+
+def test_duplicates_are_graded_once():
+    evaluate, calls = counting((True, [{"passed": True}]))
+    assert cached_verdict(1, CODE, evaluate) == (True, [{"passed": True}])
+    assert cached_verdict(1, CODE + "\n# again\n", evaluate) == (True, [{"passed": True}])
+    assert len(calls) == 1
+
+
+def test_sandbox_failures_are_not_cached():
+    evaluate, calls = counting((False, TIME_LIMIT_EXCEEDED))
+    cached_verdict(1, CODE, evaluate)
+    cached_verdict(1, CODE, evaluate)
+    assert len(calls) == 2
+
+
+def test_wrong_answers_are_cached():
+    evaluate, calls = counting((False, "division by zero"))
+    cached_verdict(1, CODE, evaluate)
+    cached_verdict(1, CODE, evaluate)
+    assert len(calls) == 1
+
+
+def test_editing_a_question_retires_its_verdicts():
+    row = {"id": 1, "template": "def add(a, b):\n    pass", "test_cases": [([1, 2], 3)]}
+    edited = dict(row, test_cases=[([1, 2], 3), ([2, 2], 4)])
+    evaluate, calls = counting((True, []))
+    cached_verdict(1, CODE, evaluate, question_version(row))
+    cached_verdict(1, CODE, evaluate, question_version(row))
+    cached_verdict(1, CODE, evaluate, question_version(edited))
+    assert len(calls) == 2
+    assert question_version(row) == question_version(dict(row))
+
+
+def test_verdicts_are_shared_through_the_second_tier(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.db")
+    evaluate, calls = counting((True, [{"passed": True}]))
+    monkeypatch.setattr(verdict_cache, "VERDICT_CACHE", LRUCache(store=SQLiteTier(path)))
+    cached_verdict(1, CODE, evaluate, "v1")
+    # Another worker: its own local LRU over the same shared tier
+    monkeypatch.setattr(verdict_cache, "VERDICT_CACHE", LRUCache(store=SQLiteTier(path)))
+    assert cached_verdict(1, CODE, evaluate, "v1") == (True, [{"passed": True}])
+    assert len(calls) == 1
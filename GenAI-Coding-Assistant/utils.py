@@ -1,8 +1,105 @@
+import ast
+import hashlib
+import time
+
+
+def parse_literal(s):
+    """Try to parse a Python literal from text (list/dict/bool/int/etc.). Fallback to raw string."""
+    if not isinstance(s, str):
+        return s  # already parsed (e.g. rows from a compiled question bank)
+    try:
+        return ast.literal_eval(str(s))
+    except Exception:
+        return s
+
+
+def normalize_code(code) -> str:
+    """
+    Canonical form of a submission: its AST dump, so comments and formatting
+    don't matter. Falls back to whitespace-collapsed text if it doesn't parse.
+    """
+    try:
+        return ast.dump(ast.parse(str(code)))
+    except (SyntaxError, ValueError):
+        return " ".join(str(code).split())
+
+
+def code_fingerprint(*parts) -> str:
+    """Stable content hash of the given text parts (e.g. question + normalized code)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def question_test_cases(row):
+    """
+    Return the question's test cases as a list of (test_input, expected_output).
+    Uses the optional `test_cases` column (a literal list of [input, expected]
+    pairs) when present, otherwise the single test_input/expected_output pair.
+    """
+    cases = parse_literal(row.get("test_cases", None))
+    if isinstance(cases, (list, tuple)) and cases:
+        return [(case[0], case[1]) for case in cases]
+    return [(parse_literal(row.get("test_input", "")), parse_literal(row.get("expected_output", "")))]
+
+
+def _call(func, test_input):
+    return func(*test_input if isinstance(test_input, list) else [test_input])
+
+
 def evaluate_code(user_code, func_name, test_input, expected_output):
     try:
         local_env = {}
         exec(user_code, {}, local_env)
-        result = local_env[func_name](*test_input if isinstance(test_input, list) else [test_input])
+        result = _call(local_env[func_name], test_input)
         return result == expected_output, result
+    except MemoryError:
+        raise  # the sandbox reports it as MEMORY_LIMIT_EXCEEDED
+    except Exception as e:
+        return False, str(e)
+
+
+def evaluate_cases(user_code, func_name, cases, stop_on_failure=True):
+    """
+    Compile and exec the submission once, then run every (test_input, expected_output)
+    case against the same function object.
+
+    Returns (passed, results): results is a list of per-case dicts with input,
+    expected, result, passed and seconds. Stops after the first failing case
+    unless stop_on_failure is False. If the submission itself fails to load,
+    results is the error message, as with evaluate_code.
+    """
+    try:
+        local_env = {}
+        exec(compile(user_code, "<submission>", "exec"), {}, local_env)
+        func = local_env[func_name]
+    except MemoryError:
+        raise  # the sandbox reports it as MEMORY_LIMIT_EXCEEDED
     except Exception as e:
         return False, str(e)
+
+    passed = True
+    results = []
+    for test_input, expected_output in cases:
+        start = time.perf_counter()
+        try:
+            result = _call(func, test_input)
+            ok = result == expected_output
+        except MemoryError:
+            raise
+        except Exception as e:
+            result, ok = str(e), False
+        results.append({
+            "input": test_input,
+            "expected": expected_output,
+            "result": result,
+            "passed": ok,
+            "seconds": time.perf_counter() - start,
+        })
+        if not ok:
+            passed = False
+            if stop_on_failure:
+                break
+    return passed, results
@@ -0,0 +1,52 @@
+# verdict_cache.py - memoized grading verdicts for duplicate submissions
+import hashlib
+import os
+
+from cache import LRUCache, shared_tier
+from metrics import register_collector
+from sandbox import SANDBOX_ERRORS
+from utils import code_fingerprint, normalize_code
+
+# Local LRU in front of the node's cache server (CACHE_SOCKET), if any, so workers share verdicts
+VERDICT_CACHE = LRUCache(maxsize=int(os.getenv("VERDICT_CACHE_SIZE", "8192")), store=shared_tier("verdict"))
+
+# Byte-identical resubmissions skip AST normalization: raw hash -> normalized key
+_RAW_KEYS = LRUCache(maxsize=int(os.getenv("VERDICT_CACHE_SIZE", "8192")))
+
+register_collector("verdict_cache", VERDICT_CACHE.stats)
+
+
+def question_version(row) -> str:
+    """
+    Fingerprint of what a verdict depends on besides the code (template and
+    test cases). Part of the key, so editing a question's tests retires its
+    cached verdicts in every worker without any coordination.
+    """
+    return code_fingerprint(row.get("template", ""), repr(row.get("test_cases")))
+
+
+def verdict_key(question_id, user_code: str, version: str = "") -> str:
+    """(question id, question version, AST-normalized submission) fingerprint."""
+    raw = hashlib.sha256(f"{question_id}\x00{version}\x00{user_code}".encode("utf-8")).hexdigest()
+    key = _RAW_KEYS.get(raw)
+    if key is None:
+        key = code_fingerprint(question_id, version, normalize_code(user_code))
+        _RAW_KEYS.set(raw, key)
+    return key
+
+
+def cached_verdict(question_id, user_code: str, evaluate, version: str = ""):
+    """
+    Return the (passed, result) verdict for this submission, calling
+    `evaluate()` only on a cache miss. Sandbox failures (timeouts, dead
+    workers) depend on load rather than on the code, so they aren't cached.
+    `version` is the question's question_version().
+    """
+    key = verdict_key(question_id, user_code, version)
+    verdict = VERDICT_CACHE.get(key)
+    if verdict is not None:
+        return tuple(verdict)  # a shared-tier hit comes back from JSON as a list
+    verdict = evaluate()
+    if not (isinstance(verdict[1], str) and verdict[1] in SANDBOX_ERRORS):
+        VERDICT_CACHE.set(key, verdict)
+    return verdict